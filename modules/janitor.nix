@@ -18,23 +18,49 @@ let
     cp -r ${../scripts}/* $out/
   '';
 
+  throttleConfig = {
+    rate_limit = cfg.throttle.rateLimit;
+    psi_high = cfg.throttle.psiHigh;
+    psi_low = cfg.throttle.psiLow;
+  };
+
   janitorConfig = pkgs.writeText "janitor_config.json" (
     builtins.toJSON {
       dumb = {
         grace_period = cfg.dumb.gracePeriod;
+        cluster_gap = cfg.dumb.clusterGap;
+        mode = if cfg.dumb.daemon then "daemon" else "timer";
         watched_dirs = cfg.dumb.watchedDirs;
         rules = cfg.dumb.rules;
+        advanced_rules = map (r: filterAttrs (_: v: v != null) {
+          inherit (r) dest ext glob regex origin magic;
+          min_size = r.minSize;
+          max_size = r.maxSize;
+          catch_all = r.catchAll;
+        }) cfg.dumb.advancedRules;
+        throttle = throttleConfig;
       };
       music = {
         music_dir = cfg.music.musicDir;
         unsorted_dir = cfg.music.unsortedDir;
         split_symbols = cfg.music.artistSplitSymbols;
+        tag_cache = cfg.music.tagCache;
+        tag_workers = cfg.music.tagWorkers;
+        mode = cfg.music.mode;
+        playlists = cfg.music.playlists;
+        covers = cfg.music.covers.enable;
+        prefer_canonical = cfg.music.preferCanonical;
+        cover_cache = cfg.music.covers.cacheDir;
+        cover_cache_size = cfg.music.covers.maxSizeMB;
+        throttle = throttleConfig;
       };
       ml = {
         enabled = cfg.ml.enable;
         interval = cfg.ml.interval;
         scan_dirs = cfg.ml.scanDirs;
-        suggestions_db = "/System/ZenFS/Database/suggestions.json";
+        scan_cache = cfg.ml.scanCache;
+        suggestions_db = "/System/ZenFS/Database/suggestions.jsonl";
+        suggestion_retention_days = cfg.ml.suggestionRetentionDays;
       };
     }
   );
@@ -45,6 +71,7 @@ let
     ps.pillow
     ps.mutagen
     ps.psutil
+    ps.fusepy
   ]);
 
   targetUser = "doromiert";
@@ -52,6 +79,25 @@ in
 {
   options.services.zenfs.janitor = {
 
+    # [ THROTTLE ] Shared bandwidth governor for bulk movers
+    throttle = {
+      rateLimit = mkOption {
+        type = types.int;
+        default = 0;
+        description = "Token-bucket cap for background copies in bytes/s (0 = unlimited).";
+      };
+      psiHigh = mkOption {
+        type = types.int;
+        default = 20;
+        description = "Pause bulk movers while /proc/pressure/{io,memory} avg10 exceeds this percentage.";
+      };
+      psiLow = mkOption {
+        type = types.int;
+        default = 5;
+        description = "Recover the throttled rate once pressure falls below this percentage.";
+      };
+    };
+
     dumb = {
       enable = mkEnableOption "Dumb Janitor";
       interval = mkOption {
@@ -62,6 +108,16 @@ in
         type = types.int;
         default = 60;
       };
+      clusterGap = mkOption {
+        type = types.int;
+        default = 300;
+        description = "Seconds between unmatched downloads that split them into separate Waiting/Batch_* folders.";
+      };
+      daemon = mkOption {
+        type = types.bool;
+        default = false;
+        description = "Watch the directories and sort each file as soon as its grace period expires (instead of the interval timer).";
+      };
       watchedDirs = mkOption {
         type = types.listOf types.str;
         default = [ "/home/doromiert/Downloads" ];
@@ -70,6 +126,35 @@ in
         type = types.attrsOf (types.listOf types.str);
         default = { };
       };
+      advancedRules = mkOption {
+        description = "Ordered rules tried before `rules`. All set fields must match; list entries are alternatives.";
+        default = [ ];
+        type = types.listOf (types.submodule {
+          options = {
+            dest = mkOption { type = types.str; };
+            ext = mkOption { type = types.listOf types.str; default = [ ]; };
+            glob = mkOption { type = types.listOf types.str; default = [ ]; };
+            regex = mkOption { type = types.nullOr types.str; default = null; };
+            minSize = mkOption { type = types.nullOr types.int; default = null; };
+            maxSize = mkOption { type = types.nullOr types.int; default = null; };
+            origin = mkOption {
+              type = types.listOf types.str;
+              default = [ ];
+              description = "Substrings of the download URL recorded in user.xdg.origin.url / referrer xattrs.";
+            };
+            magic = mkOption {
+              type = types.listOf types.str;
+              default = [ ];
+              description = "File signatures: ASCII prefix (\"%PDF\") or \"hex:89504e47\".";
+            };
+            catchAll = mkOption {
+              type = types.bool;
+              default = false;
+              description = "Allow this rule to have no other fields and match every file (otherwise such a rule is ignored).";
+            };
+          };
+        });
+      };
     };
 
     music = {
@@ -93,6 +178,50 @@ in
           ","
         ];
       };
+      tagCache = mkOption {
+        type = types.str;
+        default = "/home/doromiert/.cache/zenfs/music_tags.json";
+        description = "Persistent tag cache (keyed by file identity) so unchanged tracks are not re-parsed.";
+      };
+      mode = mkOption {
+        type = types.enum [
+          "links"
+          "fuse"
+        ];
+        default = "links";
+        description = "links: materialized hardlink/symlink forest. fuse: views served from memory by a FUSE mount at musicDir.";
+      };
+      playlists = mkOption {
+        type = types.bool;
+        default = true;
+        description = "Write M3U playlists per artist/album/genre to musicDir/Playlists (the library index is always written).";
+      };
+      preferCanonical = mkOption {
+        type = types.bool;
+        default = true;
+        description = "Show only one canonical file per group of duplicate tracks in the views (report: musicDir/.zenfs_duplicates.json).";
+      };
+      covers = {
+        enable = mkOption {
+          type = types.bool;
+          default = true;
+          description = "Extract embedded album art once per album and link cover.jpg/folder.jpg into album dirs.";
+        };
+        cacheDir = mkOption {
+          type = types.str;
+          default = "/home/doromiert/.cache/zenfs/covers";
+        };
+        maxSizeMB = mkOption {
+          type = types.int;
+          default = 256;
+          description = "LRU size limit of the cover cache (originals + thumbnails).";
+        };
+      };
+      tagWorkers = mkOption {
+        type = types.nullOr types.int;
+        default = null;
+        description = "Tag parser processes for cold scans (null = CPU count - 1, capped at 4).";
+      };
     };
 
     ml = {
@@ -108,6 +237,16 @@ in
           "$HOME/Documents"
         ];
       };
+      scanCache = mkOption {
+        type = types.str;
+        default = "/home/doromiert/.cache/zenfs/oracle_scan.json";
+        description = "Per-directory scan cache so each run only analyzes new or changed files.";
+      };
+      suggestionRetentionDays = mkOption {
+        type = types.int;
+        default = 30;
+        description = "Days to keep accepted/rejected suggestions before compaction drops them (pending ones are kept).";
+      };
     };
 
     offloader = {
@@ -116,14 +255,33 @@ in
         type = types.int;
         default = 80;
       };
+      compress = mkOption {
+        type = types.bool;
+        default = false;
+        description = ''
+          Store highly compressible cold files as zlib/lzma objects on roaming drives.
+          Compressed files are not readable in place: the original name is replaced by a
+          "<name>.zfz" link until `offloader.py recall <path>` restores it. Only files
+          under compressDirs are compressed, so keep those for archives nothing opens by name.
+        '';
+      };
+      compressDirs = mkOption {
+        type = types.listOf types.str;
+        default = [ "Archive" ];
+        description = "Directories (relative to each user's home) whose files may be compressed when compress is enabled.";
+      };
     };
   };
 
   config = mkIf (cfg.dumb.enable || cfg.music.enable || cfg.ml.enable || cfg.offloader.enable) {
 
-    # [ DUMB JANITOR ] (Stays Periodic)
+    # FUSE views must be readable by every user/player
+    programs.fuse.userAllowOther = mkIf (cfg.music.enable && cfg.music.mode == "fuse") true;
+
+    # [ DUMB JANITOR ] (Periodic, or a daemon with dumb.daemon)
     systemd.services.zenfs-janitor-dumb = mkIf cfg.dumb.enable {
       description = "ZenFS Dumb Janitor (Sorting Deck)";
+      wantedBy = mkIf cfg.dumb.daemon [ "multi-user.target" ];
       environment.JANITOR_CONFIG = "${janitorConfig}";
       environment.PYTHONPATH = "${zenfsScripts}/core";
       path = [
@@ -131,13 +289,16 @@ in
         pkgs.util-linux
       ];
       serviceConfig = {
-        Type = "oneshot";
+        Type = if cfg.dumb.daemon then "simple" else "oneshot";
+        Restart = mkIf cfg.dumb.daemon "on-failure";
         User = targetUser;
+        RuntimeDirectory = "zenfs-janitor-dumb"; # Throttle + rule metrics
+        RuntimeDirectoryPreserve = "yes"; # Timer mode exits after each sweep; keep the metrics readable
         ExecStart = "${janitorEnv}/bin/python3 ${zenfsScripts}/janitor/dumb.py";
       };
     };
 
-    systemd.timers.zenfs-janitor-dumb = mkIf cfg.dumb.enable {
+    systemd.timers.zenfs-janitor-dumb = mkIf (cfg.dumb.enable && !cfg.dumb.daemon) {
       wantedBy = [ "timers.target" ];
       timerConfig = {
         OnBootSec = "10m";
@@ -155,11 +316,13 @@ in
         pkgs.coreutils
         pkgs.libnotify
         pkgs.util-linux
+        pkgs.fuse # fusermount (mode = "fuse")
       ];
       serviceConfig = {
         Type = "simple"; # Long-running process
         Restart = "on-failure";
         User = targetUser;
+        RuntimeDirectory = "zenfs-janitor-music"; # Throttle metrics
         ExecStart = "${janitorEnv}/bin/python3 ${zenfsScripts}/janitor/music.py";
       };
     };
@@ -193,6 +356,11 @@ in
       description = "ZenFS Offloader (Storage Watchdog)";
       wantedBy = [ "multi-user.target" ];
       environment.PYTHONPATH = "${zenfsScripts}/core";
+      environment.ZENFS_THROTTLE_RATE = toString cfg.throttle.rateLimit;
+      environment.ZENFS_THROTTLE_PSI_HIGH = toString cfg.throttle.psiHigh;
+      environment.ZENFS_THROTTLE_PSI_LOW = toString cfg.throttle.psiLow;
+      environment.ZENFS_OFFLOAD_COMPRESS = if cfg.offloader.compress then "1" else "0";
+      environment.ZENFS_OFFLOAD_COMPRESS_DIRS = concatStringsSep ":" cfg.offloader.compressDirs;
       path = [
         pkgs.lsof
         pkgs.coreutils
@@ -202,6 +370,7 @@ in
         Type = "simple";
         Restart = "on-failure";
         User = targetUser;
+        RuntimeDirectory = "zenfs-offloader"; # Throttle metrics (throttle-offloader.json)
         ExecStart = "${janitorEnv}/bin/python3 ${zenfsScripts}/core/offloader.py";
       };
     };
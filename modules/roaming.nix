@@ -38,6 +38,39 @@ in
       default = "/Mount/Roaming";
       description = "Base directory for mounting roaming drives.";
     };
+
+    mountProfiles = mkOption {
+      type = types.attrsOf (types.listOf types.str);
+      default = { };
+      example = {
+        ext4 = [ "noatime,lazytime,commit=60" "noatime" ];
+      };
+      description = "Candidate mount option sets per filesystem type (overrides the built-in profiles). The first entry is the default.";
+    };
+
+    benchmarkMounts = mkOption {
+      type = types.bool;
+      default = true;
+      description = "Benchmark mount profile candidates on first attach and record the winner in drive.json.";
+    };
+
+    benchmarkDrives = mkOption {
+      type = types.bool;
+      default = true;
+      description = "Measure throughput on first attach and record a speed tier in drive.json (used for offload placement and scan concurrency).";
+    };
+
+    foreignVerdictTTL = mkOption {
+      type = types.int;
+      default = 3600;
+      description = ''
+        Seconds a drive rejected as foreign is skipped without mounting, for filesystems
+        where a re-mint elsewhere cannot be detected from the raw device (FAT12/16, exFAT,
+        NTFS). ext* and FAT32 drives are re-probed as soon as they are written to. A drive
+        minted on another machine within this window needs a replug after it expires,
+        or `zenfs-mint` on this machine.
+      '';
+    };
   };
 
   config = mkIf cfg.enable {
@@ -45,10 +78,20 @@ in
     # [ SERVICE ] The Nomad (Reconciler)
     systemd.services.zenfs-roaming = {
       description = "ZenFS Roaming (The Nomad)";
+      # Listens for block uevents itself; must be running before the first plug-in
+      wantedBy = [ "multi-user.target" ];
+      after = [ "systemd-udevd.service" ];
       path = [
         pkgs.libnotify
         pkgs.util-linux
+        pkgs.ntfs3g # big_writes profiles need the FUSE driver
       ];
+      environment = {
+        ZENFS_MOUNT_PROFILES = builtins.toJSON cfg.mountProfiles;
+        ZENFS_MOUNT_BENCHMARK = if cfg.benchmarkMounts then "1" else "0";
+        ZENFS_DRIVE_BENCHMARK = if cfg.benchmarkDrives then "1" else "0";
+        ZENFS_FOREIGN_TTL = toString cfg.foreignVerdictTTL;
+      };
       serviceConfig = {
         # [ FIX ] Changed to simple because the script is now a daemon (infinite loop)
         Type = "simple";
@@ -60,6 +103,7 @@ in
     };
 
     # [ UDEV ] Trigger on Block Device Events
+    # Only (re)starts the daemon if it is down; detection itself is netlink-driven.
     services.udev.extraRules = ''
       SUBSYSTEM=="block", ACTION=="add|remove", ENV{ID_FS_USAGE}=="filesystem", RUN+="${pkgs.systemd}/bin/systemctl start zenfs-roaming.service"
     '';
@@ -91,7 +91,8 @@ in
         Restart = "on-failure";
         # [ FIX ] Unbuffered I/O for instant logging
         Environment = "PYTHONUNBUFFERED=1";
-        ExecStart = "${pyEnv}/bin/python3 ${../scripts/core/indexer.py}";
+        # Whole scripts tree, so the Librarian can import its sibling modules (drive_bench)
+        ExecStart = "${pyEnv}/bin/python3 ${../scripts}/core/indexer.py";
       };
     };
 
@@ -0,0 +1,134 @@
+######
+# scripts/bench/conductor_bench.py
+######
+"""
+Conductor (music janitor) benchmark.
+
+Generates a synthetic tagged library (music_library_gen) in a temp dir and
+times the real music.py code paths:
+    cold        full build with empty tag/cover caches
+    warm        full rebuild, nothing changed
+    one_file    one track re-tagged: incremental update, then full rebuild
+    one_album   one album re-tagged: incremental update, then full rebuild
+Full builds are split into phases (scan = walk + tag parsing, write = link
+forest, swap = hot swap of the category dirs). Results are printed as JSON.
+
+    python3 conductor_bench.py --tracks 5000 --workers 4 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../janitor'))
+import music
+import music_library_gen
+from mutagen.easyid3 import EasyID3
+
+PHASES = {}
+
+def _timed(name, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            PHASES[name] = PHASES.get(name, 0.0) + time.perf_counter() - start
+    return wrapper
+
+def instrument():
+    music.scan_library = _timed("scan", music.scan_library)
+    music.ForestWriter.write = _timed("write", music.ForestWriter.write)
+    music.hot_swap = _timed("swap", music.hot_swap)
+    music.notify.send = lambda *args, **kwargs: None  # No desktop popups per run
+
+def full_build(config):
+    PHASES.clear()
+    start = time.perf_counter()
+    model = music.generate_forest(config)
+    result = {"total": round(time.perf_counter() - start, 4)}
+    result.update({k: round(v, 4) for k, v in PHASES.items()})
+    return model, result
+
+def incremental(config, model, changed):
+    start = time.perf_counter()
+    music.update_forest(config, model, changed, set())
+    return round(time.perf_counter() - start, 4)
+
+def retag(path, **tags):
+    audio = EasyID3(path)
+    for key, value in tags.items():
+        audio[key] = value
+    audio.save()
+
+def run(tracks, seed, workers, workdir):
+    music_dir = os.path.join(workdir, "Music")
+    db_root = os.path.join(music_dir, ".database")
+    config = {
+        "music_dir": music_dir,
+        "unsorted_dir": db_root,
+        "split_symbols": [";", ","],
+        "tag_cache": os.path.join(workdir, "cache", "tags.json"),
+        "cover_cache": os.path.join(workdir, "cache", "covers"),
+        "tag_workers": workers,
+    }
+    start = time.perf_counter()
+    paths = music_library_gen.generate(db_root, tracks, seed)
+    results = {
+        "tracks": len(paths),
+        "workers": music.tag_workers(config),
+        "generate_library": round(time.perf_counter() - start, 4),
+    }
+
+    model, results["cold"] = full_build(config)
+    model, results["warm"] = full_build(config)
+
+    # One file re-tagged
+    target = os.path.join(db_root, paths[len(paths) // 2])
+    retag(target, title="Bench Retitled")
+    results["one_file"] = {"incremental": incremental(config, model, {target})}
+    model, results["one_file"]["full"] = full_build(config)
+
+    # One album re-tagged (the largest album folder)
+    folders = {}
+    for rel in paths:
+        folders.setdefault(os.path.dirname(rel), []).append(rel)
+    album_dir = max(folders, key=lambda d: len(folders[d]))
+    for rel in folders[album_dir]:
+        retag(os.path.join(db_root, rel), album="Bench Renamed Album")
+    results["one_album"] = {
+        "tracks": len(folders[album_dir]),
+        "incremental": incremental(config, model, {os.path.join(db_root, album_dir)}),
+    }
+    model, results["one_album"]["full"] = full_build(config)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="ZenFS Conductor benchmark")
+    parser.add_argument("--tracks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Tag parser processes (default: music.py default)")
+    parser.add_argument("--workdir", help="Use this dir instead of a temp dir (kept afterwards)")
+    parser.add_argument("--output", help="Also write the JSON results here")
+    args = parser.parse_args()
+
+    instrument()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="zenfs-conductor-bench-")
+    try:
+        results = run(args.tracks, args.seed, args.workers, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+######
+# scripts/bench/music_library_gen.py
+######
+"""
+Synthetic tagged music library for Conductor benchmarks.
+
+Tracks are tiny but valid MPEG-1 Layer III streams (silent 128 kbps frames,
+so mutagen reports a real duration) with ID3 tags written through mutagen.
+The mix exercises the forest logic: multi-artist credits joined with the
+split symbols, tracks with missing title/album/artist, singles, and
+soundtrack genres / "OST" albums.
+
+    python3 music_library_gen.py /tmp/lib --tracks 5000
+"""
+import os
+import random
+import argparse
+from mutagen.easyid3 import EasyID3
+
+# [ CONSTANTS ]
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+FRAME_HEADER = b"\xff\xfb\x90\x00"
+FRAME_SIZE = 417
+FRAME = FRAME_HEADER + b"\x00" * (FRAME_SIZE - len(FRAME_HEADER))
+GENRES = ["Rock", "Pop", "Jazz", "Electronic", "Hip-Hop", "Classical", "Metal", "Folk"]
+SEPARATORS = ["; ", ", "]
+
+def write_track(path, frames, tags):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(FRAME * frames)
+    audio = EasyID3()
+    for key, value in tags.items():
+        if value: audio[key] = value
+    audio.save(path)
+
+def plan_library(tracks, seed=0, artists=None):
+    """Yields (relative path, frame count, tags) for a deterministic library."""
+    rng = random.Random(seed)
+    artist_count = artists or max(4, tracks // 40)
+    names = [f"Artist {i:04d}" for i in range(artist_count)]
+    produced = 0
+    album_no = 0
+    while produced < tracks:
+        artist = rng.choice(names)
+        album_no += 1
+        kind = rng.random()
+        if kind < 0.1:
+            album, genre = f"Game {album_no} OST", "Soundtrack"
+        elif kind < 0.2:
+            album, genre = None, rng.choice(GENRES)   # Singles
+        else:
+            album, genre = f"Album {album_no}", rng.choice(GENRES)
+        year = str(rng.randint(1970, 2025))
+        for n in range(1, min(rng.randint(1, 14), tracks - produced) + 1):
+            credit = artist
+            if rng.random() < 0.2:
+                guests = rng.sample(names, k=rng.randint(1, 2))
+                credit = rng.choice(SEPARATORS).join([artist] + guests)
+            tags = {
+                "title": f"Track {album_no}-{n}",
+                "artist": credit,
+                "albumartist": artist if album else None,
+                "album": album,
+                "date": year,
+                "genre": genre,
+                "tracknumber": str(n),
+            }
+            # Missing tags fall back to filename / "Unknown Artist" / Singles
+            roll = rng.random()
+            if roll < 0.03: tags["title"] = None
+            elif roll < 0.05: tags["artist"] = tags["albumartist"] = None
+            elif roll < 0.07: tags["album"] = None
+            folder = f"{artist}/{album or 'Singles'}"
+            produced += 1
+            yield f"{folder}/{produced:06d}.mp3", rng.randint(20, 60), tags
+
+def generate(root, tracks, seed=0):
+    """Writes the library under root. Returns the list of relative paths."""
+    paths = []
+    for rel, frames, tags in plan_library(tracks, seed):
+        write_track(os.path.join(root, rel), frames, tags)
+        paths.append(rel)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic tagged music library")
+    parser.add_argument("root")
+    parser.add_argument("--tracks", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = generate(args.root, args.tracks, args.seed)
+    print(f"Wrote {len(paths)} tracks to {args.root}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+######
+# scripts/bench/offload_sim.py
+######
+"""
+Offload policy simulator.
+
+Replays a trace of file events against an in-memory model of the root disk and
+roaming drives, driving the real offloader.should_offload / pick_target_drive
+policy with the real queue semantics (a file is processed once, on the first
+CHECK_INTERVAL tick after it is closed; if the disk is healthy at that moment
+it is dropped from the queue and never offloaded).
+
+Trace format (JSON lines, sorted by t):
+    {"t": 12.5, "op": "create", "path": "u/Downloads/a.iso", "size": 4294967296}
+    {"t": 80.0, "op": "access", "path": "u/Downloads/a.iso"}
+    {"t": 99.0, "op": "delete", "path": "u/Downloads/a.iso"}
+"""
+import os
+import sys
+import json
+import heapq
+import random
+import argparse
+
+# Import the real Offloader policy
+sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
+import offloader
+
+# [ CONFIG ]
+GIB = 1024 ** 3
+OFFLOAD_BUFFER = 1024   # Mirrors offload_file(): file_size + 1024
+OPEN_SECONDS = 5        # Simulated time a new file stays open (lsof busy)
+
+class Disk:
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self.used = 0
+
+    @property
+    def free(self):
+        return self.capacity - self.used
+
+    @property
+    def usage(self):
+        return (self.used / self.capacity) * 100 if self.capacity else 0
+
+class Simulation:
+    def __init__(self, root_capacity, root_used, drives, threshold, interval):
+        self.root = Disk("/", root_capacity)
+        self.root.used = root_used
+        self.drives = {name: Disk(name, cap) for name, cap, _ in drives}
+        self.tiers = {name: tier for name, _, tier in drives if tier}
+        self.threshold = threshold
+        self.interval = interval
+
+        self.files = {}     # path -> {"size", "location"}
+        self.pending = {}   # path -> time the file was closed
+
+        self.stats = {
+            "bytes_moved": 0,
+            "files_moved": 0,
+            "offload_failures": 0,
+            "recall_misses": 0,
+            "recall_miss_bytes": 0,
+            "accesses": 0,
+            "root_overflows": 0,
+            "peak_usage": self.root.usage,
+            "time_above_threshold": 0.0,
+        }
+        self.clock = 0.0
+
+    def _advance(self, t):
+        """Integrates time-above-threshold up to `t`."""
+        if t <= self.clock:
+            return
+        if self.root.usage >= self.threshold:
+            self.stats["time_above_threshold"] += t - self.clock
+        self.clock = t
+
+    def _track_peak(self):
+        self.stats["peak_usage"] = max(self.stats["peak_usage"], self.root.usage)
+
+    def create(self, path, size):
+        if path in self.files:
+            self.delete(path)
+        if size > self.root.free:
+            self.stats["root_overflows"] += 1
+            return
+        self.root.used += size
+        self.files[path] = {"size": size, "location": "root"}
+        self.pending[path] = self.clock + OPEN_SECONDS
+        self._track_peak()
+
+    def access(self, path):
+        f = self.files.get(path)
+        if not f:
+            return
+        self.stats["accesses"] += 1
+        if f["location"] != "root":
+            self.stats["recall_misses"] += 1
+            self.stats["recall_miss_bytes"] += f["size"]
+
+    def delete(self, path):
+        f = self.files.pop(path, None)
+        self.pending.pop(path, None)
+        if not f:
+            return
+        disk = self.root if f["location"] == "root" else self.drives[f["location"]]
+        disk.used -= f["size"]
+
+    def tick(self):
+        """One process_queue() pass using the real policy functions."""
+        for path in list(self.pending):
+            if self.pending[path] > self.clock:
+                continue  # Still open
+            f = self.files[path]
+            if not offloader.should_offload(self.root.usage):
+                del self.pending[path]  # "Processed" (ignored)
+                continue
+            candidates = [(d.free, name) for name, d in self.drives.items()]
+            target = offloader.pick_target_drive(candidates, f["size"] + OFFLOAD_BUFFER, self.tiers)
+            if not target:
+                self.stats["offload_failures"] += 1
+                continue  # Retry next tick
+            self.root.used -= f["size"]
+            self.drives[target].used += f["size"]
+            f["location"] = target
+            self.stats["bytes_moved"] += f["size"]
+            self.stats["files_moved"] += 1
+            del self.pending[path]
+
+    def run(self, events):
+        next_tick = self.interval
+        for event in events:
+            t = event["t"]
+            while next_tick <= t:
+                self._advance(next_tick)
+                self.tick()
+                next_tick += self.interval
+            self._advance(t)
+            op = event["op"]
+            if op == "create":
+                self.create(event["path"], int(event["size"]))
+            elif op == "access":
+                self.access(event["path"])
+            elif op == "delete":
+                self.delete(event["path"])
+        # Drain the queue
+        self._advance(next_tick)
+        self.tick()
+        return self.report()
+
+    def report(self):
+        stats = dict(self.stats)
+        stats["peak_usage"] = round(stats["peak_usage"], 2)
+        stats["time_above_threshold"] = round(stats["time_above_threshold"], 1)
+        stats["duration"] = round(self.clock, 1)
+        stats["final_usage"] = round(self.root.usage, 2)
+        stats["drives"] = {name: round(d.usage, 2) for name, d in self.drives.items()}
+        stats["policy"] = {"threshold": self.threshold, "check_interval": self.interval}
+        return stats
+
+def load_trace(path):
+    with open(path, 'r') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e["t"])
+    return events
+
+def synthetic_trace(count, seed=0, duration=86400):
+    """
+    Generates a day of activity: heavy-tailed file sizes (documents to ISOs),
+    recency-biased re-accesses and occasional cleanups.
+    """
+    rng = random.Random(seed)
+    heap = []
+    seq = 0  # Tie-breaker so events never compare as dicts
+
+    def push(event):
+        nonlocal seq
+        heapq.heappush(heap, (event["t"], seq, event))
+        seq += 1
+
+    for i in range(count):
+        t = rng.uniform(0, duration)
+        size = int(min(rng.lognormvariate(16, 2.5), 16 * GIB))
+        path = f"user/Downloads/file_{i}.bin"
+        push({"t": t, "op": "create", "path": path, "size": size})
+        # Recency-biased accesses: most re-reads happen soon after creation
+        for _ in range(rng.randint(0, 3)):
+            dt = rng.expovariate(1 / 3600)
+            push({"t": t + dt, "op": "access", "path": path})
+        if rng.random() < 0.2:
+            dt = rng.uniform(60, duration)
+            push({"t": t + dt, "op": "delete", "path": path})
+    return [heapq.heappop(heap)[2] for _ in range(len(heap))]
+
+def parse_drive(spec):
+    """name:capacity_gib[:tier]"""
+    name, cap, *tier = spec.split(":")
+    return name, int(float(cap) * GIB), (tier[0] if tier else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="ZenFS Offloader policy simulator")
+    parser.add_argument("--trace", help="JSON-lines trace to replay")
+    parser.add_argument("--synthetic", type=int, default=2000, help="Synthetic file count (no --trace)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root-size", type=float, default=256, help="Root disk size (GiB)")
+    parser.add_argument("--root-used", type=float, default=150, help="Initial root usage (GiB)")
+    parser.add_argument("--drive", action="append", type=parse_drive, default=[],
+                        help="Roaming drive as name:size_gib[:tier] (repeatable)")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[offloader.THRESHOLD_PERCENT])
+    parser.add_argument("--interval", type=float, nargs="+", default=[offloader.CHECK_INTERVAL])
+    args = parser.parse_args()
+
+    events = load_trace(args.trace) if args.trace else synthetic_trace(args.synthetic, args.seed)
+    drives = args.drive or [("usb", 64 * GIB, "slow"), ("nvme", 512 * GIB, "fast")]
+
+    # Sweep every threshold/interval combination against the same trace
+    results = []
+    for threshold in args.threshold:
+        for interval in args.interval:
+            offloader.THRESHOLD_PERCENT = threshold
+            offloader.CHECK_INTERVAL = interval
+            sim = Simulation(
+                int(args.root_size * GIB), int(args.root_used * GIB),
+                drives, threshold, interval
+            )
+            results.append(sim.run(events))
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
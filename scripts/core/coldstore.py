@@ -0,0 +1,162 @@
+######
+# scripts/core/coldstore.py
+######
+"""
+Compressed cold tier for offloaded files.
+
+An object ("<name>.zfz") is a ZFZ1 header (codec, original name/size/mtime,
+sha256) followed by the zlib/lzma stream. Objects are NOT readable in place:
+the offloader shadows them as "<file>.zfz" links (never under the original
+name), and every reader must restore the file with `offloader.py recall`
+(offloader.rehydrate) first.
+"""
+import os
+import json
+import zlib
+import lzma
+import shutil
+import struct
+import hashlib
+
+# [ CONFIG ]
+OBJECT_SUFFIX = ".zfz"
+MAGIC = b"ZFZ1"
+SAMPLE_SIZE = 64 * 1024     # Bytes per probe sample (head, middle, tail)
+CHUNK_SIZE = 1024 * 1024
+MIN_SIZE = 256 * 1024       # Below this the header + probe is not worth it
+STORE_RATIO = 0.80          # Probe ratio above this -> store raw
+LZMA_RATIO = 0.30           # Probe ratio below this -> lzma (text-like data)
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+
+# Formats that are already compressed; never probed
+COMPRESSED_EXTENSIONS = {
+    'zip', 'gz', 'tgz', 'bz2', 'xz', 'txz', 'zst', 'lz4', 'lzma', '7z', 'rar', 'zfz',
+    'jpg', 'jpeg', 'png', 'webp', 'gif', 'heic', 'avif', 'jxl',
+    'mp3', 'flac', 'ogg', 'opus', 'm4a', 'aac',
+    'mp4', 'mkv', 'webm', 'mov', 'avi',
+    'pdf', 'docx', 'xlsx', 'pptx', 'odt', 'ods', 'epub',
+    'deb', 'rpm', 'apk', 'jar', 'whl', 'iso', 'squashfs', 'appimage',
+}
+
+def is_compressed_type(path):
+    return os.path.splitext(path)[1].lower().strip('.') in COMPRESSED_EXTENSIONS
+
+def is_object(path):
+    return path.endswith(OBJECT_SUFFIX)
+
+def probe(path, size=None):
+    """
+    Compresses a small sample of the file with fast zlib and picks a codec.
+    Returns "lzma", "zlib" or None (store raw).
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    if size < MIN_SIZE or is_compressed_type(path):
+        return None
+    sample = b""
+    try:
+        with open(path, 'rb') as f:
+            for offset in (0, size // 2, max(0, size - SAMPLE_SIZE)):
+                f.seek(offset)
+                sample += f.read(SAMPLE_SIZE)
+    except OSError:
+        return None
+    if not sample:
+        return None
+    ratio = len(zlib.compress(sample, 1)) / len(sample)
+    if ratio > STORE_RATIO:
+        return None
+    return "lzma" if ratio < LZMA_RATIO else "zlib"
+
+def _compressor(codec):
+    if codec == "lzma":
+        return lzma.LZMACompressor(preset=LZMA_PRESET)
+    return zlib.compressobj(ZLIB_LEVEL)
+
+def _decompressor(codec):
+    if codec == "lzma":
+        return lzma.LZMADecompressor()
+    return zlib.decompressobj()
+
+def _write_header(f, meta):
+    blob = json.dumps(meta).encode()
+    f.write(MAGIC + struct.pack(">I", len(blob)) + blob)
+
+def read_header(f):
+    """Reads the object header. Returns the metadata dict; `f` is left at the payload."""
+    if f.read(4) != MAGIC:
+        raise ValueError("Not a ZenFS cold object")
+    (length,) = struct.unpack(">I", f.read(4))
+    return json.loads(f.read(length))
+
+def compress_file(src, dest, codec, governor=None):
+    """
+    Writes `src` into a compressed object at `dest`.
+    Metadata (original name, size, sha256, mtime) is stored in the header; the hash
+    is patched in after streaming so the source is only read once.
+    """
+    st = os.stat(src)
+    h = hashlib.sha256()
+    meta = {
+        "codec": codec,
+        "name": os.path.basename(src),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": "0" * 64,
+    }
+    comp = _compressor(codec)
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
+        _write_header(fdst, meta)
+        while True:
+            chunk = fsrc.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+            out = comp.compress(chunk)
+            if governor:
+                governor.acquire(len(out))
+            fdst.write(out)
+        fdst.write(comp.flush())
+
+        # Patch hash into the fixed-width header slot (same length as the placeholder)
+        meta["sha256"] = h.hexdigest()
+        fdst.seek(0)
+        _write_header(fdst, meta)
+    shutil.copystat(src, dest)
+    return meta
+
+def decompress_file(obj, dest, governor=None):
+    """Restores an object to `dest`, verifying size and hash. Returns the metadata."""
+    h = hashlib.sha256()
+    written = 0
+    with open(obj, 'rb') as fsrc:
+        meta = read_header(fsrc)
+        decomp = _decompressor(meta["codec"])
+        with open(dest, 'wb') as fdst:
+            while True:
+                chunk = fsrc.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if governor:
+                    governor.acquire(len(chunk))
+                out = decomp.decompress(chunk)
+                h.update(out)
+                written += len(out)
+                fdst.write(out)
+            if meta["codec"] == "zlib":
+                out = decomp.flush()
+                h.update(out)
+                written += len(out)
+                fdst.write(out)
+    if written != meta["size"] or h.hexdigest() != meta["sha256"]:
+        os.remove(dest)
+        raise ValueError(f"Cold object {obj} failed verification")
+    shutil.copymode(obj, dest)
+    os.utime(dest, (meta["mtime"], meta["mtime"]))
+    return meta
+
+def object_info(obj):
+    """Returns header metadata without decompressing."""
+    with open(obj, 'rb') as f:
+        return read_header(f)
@@ -0,0 +1,290 @@
+######
+# scripts/core/dedup.py
+######
+import os
+import json
+import time
+import socket
+import hashlib
+import threading
+
+# [ CONFIG ]
+INDEX_REL_PATH = "System/ZenFS/content_index.json"
+OBJECTS_REL_PATH = "System/ZenFS/Objects"  # Read-only shared copies, named by full hash
+MACHINE_ID_PATH = "/etc/machine-id"
+INDEX_VERSION = 1
+PARTIAL_BLOCK = 64 * 1024   # Bytes hashed from head and tail for the partial hash
+HASH_CHUNK = 1024 * 1024
+MIN_DEDUP_SIZE = 1024 * 1024  # Small files are not worth the hashing
+RESCAN_INTERVAL = 3600      # Seconds before a drive's size map is re-walked
+
+def partial_hash(path, size=None):
+    """Hash of size + first and last PARTIAL_BLOCK bytes. Cheap second-stage filter."""
+    if size is None:
+        size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(PARTIAL_BLOCK))
+        if size > PARTIAL_BLOCK * 2:
+            f.seek(-PARTIAL_BLOCK, os.SEEK_END)
+            h.update(f.read(PARTIAL_BLOCK))
+    return h.hexdigest()
+
+def full_hash(path):
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+class DriveIndex:
+    """
+    Content-addressed index of one roaming drive's Users tree and shared objects.
+    Stage 1: size map (stat only). Stage 2: partial hash. Stage 3: full hash.
+    Hashes are computed lazily and persisted, keyed by (size, mtime_ns) so they
+    survive restarts until the file changes.
+    """
+
+    def __init__(self, drive_root):
+        self.drive_root = drive_root
+        self.index_path = os.path.join(drive_root, INDEX_REL_PATH)
+        self.entries = {}   # rel_path -> {size, mtime_ns, partial, full}
+        self.refs = {}      # object rel_path -> [[host, shadow path]] ("" host: drive-relative link)
+        self.by_size = {}   # size -> set(rel_path)
+        self.last_scan = None
+        self.dirty = False
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("files", {})
+                self.refs = data.get("objects", {})
+        except (OSError, ValueError):
+            self.entries = {}
+            self.refs = {}
+        self._rebuild_size_map()
+
+    def _rebuild_size_map(self):
+        self.by_size = {}
+        for rel, entry in self.entries.items():
+            self.by_size.setdefault(entry["size"], set()).add(rel)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = f"{self.index_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump({"version": INDEX_VERSION, "files": self.entries, "objects": self.refs}, f)
+            os.replace(tmp, self.index_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"[Dedup] Failed to save index for {self.drive_root}: {e}")
+
+    def scan(self):
+        """Re-walks the Users tree and objects. Stat only; known hashes are kept if (size, mtime_ns) match."""
+        fresh = {}
+        for dirpath, dirnames, filenames in self._walk():
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                if name.startswith('.'):
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full, follow_symlinks=False)
+                except OSError:
+                    continue
+                if not os.path.isfile(full) or os.path.islink(full) or st.st_size < MIN_DEDUP_SIZE:
+                    continue
+                rel = os.path.relpath(full, self.drive_root)
+                old = self.entries.get(rel)
+                if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                    fresh[rel] = old
+                else:
+                    fresh[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        with self.lock:
+            if fresh != self.entries:
+                self.dirty = True
+            self.entries = fresh
+            self._rebuild_size_map()
+            self.last_scan = time.monotonic()
+        self.sweep()
+
+    def _walk(self):
+        for top in ("Users", OBJECTS_REL_PATH):
+            yield from os.walk(os.path.join(self.drive_root, top))
+
+    def _entry_hash(self, rel, entry, kind):
+        """Returns the cached hash of `kind` for an entry, computing it if needed."""
+        if kind in entry:
+            return entry[kind]
+        full = os.path.join(self.drive_root, rel)
+        try:
+            st = os.stat(full)
+            if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+                return None  # Changed behind our back; next scan will refresh it
+            value = partial_hash(full, st.st_size) if kind == "partial" else full_hash(full)
+        except OSError:
+            return None
+        entry[kind] = value
+        self.dirty = True
+        return value
+
+    def find(self, path, size, hashes):
+        """
+        Returns the rel path of a byte-identical copy of `path` on this drive, or None.
+        `hashes` is a per-source cache dict shared across drives.
+        """
+        if self.last_scan is None or time.monotonic() - self.last_scan > RESCAN_INTERVAL:
+            self.scan()
+        with self.lock:
+            candidates = list(self.by_size.get(size, ()))
+        if not candidates:
+            return None
+
+        if "partial" not in hashes:
+            hashes["partial"] = partial_hash(path, size)
+        partial_matches = []
+        for rel in candidates:
+            entry = self.entries.get(rel)
+            if entry and self._entry_hash(rel, entry, "partial") == hashes["partial"]:
+                partial_matches.append(rel)
+        if not partial_matches:
+            return None
+
+        if "full" not in hashes:
+            hashes["full"] = full_hash(path)
+        for rel in partial_matches:
+            entry = self.entries.get(rel)
+            if entry and self._entry_hash(rel, entry, "full") == hashes["full"]:
+                return rel
+        return None
+
+    def add(self, rel, hashes=None):
+        """Records a file newly placed on the drive (e.g. by the Offloader)."""
+        full = os.path.join(self.drive_root, rel)
+        try:
+            st = os.stat(full)
+        except OSError:
+            return
+        if st.st_size < MIN_DEDUP_SIZE:
+            return
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        for kind in ("partial", "full"):
+            if hashes and kind in hashes:
+                entry[kind] = hashes[kind]
+        with self.lock:
+            self.entries[rel] = entry
+            self.by_size.setdefault(st.st_size, set()).add(rel)
+            self.dirty = True
+
+    def remove(self, rel):
+        with self.lock:
+            entry = self.entries.pop(rel, None)
+            if entry is not None:
+                self.by_size.get(entry["size"], set()).discard(rel)
+                self.dirty = True
+
+    # [ SHARED OBJECTS ]
+    def ref(self, object_rel, shadow_path):
+        """Records a shadow of a shared object. Links on the drive itself are stored drive-relative."""
+        if shadow_path.startswith(self.drive_root + os.sep):
+            ref = ["", os.path.relpath(shadow_path, self.drive_root)]
+        else:
+            ref = [host_id(), shadow_path]
+        with self.lock:
+            refs = self.refs.setdefault(object_rel, [])
+            if ref not in refs:
+                refs.append(ref)
+                self.dirty = True
+
+    def _live(self, object_path, ref):
+        host, path = ref
+        if not host:
+            path = os.path.join(self.drive_root, path)
+        elif host != host_id():
+            return True     # Another machine's shadow: only that machine can tell
+        try:
+            target = os.readlink(path)
+        except OSError:
+            return False
+        return os.path.normpath(os.path.join(os.path.dirname(path), target)) == os.path.normpath(object_path)
+
+    def sweep(self):
+        """
+        Drops refs whose shadow is gone or no longer points at its object (deleted,
+        recalled, or replaced by an editor's save), and deletes unreferenced objects.
+        """
+        with self.lock:
+            refs = {rel: list(r) for rel, r in self.refs.items()}
+        for object_rel, object_refs in refs.items():
+            object_path = os.path.join(self.drive_root, object_rel)
+            live = [r for r in object_refs if self._live(object_path, r)]
+            if live == object_refs:
+                continue
+            with self.lock:
+                if live:
+                    self.refs[object_rel] = live
+                else:
+                    del self.refs[object_rel]
+                self.dirty = True
+            if not live:
+                try: os.remove(object_path)
+                except OSError: pass
+                self.remove(object_rel)
+                print(f"[Dedup] Released unreferenced object {object_rel}")
+        self.save()
+
+def object_rel(full):
+    """Drive-relative path of the shared object holding content with this full hash."""
+    return os.path.join(OBJECTS_REL_PATH, full[:2], full)
+
+def host_id():
+    """Stable id of this machine (shadows live on its root fs, not on the drive)."""
+    try:
+        with open(MACHINE_ID_PATH, 'r') as f:
+            return f.read().strip() or socket.gethostname()
+    except OSError:
+        return socket.gethostname()
+
+# Cache of open indexes (drive_root -> DriveIndex)
+_indexes = {}
+
+def get_index(drive_root):
+    index = _indexes.get(drive_root)
+    if index is None:
+        index = DriveIndex(drive_root)
+        _indexes[drive_root] = index
+    return index
+
+def find_duplicate(path, drive_roots):
+    """
+    Searches the given drives for a byte-identical copy of `path`.
+    Returns (drive_root, rel_path, hashes) or (None, None, hashes).
+    """
+    hashes = {}
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None, None, hashes
+    if size < MIN_DEDUP_SIZE:
+        return None, None, hashes
+    for drive_root in drive_roots:
+        index = get_index(drive_root)
+        try:
+            rel = index.find(path, size, hashes)
+        except OSError:
+            rel = None
+        index.save()
+        if rel:
+            return drive_root, rel, hashes
+    return None, None, hashes
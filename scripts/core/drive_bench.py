@@ -0,0 +1,152 @@
+######
+# scripts/core/drive_bench.py
+######
+"""
+Drive throughput benchmark + tier classification (runs once per drive).
+
+Non-destructive: everything happens in a scratch file under
+System/ZenFS/.bench, which is deleted afterwards. Each phase is bounded by
+both a byte budget and a time budget, so a dying USB 2.0 stick costs a few
+seconds at most. Results land in drive.json under "performance".
+"""
+import os
+import json
+import time
+import random
+
+# [ CONSTANTS ]
+BENCH_REL_DIR = "System/ZenFS/.bench"
+IDENTITY_REL_PATH = "System/ZenFS/drive.json"
+BENCH_VERSION = 1
+SEQ_SIZE = 64 * 1024 * 1024     # Sequential phase byte budget
+SEQ_CHUNK = 1024 * 1024
+RAND_BLOCK = 4096
+RAND_OPS = 512
+FSYNC_OPS = 16
+PHASE_BUDGET = 4.0              # Seconds per phase
+
+# Tier thresholds: (name, min seq read MB/s, min 4K random read IOPS)
+TIERS = [
+    ("fast", 300, 3000),        # NVMe / SATA SSD enclosures
+    ("standard", 60, 300),      # USB 3 flash, spinning disks
+    ("slow", 0, 0),             # USB 2.0 sticks, SD cards
+]
+TIER_RANK = {"fast": 0, "standard": 1, "slow": 2}
+
+def _drop_cache(fd):
+    # Evict the file from the page cache so reads hit the device
+    try: os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except (AttributeError, OSError): pass
+
+def _seq_write(path):
+    chunk = os.urandom(SEQ_CHUNK)
+    written = 0
+    start = time.perf_counter()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        while written < SEQ_SIZE and time.perf_counter() - start < PHASE_BUDGET:
+            written += os.write(fd, chunk)
+        os.fsync(fd)
+        elapsed = time.perf_counter() - start
+        _drop_cache(fd)
+    finally:
+        os.close(fd)
+    return written, elapsed
+
+def _seq_read(path):
+    read = 0
+    start = time.perf_counter()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        while time.perf_counter() - start < PHASE_BUDGET:
+            data = os.read(fd, SEQ_CHUNK)
+            if not data: break
+            read += len(data)
+        _drop_cache(fd)
+    finally:
+        os.close(fd)
+    return read, time.perf_counter() - start
+
+def _rand_read(path, size):
+    blocks = max(1, size // RAND_BLOCK)
+    rng = random.Random(0)
+    ops = 0
+    start = time.perf_counter()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        while ops < RAND_OPS and time.perf_counter() - start < PHASE_BUDGET:
+            os.pread(fd, RAND_BLOCK, rng.randrange(blocks) * RAND_BLOCK)
+            ops += 1
+    finally:
+        os.close(fd)
+    return ops, time.perf_counter() - start
+
+def _fsync_latency(bench_dir):
+    path = os.path.join(bench_dir, "fsync")
+    payload = os.urandom(RAND_BLOCK)
+    samples = []
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        budget_start = time.perf_counter()
+        for _ in range(FSYNC_OPS):
+            if time.perf_counter() - budget_start > PHASE_BUDGET: break
+            os.write(fd, payload)
+            start = time.perf_counter()
+            os.fsync(fd)
+            samples.append(time.perf_counter() - start)
+    finally:
+        os.close(fd)
+    samples.sort()
+    return samples[len(samples) // 2] if samples else None
+
+def classify(seq_read_mbps, rand_iops):
+    for name, min_seq, min_iops in TIERS:
+        if seq_read_mbps >= min_seq and rand_iops >= min_iops:
+            return name
+    return "slow"
+
+def run(drive_root):
+    """Benchmarks a mounted drive. Returns the performance dict."""
+    bench_dir = os.path.join(drive_root, BENCH_REL_DIR)
+    os.makedirs(bench_dir, exist_ok=True)
+    data_file = os.path.join(bench_dir, "seq")
+    try:
+        w_bytes, w_time = _seq_write(data_file)
+        r_bytes, r_time = _seq_read(data_file)
+        ops, o_time = _rand_read(data_file, w_bytes)
+        fsync_s = _fsync_latency(bench_dir)
+    finally:
+        for name in ("seq", "fsync"):
+            try: os.remove(os.path.join(bench_dir, name))
+            except OSError: pass
+        try: os.rmdir(bench_dir)
+        except OSError: pass
+
+    mb = 1024 * 1024
+    seq_write = w_bytes / mb / w_time if w_time else 0
+    seq_read = r_bytes / mb / r_time if r_time else 0
+    iops = ops / o_time if o_time else 0
+    return {
+        "version": BENCH_VERSION,
+        "seq_write_mbps": round(seq_write, 1),
+        "seq_read_mbps": round(seq_read, 1),
+        "rand_read_4k_iops": round(iops),
+        "fsync_ms": round(fsync_s * 1000, 2) if fsync_s is not None else None,
+        "tier": classify(seq_read, iops),
+        "measured_at": time.time(),
+    }
+
+def load_performance(drive_root):
+    """Reads the recorded benchmark from a drive's drive.json (None if never measured)."""
+    try:
+        with open(os.path.join(drive_root, IDENTITY_REL_PATH), 'r') as f:
+            perf = json.load(f).get("performance")
+        if perf and perf.get("version") == BENCH_VERSION:
+            return perf
+    except (OSError, ValueError):
+        pass
+    return None
+
+def get_tier(drive_root, default="standard"):
+    perf = load_performance(drive_root)
+    return perf.get("tier", default) if perf else default
@@ -0,0 +1,59 @@
+######
+# scripts/core/handoff.py
+######
+"""
+Direct Nomad -> Librarian notifications over a Unix datagram socket.
+The Nomad announces attached/detached drives; the Librarian picks them up
+immediately instead of waiting for its mount poll. Sending never blocks and
+never fails loudly: if the Librarian is down, its startup scan covers it.
+"""
+import os
+import json
+import socket
+
+# [ CONSTANTS ]
+SOCKET_PATH = os.environ.get("ZENFS_HANDOFF_SOCKET", "/run/zenfs/librarian.sock")
+
+def send(event, **payload):
+    message = dict(payload, event=event)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(json.dumps(message).encode(), SOCKET_PATH)
+        return True
+    except OSError:
+        return False
+
+def listen():
+    """Binds the Librarian end. Returns the socket, or None if it cannot be created."""
+    try:
+        os.makedirs(os.path.dirname(SOCKET_PATH), exist_ok=True)
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(SOCKET_PATH)
+        os.chmod(SOCKET_PATH, 0o600)
+        return sock
+    except OSError as e:
+        print(f"[Handoff] Cannot listen on {SOCKET_PATH}: {e}")
+        return None
+
+def receive(sock, timeout):
+    """Waits up to `timeout` seconds. Returns the list of decoded messages (possibly empty)."""
+    messages = []
+    sock.settimeout(timeout)
+    try:
+        data = sock.recv(65536)
+    except (socket.timeout, OSError):
+        return messages
+    sock.setblocking(False)
+    while data:
+        try:
+            messages.append(json.loads(data))
+        except ValueError:
+            pass
+        try:
+            data = sock.recv(65536)
+        except (BlockingIOError, OSError):
+            data = None
+    return messages
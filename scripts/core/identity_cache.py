@@ -0,0 +1,154 @@
+######
+# scripts/core/identity_cache.py
+######
+"""
+Persistent Nomad verdicts, so drives are not mount-probed over and over.
+
+Key: filesystem UUID. Each entry carries a fingerprint (size in sectors,
+fstype, label, and a write generation: the superblock write time + mount
+count for ext*, the FSInfo free-cluster count + next-free hint for FAT32).
+A changed fingerprint means the filesystem was touched elsewhere (possibly
+minted), so the cached verdict is ignored and the drive is probed again.
+"""
+import os
+import json
+import time
+import struct
+import threading
+
+# [ CONSTANTS ]
+CACHE_FILE = "/System/ZenFS/Database/identity_cache.json"
+SYS_BLOCK = "/sys/class/block"
+EXT_TYPES = {"ext2", "ext3", "ext4"}
+FAT_TYPES = {"vfat", "msdos"}
+# Without a write generation (FAT12/16, exFAT, NTFS...) a drive minted elsewhere
+# keeps its fingerprint, so "foreign" verdicts for those expire after this
+FOREIGN_TTL = int(os.environ.get("ZENFS_FOREIGN_TTL", 3600))
+
+_lock = threading.Lock()
+_cache = None
+_cache_mtime = None
+
+def _load():
+    """Loads the cache, re-reading it if another process (zenfs-mint) rewrote it."""
+    global _cache, _cache_mtime
+    try:
+        mtime = os.stat(CACHE_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _cache is None or mtime != _cache_mtime:
+        try:
+            with open(CACHE_FILE, 'r') as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+        _cache_mtime = mtime
+    return _cache
+
+def _save():
+    global _cache_mtime
+    tmp = f"{CACHE_FILE}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(tmp, 'w') as f:
+            json.dump(_cache, f, indent=2)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, CACHE_FILE)
+        _cache_mtime = os.stat(CACHE_FILE).st_mtime_ns
+    except OSError as e:
+        print(f"[Nomad] Failed to write identity cache: {e}")
+
+def _ext_generation(dev_name):
+    """Reads s_wtime + s_mnt_count from an ext superblock without mounting."""
+    try:
+        with open(f"/dev/{dev_name}", 'rb') as f:
+            f.seek(1024)
+            sb = f.read(0x3A)
+        if len(sb) < 0x3A or struct.unpack_from("<H", sb, 0x38)[0] != 0xEF53:
+            return None
+        wtime = struct.unpack_from("<I", sb, 0x30)[0]
+        mnt_count = struct.unpack_from("<H", sb, 0x34)[0]
+        return f"{wtime}:{mnt_count}"
+    except OSError:
+        return None
+
+def _fat_generation(dev_name):
+    """
+    Reads the FAT32 FSInfo free-cluster count + next-free hint without mounting.
+    Minting writes System/ZenFS/drive.json, which allocates clusters and changes both.
+    """
+    try:
+        with open(f"/dev/{dev_name}", 'rb') as f:
+            boot = f.read(512)
+            if len(boot) < 512 or boot[82:90] != b"FAT32   ":
+                return None
+            sector_size, = struct.unpack_from("<H", boot, 11)
+            fsinfo, = struct.unpack_from("<H", boot, 48)
+            f.seek(fsinfo * sector_size)
+            info = f.read(512)
+        if len(info) < 500 or info[:4] != b"RRaA" or info[484:488] != b"rrAa":
+            return None
+        free, next_free = struct.unpack_from("<II", info, 488)
+        return f"{free}:{next_free}"
+    except (OSError, struct.error):
+        return None
+
+def fingerprint(dev_name, fstype, label=None):
+    try:
+        with open(os.path.join(SYS_BLOCK, dev_name, "size"), 'r') as f:
+            sectors = f.read().strip()
+    except OSError:
+        sectors = "?"
+    generation = None
+    if fstype in EXT_TYPES:
+        generation = _ext_generation(dev_name)
+    elif fstype in FAT_TYPES:
+        generation = _fat_generation(dev_name)
+    return f"{sectors}|{fstype}|{label or ''}|{generation or ''}"
+
+def _coarse(fp):
+    """Fingerprint without the ext generation (which our own mounts bump)."""
+    return fp.rsplit("|", 1)[0]
+
+def lookup(fs_uuid, fp):
+    """
+    Returns the cached verdict dict if the fingerprint still matches, else None.
+    Foreign verdicts need the full fingerprint, and expire after FOREIGN_TTL when
+    the fingerprint carries no write generation. Roaming verdicts only need the
+    coarse one, since they are re-validated after mounting anyway.
+    """
+    with _lock:
+        entry = _load().get(fs_uuid)
+    if not entry:
+        return None
+    if entry.get("verdict") == "roaming":
+        return entry if _coarse(entry.get("fingerprint", "")) == _coarse(fp) else None
+    if entry.get("fingerprint") != fp:
+        return None
+    if not fp.rsplit("|", 1)[-1] and time.time() - entry.get("checked_at", 0) > FOREIGN_TTL:
+        return None
+    return entry
+
+def remember(fs_uuid, fp, verdict, dev_name=None, zen_id=None, reason=None, mount_options=None):
+    """Stores a verdict: "roaming" (valid ZenFS drive) or "foreign"."""
+    with _lock:
+        _load()[fs_uuid] = {
+            "fingerprint": fp,
+            "verdict": verdict,
+            "zen_id": zen_id,
+            "reason": reason,
+            "device": dev_name,
+            "mount_options": mount_options,
+            "checked_at": time.time(),
+        }
+        _save()
+
+def invalidate(fs_uuid=None):
+    """Drops one verdict (or all of them). Called by zenfs-mint after minting."""
+    with _lock:
+        cache = _load()
+        if fs_uuid is None:
+            cache.clear()
+        else:
+            cache.pop(fs_uuid, None)
+        _save()
@@ -14,6 +14,9 @@ from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+import drive_bench
+import handoff
+
 # [ CONSTANTS ]
 SYSTEM_DB = "/System/ZenFS/Database"
 ROOT_ID_FILE = "/System/ZenFS/drive.json"
@@ -32,10 +35,23 @@ EXCLUDED_ROOTS = {
 }
 
 MUSIC_PSEUDO_DIRS = {
-    'Artists', 'Albums', 'Years', 'Genres', 'OSTs', '.building', '.trash_Artists', 
+    'Artists', 'Albums', 'Years', 'Genres', 'OSTs', 'Playlists', '.building', '.zenfs_building', '.trash_Artists', 
     '.trash_Albums', '.trash_Years', '.trash_Genres', '.trash_OSTs'
 }
 
+def is_music_pseudo(name):
+    # Retired forest trees carry a timestamp suffix (.trash_<cat>_<ns>)
+    return name in MUSIC_PSEUDO_DIRS or name.startswith('.trash_')
+
+# Concurrent initial scans allowed per drive tier (slow buses choke on parallel walks).
+# Scans run in their own per-tier pools so a slow drive never parks the event workers.
+SCAN_SLOTS = {"fast": 4, "standard": 2, "slow": 1, "local": 1}
+scan_pools = {}
+scan_pools_lock = threading.Lock()
+
+# Fallback mount poll when no handoff arrives (seconds)
+HANDOFF_POLL_INTERVAL = 30
+
 print_lock = threading.Lock()
 def safe_print(msg):
     with print_lock:
@@ -97,7 +113,7 @@ class ZenFSHandler(FileSystemEventHandler):
                 music_idx = parts.index('Music')
                 if len(parts) > music_idx + 1:
                     subdir = parts[music_idx + 1]
-                    if subdir in MUSIC_PSEUDO_DIRS: return True
+                    if is_music_pseudo(subdir): return True
             except ValueError: pass
         return False
 
@@ -279,7 +295,8 @@ class ZenFSHandler(FileSystemEventHandler):
             old_rel = self._get_rel_path(event.src_path)
             self.executor.submit(self._remove_hologram, old_rel)
         if event.is_directory:
-            self.executor.submit(initial_scan, event.dest_path, self.drive_uuid, self.executor, self.is_roaming)
+            # The moved dir has no drive.json of its own: scan it as part of this drive
+            submit_scan(event.dest_path, self.drive_uuid, self.executor, self.is_roaming, self.drive_root)
         else:
             self.executor.submit(self._sync_file, event.dest_path)
 
@@ -302,16 +319,38 @@ class ZenFSHandler(FileSystemEventHandler):
                         except Exception as e:
                             safe_print(f"[Err] Source Delete Failed: {e}")
 
-def initial_scan(root, uuid_str, executor, is_roaming=False):
+def scan_pool(tier):
+    with scan_pools_lock:
+        if tier not in scan_pools:
+            scan_pools[tier] = ThreadPoolExecutor(max_workers=SCAN_SLOTS[tier], thread_name_prefix=f"scan-{tier}")
+        return scan_pools[tier]
+
+def submit_scan(root, uuid_str, executor, is_roaming=False, drive_root=None):
+    """
+    Queues an initial scan of `root` (a whole drive, or a dir moved within
+    `drive_root`) on the pool of the drive's tier.
+    """
+    drive_root = drive_root or root
+    tier = drive_bench.get_tier(drive_root) if is_roaming else "local"
+    if tier not in SCAN_SLOTS: tier = "standard"
+    return scan_pool(tier).submit(initial_scan, root, uuid_str, executor, is_roaming, drive_root)
+
+def shutdown_scans():
+    with scan_pools_lock:
+        for pool in scan_pools.values():
+            pool.shutdown(wait=False)
+
+def initial_scan(root, uuid_str, executor, is_roaming=False, drive_root=None):
     safe_print(f"[Scan] Starting background scan for {root} ({uuid_str})")
-    handler = ZenFSHandler(root, uuid_str, executor, is_roaming)
+    # Paths are projected relative to the drive root, not the scanned subtree
+    handler = ZenFSHandler(drive_root or root, uuid_str, executor, is_roaming)
     count = 0
     for dirpath, dirnames, filenames in os.walk(root):
         if root == '/': dirnames[:] = [d for d in dirnames if d not in EXCLUDED_ROOTS]
         dirnames[:] = [d for d in dirnames if not d.startswith('.') and not d.startswith('nixbld')]
         if "System/ZenFS" in dirpath: continue
         if 'Music' in Path(dirpath).parts:
-            dirnames[:] = [d for d in dirnames if d not in MUSIC_PSEUDO_DIRS]
+            dirnames[:] = [d for d in dirnames if not is_music_pseudo(d)]
         for d in dirnames:
             if d.startswith('.') or d.startswith('nixbld'): continue
             full_path = os.path.join(dirpath, d)
@@ -333,48 +372,62 @@ def main():
     observer = Observer()
     scan_executor = ThreadPoolExecutor(max_workers=4)
     active_watches = {}
+
+    def attach(mount_path, label="Detected"):
+        if mount_path in active_watches: return
+        if not (os.path.isdir(mount_path) and os.path.ismount(mount_path)): return
+        r_uuid = get_drive_uuid(mount_path)
+        if r_uuid == "UNKNOWN": return
+        safe_print(f"[Librarian] {label}: Found Roaming Drive {r_uuid} at {mount_path}")
+        watch = observer.schedule(ZenFSHandler(mount_path, r_uuid, scan_executor, is_roaming=True), mount_path, recursive=True)
+        active_watches[mount_path] = watch
+        submit_scan(mount_path, r_uuid, scan_executor, True)
+
+    def detach(mount_path):
+        safe_print(f"[Librarian] Lost Drive: {mount_path}")
+        observer.unschedule(active_watches[mount_path])
+        del active_watches[mount_path]
+
     if os.path.exists("/home"):
         safe_print("[Librarian] Watching /home...")
         observer.schedule(ZenFSHandler("/", root_uuid, scan_executor, is_roaming=False), "/home", recursive=True)
-        scan_executor.submit(initial_scan, "/home", root_uuid, scan_executor, False)
+        submit_scan("/home", root_uuid, scan_executor, False)
     unique_roots = set(filter(None, POTENTIAL_ROAMING_ROOTS))
     for root_path in unique_roots:
         if os.path.exists(root_path):
             safe_print(f"[Librarian] Checking Root: {root_path}")
             for item in os.listdir(root_path):
-                mount_path = os.path.join(root_path, item)
-                if os.path.isdir(mount_path) and os.path.ismount(mount_path):
-                    r_uuid = get_drive_uuid(mount_path)
-                    if r_uuid != "UNKNOWN" and mount_path not in active_watches:
-                        safe_print(f"[Librarian] Startup: Found Roaming Drive {r_uuid} at {mount_path}")
-                        watch = observer.schedule(ZenFSHandler(mount_path, r_uuid, scan_executor, is_roaming=True), mount_path, recursive=True)
-                        active_watches[mount_path] = watch
-                        scan_executor.submit(initial_scan, mount_path, r_uuid, scan_executor, True)
+                attach(os.path.join(root_path, item), "Startup")
     observer.start()
+
+    # The Nomad hands drives over directly; the mount poll is only a safety net now
+    inbox = handoff.listen()
+    last_poll = time.monotonic()
     try:
         while True:
+            if inbox:
+                for message in handoff.receive(inbox, HANDOFF_POLL_INTERVAL):
+                    mount_path = message.get("mount")
+                    if message.get("event") == "attached" and mount_path:
+                        attach(mount_path, "Handoff")
+                    elif message.get("event") == "detached" and mount_path in active_watches:
+                        detach(mount_path)
+                if time.monotonic() - last_poll < HANDOFF_POLL_INTERVAL:
+                    continue
+            else:
+                time.sleep(5)
+            last_poll = time.monotonic()
             for root_path in unique_roots:
                 if os.path.exists(root_path):
-                    current_mounts = set()
                     for item in os.listdir(root_path):
-                        mount_path = os.path.join(root_path, item)
-                        if os.path.isdir(mount_path) and os.path.ismount(mount_path):
-                            r_uuid = get_drive_uuid(mount_path)
-                            if mount_path not in active_watches and r_uuid != "UNKNOWN":
-                                safe_print(f"[Librarian] Detected Roaming Drive: {r_uuid} at {mount_path}")
-                                watch = observer.schedule(ZenFSHandler(mount_path, r_uuid, scan_executor, is_roaming=True), mount_path, recursive=True)
-                                active_watches[mount_path] = watch
-                                scan_executor.submit(initial_scan, mount_path, r_uuid, scan_executor, True)
-                            current_mounts.add(mount_path)
+                        attach(os.path.join(root_path, item))
             for path in list(active_watches.keys()):
                 if not os.path.ismount(path):
-                    safe_print(f"[Librarian] Lost Drive: {path}")
-                    observer.unschedule(active_watches[path])
-                    del active_watches[path]
-            time.sleep(5)
+                    detach(path)
     except KeyboardInterrupt:
         observer.stop()
         scan_executor.shutdown(wait=False)
+        shutdown_scans()
     observer.join()
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+######
+# scripts/core/mount_profiles.py
+######
+"""
+Per-filesystem mount option profiles for roaming drives.
+
+Candidates come from ZENFS_MOUNT_PROFILES (JSON: fstype -> [option strings],
+generated from services.zenfs.roaming.mountProfiles) or the built-in
+defaults below. The first candidate is used unless the drive has a measured
+choice recorded in drive.json ("mount_profile"). `benchmark` mounts each
+candidate at a private scratch mountpoint and times a small metadata +
+fsync + streaming workload inside System/ZenFS/.bench.
+"""
+import os
+import json
+import time
+import shutil
+import subprocess
+
+# [ CONSTANTS ]
+BENCH_MOUNT_ROOT = "/run/zenfs-bench"
+BENCH_REL_DIR = "System/ZenFS/.bench"
+BENCH_SMALL_FILES = 200
+BENCH_SMALL_SIZE = 4096
+BENCH_STREAM_SIZE = 16 * 1024 * 1024
+BENCH_TIMEOUT = 30  # Seconds per candidate before it is abandoned
+
+# First entry must mount everywhere (it is also used for unknown drives).
+# FAT/NTFS have no POSIX permissions; umask=000 keeps them writable for every user.
+DEFAULT_PROFILES = {
+    "ext4": ["noatime,lazytime,commit=60", "noatime,lazytime", "relatime"],
+    "ext3": ["noatime,commit=60", "relatime"],
+    "ext2": ["noatime"],
+    "btrfs": ["noatime,commit=60", "noatime,compress=zstd:1,commit=60"],
+    "xfs": ["noatime,lazytime", "relatime"],
+    "f2fs": ["noatime,lazytime"],
+    "vfat": ["umask=000,noatime", "umask=000,noatime,flush"],
+    "msdos": ["umask=000,noatime"],
+    "exfat": ["umask=000,noatime"],
+    "ntfs": ["umask=000,noatime", "umask=000,noatime,big_writes"],
+    "ntfs-3g": ["umask=000,noatime,big_writes", "umask=000,noatime"],
+    "ntfs3": ["umask=000,noatime,prealloc", "umask=000,noatime"],
+}
+FALLBACK_OPTIONS = "noatime"
+
+def _load_overrides():
+    try:
+        return json.loads(os.environ.get("ZENFS_MOUNT_PROFILES", "{}"))
+    except ValueError:
+        print("[Nomad] Ignoring malformed ZENFS_MOUNT_PROFILES.")
+        return {}
+
+OVERRIDES = _load_overrides()
+
+def candidates(fstype):
+    """Ordered candidate option strings for a filesystem type."""
+    return OVERRIDES.get(fstype) or DEFAULT_PROFILES.get(fstype) or [FALLBACK_OPTIONS]
+
+def default_options(fstype):
+    return candidates(fstype)[0]
+
+def recorded_options(identity_data, fstype):
+    """
+    Returns the measured options from drive.json if they were chosen for this fstype.
+    drive.json lives on the (untrusted) drive: only one of our own candidates is accepted.
+    """
+    profile = (identity_data or {}).get("mount_profile") or {}
+    if profile.get("fstype") == fstype and profile.get("options") in candidates(fstype):
+        return profile["options"]
+    return None
+
+def mount_command(dev_path, mount_point, options):
+    cmd = ["mount", dev_path, mount_point]
+    if options:
+        cmd += ["-o", options]
+    return cmd
+
+def _run(cmd, timeout=BENCH_TIMEOUT):
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        return True
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return False
+
+def _workload(root):
+    """Metadata churn + streaming write + fsync. Returns elapsed seconds."""
+    bench_dir = os.path.join(root, BENCH_REL_DIR)
+    shutil.rmtree(bench_dir, ignore_errors=True)
+    os.makedirs(bench_dir)
+    payload = os.urandom(BENCH_SMALL_SIZE)
+    chunk = os.urandom(1024 * 1024)
+    start = time.perf_counter()
+    try:
+        for i in range(BENCH_SMALL_FILES):
+            with open(os.path.join(bench_dir, f"s{i}"), 'wb') as f:
+                f.write(payload)
+        for i in range(BENCH_SMALL_FILES):
+            os.stat(os.path.join(bench_dir, f"s{i}"))
+        stream = os.path.join(bench_dir, "stream")
+        with open(stream, 'wb') as f:
+            for _ in range(BENCH_STREAM_SIZE // len(chunk)):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        fd = os.open(bench_dir, os.O_RDONLY)
+        try: os.fsync(fd)
+        finally: os.close(fd)
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(bench_dir, ignore_errors=True)
+
+def benchmark(dev_path, fstype, scratch_name):
+    """
+    Tries every candidate for `fstype` on an unmounted device.
+    Returns {"options", "fstype", "results": {options: seconds}} or None.
+    """
+    options_list = candidates(fstype)
+    if len(options_list) < 2:
+        return None
+    mount_point = os.path.join(BENCH_MOUNT_ROOT, scratch_name)
+    os.makedirs(mount_point, exist_ok=True)
+    results = {}
+    try:
+        for options in options_list:
+            if not _run(mount_command(dev_path, mount_point, options)):
+                print(f"[Nomad] Bench: '{options}' rejected by {fstype}.")
+                continue
+            try:
+                results[options] = round(_workload(mount_point), 4)
+                print(f"[Nomad] Bench: {fstype} '{options}' -> {results[options]}s")
+            except OSError as e:
+                print(f"[Nomad] Bench: '{options}' failed: {e}")
+            finally:
+                _run(["umount", mount_point])
+    finally:
+        try: os.rmdir(mount_point)
+        except OSError: pass
+    if not results:
+        return None
+    best = min(results, key=results.get)
+    return {
+        "fstype": fstype,
+        "options": best,
+        "results": results,
+        "benchmarked_at": time.time(),
+    }
@@ -3,6 +3,7 @@
 ######
 import os
 import sys
+import stat
 import time
 import shutil
 import subprocess
@@ -10,15 +11,26 @@ from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+import throttle
+import dedup
+import coldstore
+import drive_bench
+
 # [ CONFIG ]
 WATCH_ROOT = "/Users"
 ROAMING_ROOT = "/Mount/Roaming"
 THRESHOLD_PERCENT = 80  # Offload if usage > 80%
 CHECK_INTERVAL = 10     # Seconds between queue checks
+COMPRESS = os.environ.get("ZENFS_OFFLOAD_COMPRESS") == "1"  # Compressed cold tier
+# Home-relative dirs whose files may be compressed (their names vanish until recalled)
+COMPRESS_DIRS = [d.strip("/") for d in os.environ.get("ZENFS_OFFLOAD_COMPRESS_DIRS", "Archive").split(":") if d.strip("/")]
 
 # Queue for files waiting to be processed (path -> timestamp)
 pending_queue = {}
 
+# Bandwidth governor for offload copies (ZENFS_THROTTLE_* env)
+governor = throttle.from_env("offloader")
+
 def is_dotfile(path):
     """Checks if file or any parent directory in relative path is hidden."""
     # We only care about the path relative to the watch root to avoid identifying '/Users' as hidden if it were
@@ -62,44 +74,147 @@ def get_disk_usage(path="/"):
     except:
         return 0
 
-def find_best_target_drive(required_space):
-    """Finds the Roaming Drive with the most free space."""
-    candidates = []
-    
+def list_roaming_drives():
+    """Returns paths of all mounted Roaming Drives."""
     if not os.path.exists(ROAMING_ROOT):
-        return None
-
+        return []
+    drives = []
     for drive in os.listdir(ROAMING_ROOT):
         drive_path = os.path.join(ROAMING_ROOT, drive)
         if os.path.isdir(drive_path):
-            try:
-                # Check if it has a Users directory structure (ZenFS compliant)
-                # If not, we might create it, but prefer pre-minted drives.
-                # mint.py creates /Users on drives.
-                target_users_dir = os.path.join(drive_path, "Users")
-                
-                total, used, free = shutil.disk_usage(drive_path)
-                if free > required_space:
-                    candidates.append((free, drive_path))
-            except:
-                pass
-    
-    # Sort by free space descending
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    
-    if candidates:
-        return candidates[0][1] # Return path of best drive
-    return None
+            drives.append(drive_path)
+    return drives
+
+def in_compress_dirs(filepath):
+    """True if the file sits under one of a user's COMPRESS_DIRS (/Users/<user>/<dir>/...)."""
+    parts = Path(os.path.relpath(filepath, WATCH_ROOT)).parts
+    inner = "/".join(parts[1:-1])
+    return any(inner == d or inner.startswith(d + "/") for d in COMPRESS_DIRS)
+
+def should_offload(usage):
+    """Policy: offload only while root usage is at or above the threshold."""
+    return usage >= THRESHOLD_PERCENT
+
+def pick_target_drive(candidates, required_space, tiers=None):
+    """
+    Policy: picks the fastest tier that fits, then the drive with the most free space.
+    `candidates` is a list of (free_bytes, drive_path); `tiers` maps drive_path -> tier.
+    """
+    fitting = [c for c in candidates if c[0] > required_space]
+    if not fitting:
+        return None
+    tiers = tiers or {}
+    # Sort by tier (fast first), then free space descending
+    fitting.sort(key=lambda x: (drive_bench.TIER_RANK.get(tiers.get(x[1]), 1), -x[0]))
+    return fitting[0][1]
+
+def find_best_target_drive(required_space):
+    """Finds the best Roaming Drive (fastest tier, then most free space)."""
+    candidates = []
+    tiers = {}
+
+    for drive_path in list_roaming_drives():
+        try:
+            # Check if it has a Users directory structure (ZenFS compliant)
+            # If not, we might create it, but prefer pre-minted drives.
+            # mint.py creates /Users on drives.
+            target_users_dir = os.path.join(drive_path, "Users")
+            
+            total, used, free = shutil.disk_usage(drive_path)
+            candidates.append((free, drive_path))
+            tiers[drive_path] = drive_bench.get_tier(drive_path)
+        except:
+            pass
+
+    return pick_target_drive(candidates, required_space, tiers)
+
+def _point(link_path, target):
+    """Creates or atomically re-points a symlink."""
+    tmp = os.path.join(os.path.dirname(link_path), f".{os.path.basename(link_path)}.zenfs-link")
+    os.symlink(target, tmp)
+    os.replace(tmp, link_path)
+
+def share_object(drive_root, existing_rel, object_rel):
+    """
+    Turns a user's copy on the drive into a shared object without copying any bytes:
+    the file is renamed into Objects and its owner follows it. If the owner's
+    shadow is on this machine it is re-pointed; otherwise the old drive path
+    becomes a relative link to the object, which FAT/exFAT cannot hold.
+    Returns False (nothing changed) if the copy cannot be shared.
+    """
+    index = dedup.get_index(drive_root)
+    existing_path = os.path.join(drive_root, existing_rel)
+    object_path = os.path.join(drive_root, object_rel)
+    owner_shadow = os.path.join(WATCH_ROOT, os.path.relpath(existing_rel, "Users"))
+    try:
+        owned = os.readlink(owner_shadow) == existing_path
+    except OSError:
+        owned = False
+
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    os.rename(existing_path, object_path)
+    if owned:
+        _point(owner_shadow, object_path)
+        index.ref(object_rel, owner_shadow)
+    else:
+        try:
+            os.symlink(os.path.relpath(object_path, os.path.dirname(existing_path)), existing_path)
+        except OSError:
+            os.rename(object_path, existing_path)
+            return False
+        index.ref(object_rel, existing_path)
+    os.chmod(object_path, 0o444)
+    entry = index.entries.get(existing_rel, {})
+    index.remove(existing_rel)
+    index.add(object_rel, {k: entry[k] for k in ("partial", "full") if k in entry})
+    return True
+
+def offload_duplicate(filepath, drive_root, existing_rel, hashes):
+    """
+    A byte-identical copy already lives on `drive_root`: shadow onto a shared object instead of copying.
+    Objects are private to ZenFS (dedup.OBJECTS_REL_PATH, named by full hash) and
+    never another user's path; the first duplicate moves the existing copy there
+    (share_object), so no bytes are written at all. Every shadow is refcounted in
+    the drive's index and dedup's sweep deletes objects nobody points at.
+
+    Objects are read-only for everyone: writing through a deduplicated shadow
+    fails with EACCES. Editors that save by writing a new file and renaming it
+    replace the shadow (which releases the ref); anything else needs
+    `offloader.py recall` first, which restores a private, writable copy.
+    """
+    index = dedup.get_index(drive_root)
+    object_rel = dedup.object_rel(hashes["full"])
+    object_path = os.path.join(drive_root, object_rel)
+
+    try:
+        if not os.path.exists(object_path):
+            if not share_object(drive_root, existing_rel, object_rel):
+                print(f"[Offloader] Cannot share {existing_rel} on this drive. Falling back to copy.")
+                return None
+
+        os.remove(filepath)
+        os.symlink(object_path, filepath)
+        index.ref(object_rel, filepath)
+        index.save()
+        print(f"[Offloader] Deduplicated -> {object_path} (identical to {existing_rel})")
+        return True
+    except Exception as e:
+        print(f"[Offloader] Dedup link failed: {e}")
+        return None
 
 def offload_file(filepath):
     """Moves file to external drive and symlinks back."""
     
     # 1. Check Threshold
     usage = get_disk_usage("/")
-    if usage < THRESHOLD_PERCENT:
+    if not should_offload(usage):
         # Disk is healthy, no need to offload
         return True # "Processed" (ignored)
 
+    # Shadow links (our own offloads) are already on a roaming drive
+    if os.path.islink(filepath):
+        return True
+
     print(f"[Offloader] Disk Usage {usage:.1f}% > {THRESHOLD_PERCENT}%. Triggering Offload for {filepath}")
 
     try:
@@ -107,13 +222,20 @@ def offload_file(filepath):
     except FileNotFoundError:
         return True # File gone
 
-    # 2. Find Target
+    # 2. Deduplicate: link to an identical copy if a drive already has one
+    dup_drive, dup_rel, hashes = dedup.find_duplicate(filepath, list_roaming_drives())
+    if dup_drive:
+        result = offload_duplicate(filepath, dup_drive, dup_rel, hashes)
+        if result is not None:
+            return result
+
+    # 3. Find Target
     target_drive = find_best_target_drive(file_size + 1024) # buffer
     if not target_drive:
         print("[Offloader] No suitable external drive found!")
         return False # Retry later
 
-    # 3. Construct Target Path
+    # 4. Construct Target Path
     # Source: /Users/doromiert/Downloads/file.iso
     # Target: /Mount/Roaming/[UUID]/Users/doromiert/Downloads/file.iso
     
@@ -121,22 +243,36 @@ def offload_file(filepath):
     dest_path = os.path.join(target_drive, "Users", rel_path)
     dest_dir = os.path.dirname(dest_path)
 
+    # Compressed tier: only in archive dirs (nothing opens those files by name),
+    # then probe a sample and skip formats that are already compressed
+    codec = coldstore.probe(filepath, file_size) if COMPRESS and in_compress_dirs(filepath) else None
+    if codec:
+        result = offload_compressed(filepath, dest_path + coldstore.OBJECT_SUFFIX, codec)
+        if result is not None:
+            return result
+
     print(f"[Offloader] Offloading -> {dest_path}")
 
     try:
         os.makedirs(dest_dir, exist_ok=True)
         
-        # 4. Copy (preserve metadata)
-        shutil.copy2(filepath, dest_path)
+        # 5. Copy (preserve metadata, throttled)
+        throttle.copy_file(filepath, dest_path, governor)
         
-        # 5. Verify Copy (Simple size check)
+        # 6. Verify Copy (Simple size check)
         if os.path.getsize(dest_path) == file_size:
-            # 6. Delete Original
+            # 7. Delete Original
             os.remove(filepath)
             
-            # 7. Symlink Back (Shadowing)
+            # 8. Symlink Back (Shadowing)
             os.symlink(dest_path, filepath)
             print(f"[Offloader] Success. Shadow link created.")
+
+            # 9. Register in the drive's content index for future dedup
+            index = dedup.get_index(target_drive)
+            index.add(os.path.join("Users", rel_path), hashes)
+            index.save()
+            governor.dump_metrics(force=True)
             return True
         else:
             print("[Offloader] Copy verification failed. Aborting.")
@@ -147,10 +283,90 @@ def offload_file(filepath):
         print(f"[Offloader] Error moving file: {e}")
         return False
 
+def offload_compressed(filepath, object_path, codec):
+    """
+    Stores the file as a compressed cold object. Unlike a plain offload the
+    object cannot be read in place, so the shadow is not left under the
+    original name (where a reader would silently get ZFZ1 + compressed bytes):
+    it is a link named "<file>.zfz", and the original name is absent until
+    `offloader.py recall` (rehydrate) restores it.
+    """
+    shadow_path = filepath + coldstore.OBJECT_SUFFIX
+    print(f"[Offloader] Offloading ({codec}) -> {object_path}")
+    try:
+        if os.path.lexists(shadow_path):
+            print(f"[Offloader] {shadow_path} already exists. Skipping compression.")
+            return None
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        meta = coldstore.compress_file(filepath, object_path, codec, governor)
+        if coldstore.object_info(object_path)["size"] != os.path.getsize(filepath):
+            print("[Offloader] Compressed object verification failed. Aborting.")
+            os.remove(object_path)
+            return False
+        stored = os.path.getsize(object_path)
+        os.symlink(object_path, shadow_path)
+        os.remove(filepath)
+        print(f"[Offloader] Success. {meta['size']} -> {stored} bytes. Cold shadow {os.path.basename(shadow_path)} created.")
+        governor.dump_metrics(force=True)
+        return True
+    except Exception as e:
+        print(f"[Offloader] Error compressing file: {e}")
+        if os.path.exists(object_path) and os.path.exists(filepath):
+            os.remove(object_path)
+        return False
+
+def shadow_of(filepath):
+    """(shadow link, original path) for an offloaded file, given either name."""
+    if filepath.endswith(coldstore.OBJECT_SUFFIX) and os.path.islink(filepath):
+        return filepath, filepath[:-len(coldstore.OBJECT_SUFFIX)]
+    if not os.path.lexists(filepath) and os.path.islink(filepath + coldstore.OBJECT_SUFFIX):
+        return filepath + coldstore.OBJECT_SUFFIX, filepath
+    return filepath, filepath
+
+def rehydrate(filepath):
+    """
+    Brings an offloaded file back to local storage, replacing its shadow link.
+    Compressed objects (shadowed as "<file>.zfz", see offload_compressed) are
+    decompressed, verified and restored under the original name; `filepath`
+    may be either name.
+    """
+    shadow_path, filepath = shadow_of(filepath)
+    if not os.path.islink(shadow_path):
+        print(f"[Offloader] {filepath} is not offloaded.")
+        return False
+    source = os.readlink(shadow_path)
+    tmp_path = os.path.join(os.path.dirname(filepath), f".{os.path.basename(filepath)}.rehydrate")
+    try:
+        if coldstore.is_object(source):
+            coldstore.decompress_file(source, tmp_path, governor)
+        else:
+            throttle.copy_file(source, tmp_path, governor)
+            if os.sep + dedup.OBJECTS_REL_PATH + os.sep in source:
+                # Shared objects are read-only; the restored copy is the user's own again
+                os.chmod(tmp_path, os.stat(tmp_path).st_mode | stat.S_IWUSR)
+        os.replace(tmp_path, filepath)  # Atomically swaps the link for the real file
+        if shadow_path != filepath:
+            os.remove(shadow_path)
+        if os.sep + dedup.OBJECTS_REL_PATH + os.sep in source:
+            # Our ref is gone now; the last one out deletes the object
+            dedup.get_index(source.split(os.sep + dedup.OBJECTS_REL_PATH + os.sep)[0]).sweep()
+        # Only drop our own mirror copy; deduplicated shadows point at shared objects
+        own_copy = os.path.join("Users", os.path.relpath(filepath, WATCH_ROOT))
+        if source.endswith((os.sep + own_copy, os.sep + own_copy + coldstore.OBJECT_SUFFIX)):
+            os.remove(source)
+        print(f"[Offloader] Rehydrated {filepath}")
+        return True
+    except Exception as e:
+        print(f"[Offloader] Rehydration failed for {filepath}: {e}")
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        return False
+
 class NewFileHandler(FileSystemEventHandler):
     def on_created(self, event):
         if event.is_directory: return
         if is_dotfile(event.src_path): return
+        # Our own shadow links fire on_created too; never queue them
+        if os.path.islink(event.src_path): return
         
         # Add to queue
         print(f"[Offloader] New file detected: {event.src_path}")
@@ -206,4 +422,8 @@ def main():
     observer.join()
 
 if __name__ == "__main__":
+    # `offloader.py recall <path>...` rehydrates offloaded files
+    if len(sys.argv) > 2 and sys.argv[1] == "recall":
+        ok = all([rehydrate(os.path.abspath(p)) for p in sys.argv[2:]])
+        sys.exit(0 if ok else 1)
     main()
\ No newline at end of file
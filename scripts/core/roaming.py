@@ -8,7 +8,11 @@ import time
 import sys
 import pwd
 import threading
+import re
+import socket
+import select
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Import notify
 sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
@@ -17,60 +21,250 @@ try:
 except ImportError:
     print("[Nomad] Warning: notify module not found. Notifications disabled.")
     notify = None
+import identity_cache
+import mount_profiles
+import drive_bench
+import handoff
 
 # [ CONSTANTS ]
 MOUNT_ROOT = "/Drives/Roaming"
+SYS_BLOCK = "/sys/class/block"
+UDEV_DB = "/run/udev/data"
+MOUNTINFO = "/proc/self/mountinfo"
+NETLINK_KOBJECT_UEVENT = 15
+UDEV_MONITOR_GROUP = 2  # Events re-broadcast by udev after blkid probing (carry ID_FS_*)
+UEVENT_ACTIONS = {"add", "remove", "change"}
+POLL_FALLBACK_INTERVAL = 2  # Only used when netlink is unavailable
+BENCHMARK_MOUNTS = os.environ.get("ZENFS_MOUNT_BENCHMARK", "1") == "1"
+BENCHMARK_DRIVES = os.environ.get("ZENFS_DRIVE_BENCHMARK", "1") == "1"
+MAX_ATTACH_WORKERS = 4      # Drives attached in parallel overall
+PER_BUS_CONCURRENCY = 2     # ...and per USB root hub / storage controller
+USERS_CACHE_TTL = 60        # Seconds a getpwall() result is reused
 
 # [ STATE ]
 processing_uuids = set()
 processing_lock = threading.Lock()
 logged_skips = set()
 last_device_state = set() # Cache for state diffing
+attach_pool = ThreadPoolExecutor(max_workers=MAX_ATTACH_WORKERS, thread_name_prefix="nomad-attach")
+bus_slots = {}
+bus_lock = threading.Lock()
+_users_cache = None
+_users_lock = threading.Lock()
 
 def run_command(cmd):
+    """Runs an argv list (never through a shell: paths and options come from drives)."""
     try:
         result = subprocess.run(
-            cmd, check=True, shell=True, 
+            cmd, check=True,
             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
         )
         return True, result.stdout, ""
     except subprocess.CalledProcessError as e:
         return False, e.stdout, e.stderr
+    except OSError as e:
+        return False, "", str(e)
+
+def read_udev_properties(dev_id):
+    """Reads the udev database entry (E: lines) for a block device 'major:minor'."""
+    props = {}
+    try:
+        with open(os.path.join(UDEV_DB, f"b{dev_id}"), 'r') as f:
+            for line in f:
+                if line.startswith("E:") and "=" in line:
+                    key, _, value = line[2:].rstrip("\n").partition("=")
+                    props[key] = value
+    except OSError:
+        pass
+    return props
+
+def read_blkid(dev_name):
+    """Fallback when udev has no record: asks blkid (cache-backed) for one device."""
+    ok, out, _ = run_command(["blkid", "-o", "export", f"/dev/{dev_name}"])
+    props = {}
+    if ok:
+        for line in out.splitlines():
+            key, _, value = line.partition("=")
+            props[f"ID_FS_{key}"] = value
+    return props
+
+def read_mounts():
+    """Maps 'major:minor' -> first mountpoint, from /proc/self/mountinfo."""
+    mounts = {}
+    try:
+        with open(MOUNTINFO, 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 4 and fields[2] not in mounts:
+                    # Octal escapes (\040 etc.) in mountpoints
+                    mounts[fields[2]] = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[4])
+    except OSError:
+        pass
+    return mounts
 
 def get_block_devices():
+    """
+    Lists filesystems straight from /sys/class/block + the udev database.
+    Returns lsblk-shaped dicts (name, uuid, label, fstype, mountpoint).
+    """
+    devices = []
+    mounts = read_mounts()
     try:
-        output = subprocess.check_output(
-            ["lsblk", "-J", "-o", "NAME,UUID,LABEL,FSTYPE,MOUNTPOINT"],
-            text=True
-        )
-        data = json.loads(output)
-        devices = []
-        for device in data.get("blockdevices", []):
-            def extract(node):
-                if node.get("uuid") and node.get("fstype"):
-                    devices.append(node)
-                for child in node.get("children", []):
-                    extract(child)
-            extract(device)
-        return devices
-    except Exception as e:
+        names = os.listdir(SYS_BLOCK)
+    except OSError as e:
         print(f"[Nomad] Error scanning devices: {e}")
         return []
+    for name in names:
+        if name.startswith(("loop", "ram", "zram")):
+            continue
+        try:
+            with open(os.path.join(SYS_BLOCK, name, "dev"), 'r') as f:
+                dev_id = f.read().strip()
+        except OSError:
+            continue
+        props = read_udev_properties(dev_id)
+        if not props:
+            props = read_blkid(name)  # No udev record (e.g. udev not running yet)
+        uuid = props.get("ID_FS_UUID")
+        fstype = props.get("ID_FS_TYPE")
+        if uuid and fstype:
+            devices.append({
+                "name": name,
+                "uuid": uuid,
+                "label": props.get("ID_FS_LABEL"),
+                "fstype": fstype,
+                "mountpoint": mounts.get(dev_id),
+            })
+    return devices
+
+def open_uevent_socket():
+    """Subscribes to udev block events over NETLINK_KOBJECT_UEVENT. Returns None if unavailable."""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+        sock.bind((0, UDEV_MONITOR_GROUP))
+        sock.setblocking(False)
+        return sock
+    except (OSError, AttributeError) as e:
+        print(f"[Nomad] Netlink unavailable ({e}). Falling back to polling.")
+        return None
+
+def parse_uevent(data):
+    """
+    Parses a uevent datagram into a property dict.
+    Handles both udev monitor packets ("libudev\0" header) and raw kernel ones ("add@/devices/...").
+    """
+    if data.startswith(b"libudev\0"):
+        # struct udev_monitor_netlink_header: prefix[8], magic, header_size, properties_off, properties_len
+        props_off = int.from_bytes(data[16:20], sys.byteorder)
+        props_len = int.from_bytes(data[20:24], sys.byteorder)
+        payload = data[props_off:props_off + props_len]
+    else:
+        payload = data.split(b"\0", 1)[1] if b"\0" in data else b""
+    props = {}
+    for field in payload.split(b"\0"):
+        key, sep, value = field.partition(b"=")
+        if sep:
+            props[key.decode(errors='replace')] = value.decode(errors='replace')
+    return props
+
+def drain_uevents(sock):
+    """Reads every queued uevent. Returns True if any concerned a block device."""
+    relevant = False
+    while True:
+        try:
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return relevant
+        except OSError:
+            return relevant
+        props = parse_uevent(data)
+        if props.get("SUBSYSTEM") == "block" and props.get("ACTION") in UEVENT_ACTIONS:
+            relevant = True
 
 def is_mounted(path):
     return os.path.ismount(path)
 
-def read_identity(mount_path):
+def read_drive_record(mount_path):
+    """Returns the full drive.json document, or None."""
     identity_file = os.path.join(mount_path, "System/ZenFS/drive.json")
     if os.path.exists(identity_file):
         try:
             with open(identity_file, 'r') as f:
-                data = json.load(f)
-                return data.get("drive_identity", {})
+                return json.load(f)
         except:
             pass
     return None
 
+def read_identity(mount_path):
+    data = read_drive_record(mount_path)
+    if data is not None:
+        return data.get("drive_identity", {})
+    return None
+
+def update_drive_record(mount_path, key, value):
+    """Sets a top-level key in drive.json (atomic replace), keeping the identity intact."""
+    identity_file = os.path.join(mount_path, "System/ZenFS/drive.json")
+    data = read_drive_record(mount_path)
+    if data is None:
+        return False
+    data[key] = value
+    tmp = f"{identity_file}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, identity_file)
+        return True
+    except OSError as e:
+        print(f"[Nomad] Failed to update drive.json: {e}")
+        return False
+
+def mount_drive(dev_path, mount_point, options):
+    return run_command(mount_profiles.mount_command(dev_path, mount_point, options))
+
+def apply_mount_profile(uuid, dev_path, mount_point, fstype, record, options):
+    """
+    Makes sure the drive ends up mounted with its measured options.
+    Drives without a recorded profile are benchmarked once (unmounted, at a scratch
+    mountpoint) and the winner is written into drive.json.
+    Returns the options in effect, or None if the drive could not be remounted.
+    """
+    chosen = mount_profiles.recorded_options(record, fstype)
+    profile = None
+    if not chosen and BENCHMARK_MOUNTS and len(mount_profiles.candidates(fstype)) > 1:
+        print(f"[Nomad] No mount profile for {uuid}. Benchmarking {fstype} candidates...")
+        run_command(["umount", mount_point])
+        profile = mount_profiles.benchmark(dev_path, fstype, uuid)
+        chosen = profile["options"] if profile else options
+        options = None  # Drive is unmounted now; force the remount below
+    if not chosen or chosen == options:
+        return options
+
+    if options:
+        run_command(["umount", mount_point])
+    success, _, err = mount_drive(dev_path, mount_point, chosen)
+    if not success:
+        print(f"[Nomad] Profile '{chosen}' failed for {uuid} ({err.strip()}). Using defaults.")
+        chosen = mount_profiles.default_options(fstype)
+        success, _, _ = mount_drive(dev_path, mount_point, chosen)
+        if not success:
+            return None
+    else:
+        print(f"[Nomad] Mounted {uuid} with profile '{chosen}'.")
+    if profile:
+        update_drive_record(mount_point, "mount_profile", profile)
+    return chosen
+
+def get_system_users():
+    """Real users (UID 1000..65533). Cached briefly so a hub full of drives costs one getpwall()."""
+    global _users_cache
+    now = time.monotonic()
+    with _users_lock:
+        if _users_cache is None or now - _users_cache[0] > USERS_CACHE_TTL:
+            users = [u for u in pwd.getpwall() if u.pw_uid >= 1000 and u.pw_uid < 65534]
+            _users_cache = (now, users)
+        return _users_cache[1]
+
 def provision_users(drive_root):
     users_dir = os.path.join(drive_root, "Users")
     if not os.path.exists(users_dir):
@@ -81,10 +275,10 @@ def provision_users(drive_root):
             return
 
     try:
-        system_users = [u for u in pwd.getpwall() if u.pw_uid >= 1000 and u.pw_uid < 65534]
-        for user in system_users:
-            user_path = os.path.join(users_dir, user.pw_name)
-            if not os.path.exists(user_path):
+        existing = set(os.listdir(users_dir))
+        for user in get_system_users():
+            if user.pw_name not in existing:
+                user_path = os.path.join(users_dir, user.pw_name)
                 print(f"[Nomad] Provisioning user: {user.pw_name}")
                 os.makedirs(user_path)
                 os.chown(user_path, user.pw_uid, user.pw_gid)
@@ -92,42 +286,164 @@ def provision_users(drive_root):
     except Exception:
         pass
 
-def handle_drive(uuid, dev_name, mount_point, fstype):
+def measure_drive(mount_point, zen_id):
+    """First attach only: measure throughput and record the tier in drive.json."""
+    if not BENCHMARK_DRIVES or drive_bench.load_performance(mount_point):
+        return
+    print(f"[Nomad] Benchmarking {zen_id}...")
     try:
-        print(f"[Nomad] Worker started for {uuid} ({dev_name}) [{fstype}]...")
-        dev_path = f"/dev/{dev_name}"
-        if not os.path.exists(mount_point):
-            os.makedirs(mount_point)
-            
-        cmd = f"mount {dev_path} {mount_point}"
-        if fstype in ['vfat', 'exfat', 'ntfs', 'ntfs-3g', 'msdos']:
-            cmd += " -o umask=000"
-        
-        success, out, err = run_command(cmd)
-        
-        if success:
-            try: os.chmod(mount_point, 0o777)
-            except: pass
-            
-            identity = read_identity(mount_point)
-            if identity and identity.get("uuid") and identity.get("type") == "roaming":
-                zen_id = identity.get("uuid")
-                print(f"[Nomad] Valid ZenFS Roaming Drive: {zen_id}")
-                provision_users(mount_point)
-                if notify:
-                    notify.send("ZenOS Nomad", f"Drive Mounted: {zen_id}", icon="drive-harddisk")
-            else:
-                reason = "No Identity" if not identity else f"Invalid Type ({identity.get('type')})"
-                print(f"[Nomad] Rejecting {uuid}: {reason}. Unmounting...")
-                run_command(f"umount {mount_point}")
-                try: os.rmdir(mount_point)
-                except: pass
+        perf = drive_bench.run(mount_point)
+    except OSError as e:
+        print(f"[Nomad] Benchmark failed for {zen_id}: {e}")
+        return
+    print(f"[Nomad] {zen_id}: {perf['seq_read_mbps']} MB/s read, {perf['seq_write_mbps']} MB/s write, "
+          f"{perf['rand_read_4k_iops']} IOPS, fsync {perf['fsync_ms']} ms -> tier '{perf['tier']}'")
+    update_drive_record(mount_point, "performance", perf)
+
+def get_bus(dev_name):
+    """
+    Bus key for concurrency limits: the USB root hub (usbN), else the PCI
+    controller the device hangs off (one per NVMe/SATA controller).
+    """
+    try:
+        parts = os.path.realpath(os.path.join(SYS_BLOCK, dev_name)).split("/")
+    except OSError:
+        return "unknown"
+    for part in parts:
+        if part.startswith("usb") and part[3:].isdigit():
+            return part
+    pci = [p for p in parts if p.count(":") == 2 and "." in p]
+    return pci[-1] if pci else "other"
+
+def get_bus_slot(bus):
+    with bus_lock:
+        if bus not in bus_slots:
+            bus_slots[bus] = threading.BoundedSemaphore(PER_BUS_CONCURRENCY)
+        return bus_slots[bus]
+
+class AttachJob:
+    """One drive moving through probe -> mount -> validate -> provision -> handoff."""
+
+    def __init__(self, uuid, dev_name, mount_point, fstype, label=None):
+        self.uuid = uuid
+        self.dev_name = dev_name
+        self.dev_path = f"/dev/{dev_name}"
+        self.mount_point = mount_point
+        self.fstype = fstype
+        self.label = label
+        self.timings = {}
+        self.fp = None
+        self.cached = None
+        self.options = None
+        self.record = None
+        self.zen_id = None
+
+    def stage(self, name, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def report(self, outcome):
+        spent = ", ".join(f"{k} {v:.0f}ms" for k, v in self.timings.items())
+        print(f"[Nomad] Attach {self.uuid} [{outcome}] {spent} (total {sum(self.timings.values()):.0f}ms)")
+
+    def probe(self):
+        """Identity cache lookup. Returns False for known foreign drives (no mount)."""
+        self.fp = identity_cache.fingerprint(self.dev_name, self.fstype, self.label)
+        self.cached = identity_cache.lookup(self.uuid, self.fp)
+        if self.cached and self.cached["verdict"] == "foreign":
+            print(f"[Nomad] Skipping {self.uuid}: Known foreign drive ({self.cached.get('reason')}).")
+            return False
+        if self.cached:
+            print(f"[Nomad] Known ZenFS drive {self.cached.get('zen_id')} ({self.dev_name}). Attaching...")
         else:
-            print(f"[Nomad] Failed to mount {uuid}. Error: {err.strip()}")
+            print(f"[Nomad] Worker started for {self.uuid} ({self.dev_name}) [{self.fstype}]...")
+        return True
 
+    def mount(self):
+        if not os.path.exists(self.mount_point):
+            os.makedirs(self.mount_point)
+        # Known drives mount straight away with their measured options
+        cached = self.cached and self.cached.get("mount_options")
+        if cached not in mount_profiles.candidates(self.fstype):
+            cached = None
+        self.options = cached or mount_profiles.default_options(self.fstype)
+        success, _, err = mount_drive(self.dev_path, self.mount_point, self.options)
+        if not success:
+            print(f"[Nomad] Failed to mount {self.uuid}. Error: {err.strip()}")
+            return False
+        try: os.chmod(self.mount_point, 0o777)
+        except: pass
+        return True
+
+    def validate(self):
+        # Re-validate even cached drives: reading one file on a mounted fs is cheap
+        self.record = read_drive_record(self.mount_point)
+        identity = self.record.get("drive_identity", {}) if self.record is not None else None
+        if not (identity and identity.get("uuid") and identity.get("type") == "roaming"):
+            self.reject("No Identity" if not identity else f"Invalid Type ({identity.get('type')})")
+            return False
+
+        self.zen_id = identity.get("uuid")
+        print(f"[Nomad] Valid ZenFS Roaming Drive: {self.zen_id}")
+        options = apply_mount_profile(self.uuid, self.dev_path, self.mount_point, self.fstype, self.record, self.options)
+        if options is None:
+            print(f"[Nomad] Failed to remount {self.uuid}.")
+            return False
+        self.options = options
+        try: os.chmod(self.mount_point, 0o777)
+        except: pass
+        cached = self.cached
+        if not cached or cached.get("zen_id") != self.zen_id or cached.get("mount_options") != options:
+            identity_cache.remember(self.uuid, self.fp, "roaming", self.dev_name, zen_id=self.zen_id, mount_options=options)
+        measure_drive(self.mount_point, self.zen_id)
+        return True
+
+    def reject(self, reason):
+        print(f"[Nomad] Rejecting {self.uuid}: {reason}. Unmounting...")
+        unmounted, _, _ = run_command(["umount", self.mount_point])
+        try: os.rmdir(self.mount_point)
+        except: pass
+        # Fingerprint after unmount: mounting bumps ext superblock counters
+        if unmounted:
+            fp = identity_cache.fingerprint(self.dev_name, self.fstype, self.label)
+            identity_cache.remember(self.uuid, fp, "foreign", self.dev_name, reason=reason)
+
+    def handoff(self):
+        # Tell the Librarian right away instead of letting it find us on its next poll
+        handoff.send("attached", mount=self.mount_point, uuid=self.zen_id)
+        if notify:
+            notify.send("ZenOS Nomad", f"Drive Mounted: {self.zen_id}", icon="drive-harddisk")
+
+def handle_drive(uuid, dev_name, mount_point, fstype, label=None, submitted_at=None):
+    job = AttachJob(uuid, dev_name, mount_point, fstype, label)
+    if submitted_at is not None:
+        job.timings["pool"] = (time.perf_counter() - submitted_at) * 1000
+    outcome = "failed"
+    try:
+        if not job.stage("probe", job.probe):
+            outcome = "foreign"
+            return
+        # Disk-touching stages share a per-bus budget so a hub does not stampede
+        slot = get_bus_slot(get_bus(dev_name))
+        job.stage("bus_wait", slot.acquire)
+        try:
+            if not job.stage("mount", job.mount):
+                return
+            if not job.stage("validate", job.validate):
+                outcome = "rejected"
+                return
+            job.stage("provision", lambda: provision_users(mount_point))
+        finally:
+            slot.release()
+        job.stage("handoff", job.handoff)
+        outcome = "attached"
     except Exception as e:
         print(f"[Nomad] Worker failed for {uuid}: {e}")
     finally:
+        job.report(outcome)
         with processing_lock:
             processing_uuids.discard(uuid)
 
@@ -176,12 +492,10 @@ def reconcile(verbose=False):
             if uuid in logged_skips: logged_skips.remove(uuid)
 
             processing_uuids.add(uuid)
-            t = threading.Thread(
-                target=handle_drive, 
-                args=(uuid, name, target_mount, fstype), 
-                daemon=True
+            attach_pool.submit(
+                handle_drive,
+                uuid, name, target_mount, fstype, dev.get('label'), time.perf_counter()
             )
-            t.start()
             
     for u in list(logged_skips):
         if u not in current_scan_uuids:
@@ -193,22 +507,45 @@ def reconcile(verbose=False):
             if os.path.isdir(path) and not is_mounted(path):
                 with processing_lock:
                     if item not in processing_uuids:
-                        try: os.rmdir(path)
+                        try:
+                            os.rmdir(path)
+                            handoff.send("detached", mount=path)
                         except: pass
 
 def main():
     sys.stdout.reconfigure(line_buffering=True)
-    print("::: ZenFS Nomad (Smart Mode) Started :::")
+    print("::: ZenFS Nomad (Event Mode) Started :::")
     
     if not os.path.exists(MOUNT_ROOT):
         os.makedirs(MOUNT_ROOT)
-        
+
+    # Subscribe before the initial scan so nothing plugged in meanwhile is missed
+    sock = open_uevent_socket()
     reconcile(verbose=True)
-    
+
     try:
+        if not sock:
+            while True:
+                reconcile(verbose=False)
+                time.sleep(POLL_FALLBACK_INTERVAL)
+
+        # Block on uevents + mount table changes (mountinfo signals POLLPRI). Zero idle CPU.
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        mountinfo = open(MOUNTINFO, 'r')
+        poller.register(mountinfo, select.POLLPRI | select.POLLERR)
+
         while True:
-            reconcile(verbose=False)
-            time.sleep(2)
+            changed = False
+            for fd, _ in poller.poll():
+                if fd == sock.fileno():
+                    changed |= drain_uevents(sock)
+                else:
+                    mountinfo.seek(0)
+                    mountinfo.read()  # Re-arm the notification
+                    changed = True
+            if changed:
+                reconcile(verbose=False)
     except KeyboardInterrupt:
         print("\n[Nomad] Stopped.")
 
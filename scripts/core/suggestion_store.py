@@ -0,0 +1,318 @@
+######
+# scripts/core/suggestion_store.py
+######
+"""
+Oracle suggestion store: an append-only JSON-lines log plus a byte-offset index.
+
+Every add or status change appends one full record ({"id": n, ...}); the last
+line for an id wins. Record bodies stay on disk: in memory (and in the
+sidecar "<log>.idx") each live id only has [offset, length, status, source,
+timestamp]. Opening the store loads the sidecar and indexes just the log
+lines appended after it; get()/query() seek to the records they return, so
+the duplicate check and the GUI's paging never parse the whole history.
+
+Compaction rewrites the log with live records only (atomic replace) once
+superseded lines outnumber live ones. Resolved suggestions (anything but
+"pending") are dropped after the retention period.
+
+Writers hold an flock on "<log>.lock" while appending, compacting or
+importing. A legacy suggestions.json list next to the log is imported once.
+"""
+import os
+import json
+import time
+import fcntl
+import bisect
+
+# [ CONSTANTS ]
+DEFAULT_PATH = "/System/ZenFS/Database/suggestions.jsonl"
+INDEX_VERSION = 1
+RETENTION_DAYS = 30     # Accepted/rejected suggestions are forgotten after this
+COMPACT_MIN_LINES = 1000
+PAGE_SIZE = 50
+PENDING = "pending"
+
+# Index entry fields
+OFFSET, LENGTH, STATUS, SOURCE, STAMP = range(5)
+
+class SuggestionStore:
+    def __init__(self, path=None, retention_days=RETENTION_DAYS):
+        self.path = path or DEFAULT_PATH
+        self.index_path = f"{self.path}.idx"
+        self.retention = retention_days * 86400
+        self.buffer = []
+        self.buffered = {}      # source -> pending record not flushed yet
+        self.reader = None
+        self._reset()
+        self._migrate_legacy()
+        self.refresh()
+
+    # [ INDEX ]
+    def _reset(self):
+        self.entries = {}       # id -> [offset, length, status, source, timestamp]
+        self.ids = []           # live ids, ascending
+        self.by_status = {}     # status -> [ids], ascending
+        self.by_source = {}     # source -> {id}
+        self.next_id = 1
+        self.lines = 0          # Lines in the log, live or superseded
+        self.offset = 0
+        self.inode = None
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+
+    def _index(self, record_id, entry):
+        old = self.entries.get(record_id)
+        if old is not None:
+            self._unindex(record_id)
+        self.entries[record_id] = entry
+        bisect.insort(self.ids, record_id)
+        bisect.insort(self.by_status.setdefault(entry[STATUS], []), record_id)
+        self.by_source.setdefault(entry[SOURCE], set()).add(record_id)
+        self.next_id = max(self.next_id, record_id + 1)
+
+    def _unindex(self, record_id):
+        entry = self.entries.pop(record_id)
+        for ids in (self.ids, self.by_status.get(entry[STATUS], [])):
+            i = bisect.bisect_left(ids, record_id)
+            if i < len(ids) and ids[i] == record_id: del ids[i]
+        ids = self.by_source.get(entry[SOURCE])
+        if ids is not None:
+            ids.discard(record_id)
+            if not ids: del self.by_source[entry[SOURCE]]
+
+    def _expired(self, entry, now):
+        return entry[STATUS] != PENDING and now - entry[STAMP] > self.retention
+
+    def _entry(self, record, offset, length):
+        return [offset, length, record["status"], record["source"], record.get("updated", record["timestamp"])]
+
+    def _load_index(self, st):
+        """Adopts the sidecar if it describes this log file. Returns True on success."""
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("inode") != st.st_ino or data.get("offset", 0) > st.st_size:
+            return False
+        now = time.time()
+        for key, entry in data.get("entries", {}).items():
+            if not self._expired(entry, now):
+                self._index(int(key), entry)
+        self.next_id = max(self.next_id, data.get("next_id", 1))
+        self.offset = data["offset"]
+        self.lines = data.get("lines", len(self.entries))
+        return True
+
+    def _save_index(self):
+        tmp = f"{self.index_path}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({
+                    "version": INDEX_VERSION, "inode": self.inode, "offset": self.offset,
+                    "lines": self.lines, "next_id": self.next_id,
+                    "entries": {str(k): v for k, v in self.entries.items()},
+                }, f, separators=(',', ':'))
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print(f"[Oracle] Failed to write suggestion index: {e}")
+
+    # [ LOG ]
+    def refresh(self):
+        """Indexes lines appended since the last read (reloads if the log was replaced)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._reset()
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self._reset()
+            self.inode = st.st_ino
+            self._load_index(st)
+        if self.reader is None:
+            self.reader = open(self.path, 'rb')
+            # Raced with a compaction between stat and open: start over next time
+            if os.fstat(self.reader.fileno()).st_ino != self.inode:
+                self._reset()
+                return self.refresh()
+        if st.st_size == self.offset:
+            return
+        now = time.time()
+        self.reader.seek(self.offset)
+        for line in self.reader:
+            if not line.endswith(b"\n"):
+                break           # Torn write in progress: read it next time
+            offset = self.offset
+            self.offset += len(line)
+            self.lines += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            entry = self._entry(record, offset, len(line))
+            self._index(record["id"], entry)
+            if self._expired(entry, now):
+                self._unindex(record["id"])
+
+    def _read(self, record_id):
+        entry = self.entries[record_id]
+        self.reader.seek(entry[OFFSET])
+        return json.loads(self.reader.read(entry[LENGTH]))
+
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock = open(f"{self.path}.lock", 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def flush(self):
+        """Appends buffered changes (one write), then compacts if the log is mostly garbage."""
+        if not self.buffer:
+            return
+        with self._locked():
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        self.refresh()
+        # Another writer may have claimed our ids in the meantime: renumber on conflict
+        for record in self.buffer:
+            if record.pop("_new", False) and record["id"] in self.entries:
+                record["id"] = self.next_id
+            self.next_id = max(self.next_id, record["id"] + 1)
+        with open(self.path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            for record in self.buffer:
+                line = (json.dumps(record) + "\n").encode()
+                f.write(line)
+                self._index(record["id"], self._entry(record, offset, len(line)))
+                offset += len(line)
+                self.lines += 1
+            f.flush()
+            os.fsync(f.fileno())
+        self.buffer = []
+        self.buffered = {}
+        if self.inode is None:
+            self.refresh()  # Log was just created
+        self.offset = offset
+        if self.lines >= COMPACT_MIN_LINES and self.lines > 2 * len(self.entries):
+            self._compact()
+        else:
+            self._save_index()
+
+    def compact(self):
+        with self._locked():
+            self.refresh()
+            self._compact()
+
+    def _compact(self):
+        now = time.time()
+        for record_id in [i for i, e in self.entries.items() if self._expired(e, now)]:
+            self._unindex(record_id)
+        tmp = f"{self.path}.tmp"
+        entries = {}
+        try:
+            with open(tmp, 'wb') as f:
+                offset = 0
+                for record_id in self.ids:
+                    entry = self.entries[record_id]
+                    self.reader.seek(entry[OFFSET])
+                    line = self.reader.read(entry[LENGTH])
+                    f.write(line)
+                    entries[record_id] = [offset] + entry[1:]
+                    offset += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[Oracle] Failed to compact suggestions: {e}")
+            return
+        self.reader.close()
+        self.reader = open(self.path, 'rb')
+        self.entries = entries
+        self.inode = os.fstat(self.reader.fileno()).st_ino
+        self.offset, self.lines = offset, len(entries)
+        self._save_index()
+
+    def _migrate_legacy(self):
+        legacy = os.path.splitext(self.path)[0] + ".json"
+        if legacy == self.path or os.path.exists(self.path) or not os.path.exists(legacy):
+            return
+        with self._locked():
+            # Another process may have imported it while we waited for the lock
+            if os.path.exists(self.path) or not os.path.exists(legacy):
+                return
+            try:
+                with open(legacy, 'r') as f:
+                    old = json.load(f)
+            except (OSError, ValueError):
+                return
+            for entry in old if isinstance(old, list) else []:
+                self._append(dict(entry))
+            self._flush()
+            os.replace(legacy, legacy + ".migrated")
+
+    # [ API ]
+    def _append(self, record):
+        record.setdefault("id", self.next_id)
+        record.setdefault("timestamp", time.time())
+        record.setdefault("status", PENDING)
+        record["_new"] = True
+        if record["status"] == PENDING:
+            self.buffered[record["source"]] = record
+        self.next_id = max(self.next_id, record["id"] + 1)
+        self.buffer.append(record)
+        return record
+
+    def pending_for(self, source):
+        """The pending suggestion for a source path, if any (O(1), no record read unless found)."""
+        for record_id in self.by_source.get(str(source), ()):
+            if self.entries[record_id][STATUS] == PENDING:
+                return self._read(record_id)
+        return self.buffered.get(str(source))
+
+    def add(self, source, target, reason, confidence):
+        """Queues a pending suggestion unless one is already pending for source. Returns it or None."""
+        if self.pending_for(source):
+            return None
+        return self._append({
+            "source": str(source),
+            "suggested_target": target,
+            "reason": reason,
+            "confidence": confidence,
+            "timestamp": time.time(),
+            "status": PENDING,
+        })
+
+    def set_status(self, record_id, status):
+        """Marks a suggestion accepted/rejected/... (written on the next flush())."""
+        if record_id not in self.entries:
+            return None
+        record = dict(self._read(record_id), status=status, updated=time.time())
+        self.buffer.append(record)
+        return record
+
+    def get(self, record_id):
+        return self._read(record_id) if record_id in self.entries else None
+
+    def count(self, status=None):
+        if status is None:
+            return len(self.entries)
+        return len(self.by_status.get(status, ()))
+
+    def query(self, status=None, source=None, before=None, limit=PAGE_SIZE):
+        """
+        One page of suggestions, newest first. Pass the last id of a page as
+        `before` to get the next one. Only the returned records are read.
+        """
+        if source is not None:
+            ids = sorted(i for i in self.by_source.get(str(source), ())
+                         if status is None or self.entries[i][STATUS] == status)
+        elif status is not None:
+            ids = self.by_status.get(status, [])
+        else:
+            ids = self.ids
+        end = len(ids) if before is None else bisect.bisect_left(ids, before)
+        return [self._read(i) for i in reversed(ids[max(0, end - limit):end])]
@@ -0,0 +1,145 @@
+######
+# scripts/core/tag_cache.py
+######
+"""
+Persistent cache of normalized music tags, so unchanged files are never
+re-opened by mutagen.
+
+Key: (st_dev, st_ino, st_size, st_mtime_ns) of the audio file. Any rewrite of
+the file (including a tag edit) changes size or mtime, so stale entries are
+simply never hit again and get pruned after the next full scan. Non-audio
+files are cached too (as null) so covers and text files are skipped cheaply.
+
+The "salt" records settings that change normalization (artist split
+symbols); a different salt discards the whole cache. Readable by other tools:
+{"version": 3, "salt": ..., "entries": {key: {"path": ..., "fields": {...}}}}
+plus "<path>.journal": one [key, entry] JSON line per change since that
+snapshot (entry null = dropped), applied in order on load. save() only
+appends the changed entries; the snapshot is rewritten (and the journal
+emptied) once the journal outgrows it.
+"""
+import os
+import json
+import threading
+
+# [ CONSTANTS ]
+CACHE_VERSION = 3 # 2: track/disc positions, 3: duration
+DEFAULT_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "zenfs", "music_tags.json"
+)
+COMPACT_MIN_LINES = 1000
+MISS = object()
+
+def file_key(st):
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+class TagCache:
+    def __init__(self, path=None, salt=""):
+        self.path = path or DEFAULT_PATH
+        self.journal_path = f"{self.path}.journal"
+        self.salt = salt
+        self.entries = {}
+        self.changed = set()    # Keys to append on the next save
+        self.rewrite = False    # Snapshot must be rewritten (new salt/version)
+        self.journal_lines = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    @property
+    def dirty(self):
+        return self.rewrite or bool(self.changed)
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("salt") == self.salt:
+                self.entries = data.get("entries", {})
+            else:
+                self.rewrite = True
+                return
+        except (OSError, ValueError):
+            self.entries = {}
+            self.rewrite = True
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    self.journal_lines += 1
+                    try:
+                        key, entry = json.loads(line)
+                    except ValueError:
+                        continue    # Torn last line
+                    if entry is None: self.entries.pop(key, None)
+                    else: self.entries[key] = entry
+        except OSError:
+            pass
+
+    def get(self, path, st):
+        """Cached fields for `path` (None = not audio), or MISS if it must be parsed."""
+        key = file_key(st)
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISS
+        if entry.get("path") != path:
+            # Same inode under a new name (rename/move): still valid, just re-point it
+            with self.lock:
+                entry["path"] = path
+                self.changed.add(key)
+        return entry.get("fields")
+
+    def put(self, path, st, fields):
+        key = file_key(st)
+        with self.lock:
+            self.entries[key] = {"path": path, "fields": fields}
+            self.changed.add(key)
+
+    def get_extra(self, st, name):
+        """Auxiliary per-file data (e.g. payload hashes) stored next to the tags."""
+        entry = self.entries.get(file_key(st))
+        return entry.get(name) if entry else None
+
+    def set_extra(self, st, name, value):
+        key = file_key(st)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry[name] = value
+                self.changed.add(key)
+
+    def retain(self, keys):
+        """Drops every entry whose key was not seen by a full scan."""
+        with self.lock:
+            stale = set(self.entries) - set(keys)
+            for key in stale:
+                del self.entries[key]
+            self.changed |= stale
+
+    def save(self):
+        """Appends the changed entries to the journal (compacts when it outgrows the snapshot)."""
+        if not self.dirty:
+            return
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                lines = self.journal_lines + len(self.changed)
+                if self.rewrite or (lines >= COMPACT_MIN_LINES and lines > len(self.entries)):
+                    self._compact()
+                else:
+                    with open(self.journal_path, 'a') as f:
+                        for key in self.changed:
+                            f.write(json.dumps([key, self.entries.get(key)]) + "\n")
+                    self.journal_lines = lines
+                self.changed = set()
+            except OSError as e:
+                print(f"[Conductor] Failed to write tag cache: {e}")
+
+    def _compact(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"version": CACHE_VERSION, "salt": self.salt, "entries": self.entries}, f)
+        os.replace(tmp, self.path)
+        # Replaying an older journal over the new snapshot is harmless, so no ordering worries
+        try: os.remove(self.journal_path)
+        except FileNotFoundError: pass
+        self.journal_lines = 0
+        self.rewrite = False
@@ -0,0 +1,224 @@
+######
+# scripts/core/throttle.py
+######
+import os
+import errno
+import json
+import time
+import shutil
+import threading
+
+# [ CONFIG ]
+PSI_SOURCES = {
+    "io": "/proc/pressure/io",
+    "memory": "/proc/pressure/memory",
+}
+METRICS_DIR = os.environ.get("RUNTIME_DIRECTORY")  # Set by systemd RuntimeDirectory=
+CHUNK_SIZE = 1024 * 1024    # Copy granularity (1 MiB)
+PSI_CHECK_INTERVAL = 1.0    # Seconds between pressure samples
+METRICS_INTERVAL = 2.0      # Seconds between metrics dumps
+MAX_PAUSE = 30.0            # Longest single backoff sleep
+
+def read_psi(path):
+    """
+    Returns the 'some avg10' value (percent of wall time stalled) from a PSI file.
+    Returns None if the kernel has no PSI support.
+    """
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if line.startswith("some"):
+                    for field in line.split():
+                        if field.startswith("avg10="):
+                            return float(field[6:])
+    except (OSError, ValueError):
+        pass
+    return None
+
+class Governor:
+    """
+    Bandwidth governor for bulk movers.
+    - Token bucket: caps throughput at `rate` units/s (0 = unlimited).
+    - PSI backoff: pauses and shrinks the effective rate while the system is
+      stalled on I/O or memory, then recovers additively once pressure drops.
+    """
+
+    def __init__(self, name, rate=0, burst=None, psi_high=20.0, psi_low=5.0, min_factor=0.05):
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, CHUNK_SIZE)
+        self.psi_high = psi_high
+        self.psi_low = psi_low
+        self.min_factor = min_factor
+
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.factor = 1.0  # Multiplier applied to `rate` by PSI backoff
+        self.last_refill = time.monotonic()
+        self.last_psi_check = 0.0
+        self.pressure = {}
+
+        # Metrics
+        self.total_units = 0
+        self.paused_seconds = 0.0
+        self.window_start = time.monotonic()
+        self.window_units = 0
+        self.current_rate = 0.0
+        self.last_metrics_dump = 0.0
+
+    def effective_rate(self):
+        return self.rate * self.factor if self.rate else 0
+
+    def _sample_pressure(self):
+        now = time.monotonic()
+        if now - self.last_psi_check < PSI_CHECK_INTERVAL:
+            return None
+        self.last_psi_check = now
+        readings = {}
+        for key, path in PSI_SOURCES.items():
+            value = read_psi(path)
+            if value is not None:
+                readings[key] = value
+        self.pressure = readings
+        return max(readings.values()) if readings else None
+
+    def backoff(self):
+        """
+        Sleeps while system pressure is above `psi_high`.
+        Safe to call once per item from loops that do not move bytes themselves.
+        """
+        delay = PSI_CHECK_INTERVAL
+        while True:
+            with self.lock:
+                peak = self._sample_pressure()
+                if peak is None or peak < self.psi_high:
+                    if peak is not None and peak < self.psi_low and self.factor < 1.0:
+                        self.factor = min(1.0, self.factor + 0.1)
+                    return
+                self.factor = max(self.min_factor, self.factor / 2)
+            time.sleep(delay)
+            self._record_pause(delay)
+            self.last_psi_check = 0.0  # Force a fresh sample after sleeping
+            delay = min(delay * 2, MAX_PAUSE)
+
+    def acquire(self, amount):
+        """Blocks until `amount` units may be transferred."""
+        self.backoff()
+        if self.rate:
+            while True:
+                with self.lock:
+                    now = time.monotonic()
+                    rate = self.effective_rate()
+                    self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * rate)
+                    self.last_refill = now
+                    if self.tokens >= amount or self.tokens >= self.burst:
+                        self.tokens -= amount
+                        break
+                    wait = (amount - self.tokens) / rate
+                time.sleep(wait)
+                self._record_pause(wait)
+        self._record_transfer(amount)
+
+    def _record_pause(self, seconds):
+        with self.lock:
+            self.paused_seconds += seconds
+
+    def _record_transfer(self, amount):
+        with self.lock:
+            self.total_units += amount
+            self.window_units += amount
+            now = time.monotonic()
+            elapsed = now - self.window_start
+            if elapsed >= METRICS_INTERVAL:
+                self.current_rate = self.window_units / elapsed
+                self.window_units = 0
+                self.window_start = now
+        self.dump_metrics()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "name": self.name,
+                "current_rate": round(self.current_rate, 1),
+                "rate_limit": self.rate,
+                "effective_limit": round(self.effective_rate(), 1),
+                "backoff_factor": round(self.factor, 3),
+                "paused_seconds": round(self.paused_seconds, 3),
+                "total": self.total_units,
+                "pressure": dict(self.pressure),
+                "updated_at": time.time(),
+            }
+
+    def dump_metrics(self, force=False):
+        """Writes metrics to $RUNTIME_DIRECTORY/throttle-<name>.json (atomic replace)."""
+        if not METRICS_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_metrics_dump < METRICS_INTERVAL:
+            return
+        self.last_metrics_dump = now
+        path = os.path.join(METRICS_DIR, f"throttle-{self.name}.json")
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self.metrics(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+def from_config(name, cfg):
+    """
+    Builds a Governor from a config dict:
+    { "rate_limit": bytes/s, "psi_high": %, "psi_low": % }
+    """
+    cfg = cfg or {}
+    return Governor(
+        name,
+        rate=int(cfg.get("rate_limit", 0) or 0),
+        psi_high=float(cfg.get("psi_high", 20.0)),
+        psi_low=float(cfg.get("psi_low", 5.0)),
+    )
+
+def from_env(name):
+    """Builds a Governor from ZENFS_THROTTLE_* environment variables."""
+    return from_config(name, {
+        "rate_limit": os.environ.get("ZENFS_THROTTLE_RATE", 0),
+        "psi_high": os.environ.get("ZENFS_THROTTLE_PSI_HIGH", 20.0),
+        "psi_low": os.environ.get("ZENFS_THROTTLE_PSI_LOW", 5.0),
+    })
+
+def copy_file(src, dst, governor=None):
+    """Chunked copy that honours the governor, then copies metadata (like shutil.copy2)."""
+    # Opening dst for writing would truncate src if both name the same file (e.g. a shadow link)
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        while True:
+            chunk = fsrc.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if governor:
+                governor.acquire(len(chunk))
+            fdst.write(chunk)
+    shutil.copystat(src, dst)
+    return dst
+
+def move(src, dst, governor=None):
+    """
+    Moves a file. Same-filesystem moves are a plain rename.
+    Cross-device moves fall back to a throttled copy + unlink.
+    """
+    try:
+        os.rename(src, dst)
+        return dst
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    try:
+        copy_file(src, dst, governor)
+    except Exception:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+    os.remove(src)
+    return dst
@@ -4,18 +4,26 @@
 import os
 import sys
 import json
-import shutil
 import time
 import logging
+import threading
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlsplit
 
 # Import shared notify module
 sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
 import notify
+import throttle
+import rules
+import move_planner
 
 # [ CONFIG ]
 CONFIG_PATH = os.environ.get("JANITOR_CONFIG")
+BATCH_SETTLE = 10 # Daemon: seconds without sorting before unmatched files are batched
+CLUSTER_GAP = 300 # Default quiet time (s) between downloads that starts a new batch
+BATCH_STATE = ".batches.json" # In Waiting/: open batch per source, so later runs can extend it
+BATCH_STATE_TTL = 86400 # Sources idle this long are dropped from the state
 
 def load_config():
     if not CONFIG_PATH or not os.path.exists(CONFIG_PATH):
@@ -23,111 +31,331 @@ def load_config():
     with open(CONFIG_PATH, 'r') as f:
         return json.load(f)['dumb']
 
-def get_destination(extension, rules):
-    """Finds the destination folder key for a given extension."""
-    ext = extension.lower().strip('.')
-    for folder, extensions in rules.items():
-        if ext in extensions:
-            return folder
-    return None
+def move_to_gate(item, dest_key, watch_dir, planner):
+    """[ LOGIC ] Matched Rule -> Move to Gate (planned; runs in planner.execute)"""
+    user_root = watch_dir.parent
+    target_dir = user_root / dest_key
 
-def main():
+    # The planner indexes the gate once and picks a free name (name_1.ext, ...) in memory
     try:
-        config = load_config()
-    except Exception as e:
-        print(f"Janitor Config Error: {e}")
+        planner.plan(item, target_dir)
+    except OSError as e:
+        print(f"Error preparing {target_dir}: {e}")
         return
+    print(f"[Dumb Janitor] Moving {item.name} -> {dest_key}")
+
+def execute_moves(planner, verb="moving"):
+    """Runs the planned moves. Returns the number that succeeded."""
+    moved = 0
+    for src, dst, error in planner.execute():
+        if error:
+            print(f"Error {verb} {os.path.basename(src)}: {error}")
+        else:
+            moved += 1
+    return moved
+
+def origin_host(item):
+    """Site a download came from (host of the xattr origin URL), or "" if unknown."""
+    origin = rules.FileFacts(item, item.name).origin.split()
+    try:
+        return (urlsplit(origin[0]).hostname or "") if origin else ""
+    except ValueError:
+        return ""
+
+def sort_file(item, watch_dir, ruleset, planner, unmatched, mtime):
+    """Routes one settled file: rule match -> gate, otherwise queued for batching."""
+    dest_key = ruleset.match(item, item.name)
+    if dest_key:
+        move_to_gate(item, dest_key, watch_dir, planner)
+    else:
+        # No rule matched -> Add to potential batch (Paths are rebuilt per move)
+        unmatched.setdefault(watch_dir, []).append((mtime, item.name, origin_host(item)))
+
+def bursts(entries, gap):
+    """
+    Splits (mtime, name, source) entries into clusters: per source, wherever the
+    gap between time-ordered neighbours exceeds `gap`. Yields (source, cluster).
+    """
+    by_source = {}
+    for entry in entries:
+        by_source.setdefault(entry[2], []).append(entry)
+    for source in sorted(by_source):
+        cluster = []
+        last = None
+        for entry in sorted(by_source[source]):
+            if last is not None and entry[0] - last > gap:
+                yield source, cluster
+                cluster = []
+            cluster.append(entry)
+            last = entry[0]
+        if cluster:
+            yield source, cluster
+
+def load_batches(waiting_dir):
+    try:
+        with open(waiting_dir / BATCH_STATE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
+def save_batches(waiting_dir, state):
+    cutoff = time.time() - BATCH_STATE_TTL
+    state = {k: v for k, v in state.items() if v["last"] >= cutoff}
+    tmp = waiting_dir / f"{BATCH_STATE}.tmp"
+    try:
+        waiting_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, waiting_dir / BATCH_STATE)
+    except OSError as e:
+        print(f"Error saving batch state in {waiting_dir}: {e}")
+
+def batch_name(source, cluster, state, gap):
+    """
+    Batch dir for a cluster. A cluster within `gap` of the source's last batch
+    (a burst split across runs or daemon flushes) joins that batch; otherwise
+    it starts one named after its first arrival (and source).
+    """
+    first, last = cluster[0][0], cluster[-1][0]
+    prev = state.get(source)
+    if prev and first <= prev["last"] + gap and last >= prev["first"] - gap:
+        prev["first"], prev["last"] = min(prev["first"], first), max(prev["last"], last)
+        return prev["name"]
+    name = datetime.fromtimestamp(first).strftime("Batch_%Y-%m-%d_%H%M")
+    if source:
+        name += f"_{source}"
+    if not prev or last >= prev["last"]:
+        state[source] = {"name": name, "first": first, "last": last}
+    return name
+
+def batch_unmatched(unmatched_files, governor, cluster_gap=CLUSTER_GAP):
+    # [ SPEC 2.2 ] The Cluster Protocol
+    # Group unmatched files into bursts: one batch per run of downloads that
+    # arrived within `cluster_gap` seconds of each other (multi-part archives, photo dumps)
+    for parent, entries in unmatched_files.items():
+        if not entries:
+            continue
+            
+        # Create Waiting Gate
+        waiting_dir = parent / "Waiting"
+        planner = move_planner.MovePlanner(governor)
+        batches = []
+        state = load_batches(waiting_dir)
+
+        for source, cluster in bursts(entries, cluster_gap):
+            name = batch_name(source, cluster, state, cluster_gap)
+            target_batch_dir = waiting_dir / name
+            try:
+                for _, filename, _ in cluster:
+                    planner.plan(parent / filename, target_batch_dir)
+            except OSError as e:
+                print(f"Error preparing {target_batch_dir}: {e}")
+                continue
+            if name not in batches: batches.append(name)
+        moved_count = execute_moves(planner, "batching")
+        save_batches(waiting_dir, state)
+                
+        if moved_count > 0:
+            target = batches[0] if len(batches) == 1 else f"{len(batches)} batches"
+            notify.send(
+                "ZenOS Sorting Deck",
+                f"Moved {moved_count} unclassified items to {target}",
+                urgency="low"
+            )
+
+def is_candidate(item):
+    return item.is_file() and not item.name.startswith('.')
+
+def sweep(config, governor, ruleset, on_young=None):
+    """
+    One pass over every watched dir (the timer mode, and the daemon's startup
+    reconcile). Files still inside the grace period are skipped, or handed to
+    `on_young(path, watch_dir, mtime)` so the daemon can schedule them.
+    """
     grace_period = config.get('grace_period', 60)
     now = time.time()
     
     # Store unmatched files for batching: { parent_dir: [file_paths] }
     unmatched_files = {}
+    planner = move_planner.MovePlanner(governor)
 
     for watch_dir_str in config.get('watched_dirs', []):
         watch_dir = Path(watch_dir_str)
         if not watch_dir.exists():
             continue
-        
-        unmatched_files[watch_dir] = []
 
         # Iterate files in watched directory
         for item in watch_dir.iterdir():
-            if not item.is_file() or item.name.startswith('.'):
-                continue
+            try:
+                if not is_candidate(item):
+                    continue
 
-            # [ SPEC 2.2 ] Check Grace Period
-            mtime = item.stat().st_mtime
+                # [ SPEC 2.2 ] Check Grace Period
+                mtime = item.stat().st_mtime
+            except OSError:
+                continue
             if (now - mtime) < grace_period:
+                if on_young: on_young(item, watch_dir, mtime)
                 continue
 
-            # Determine destination
-            dest_key = get_destination(item.suffix, config['rules'])
-            
-            if dest_key:
-                # [ LOGIC ] Matched Rule -> Move to Gate
-                user_root = watch_dir.parent
-                target_dir = user_root / dest_key
-                
-                if not target_dir.exists():
-                    try:
-                        target_dir.mkdir(parents=True, exist_ok=True)
-                    except PermissionError:
-                        continue
-
-                target_file = target_dir / item.name
-                if target_file.exists():
-                    stem = item.stem
-                    suffix = item.suffix
-                    counter = 1
-                    while target_file.exists():
-                        target_file = target_dir / f"{stem}_{counter}{suffix}"
-                        counter += 1
+            sort_file(item, watch_dir, ruleset, planner, unmatched_files, mtime)
+
+    execute_moves(planner)
+    batch_unmatched(unmatched_files, governor, config.get('cluster_gap', CLUSTER_GAP))
+    ruleset.dump_metrics()
+
+class TimerWheel:
+    """
+    Hashed timing wheel: O(1) schedule/reschedule, O(due) per tick.
+    Rescheduling only updates `deadlines`; stale slot entries are skipped
+    when their slot comes round (lazy cancellation).
+    """
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self.slots = [set() for _ in range(slots)]
+        self.deadlines = {}     # key -> deadline (authoritative)
+        self.cursor = int(time.time() / tick)
+
+    def schedule(self, key, deadline):
+        self.deadlines[key] = deadline
+        slot = max(int(deadline / self.tick), self.cursor)
+        self.slots[slot % len(self.slots)].add(key)
+
+    def cancel(self, key):
+        self.deadlines.pop(key, None)
+
+    def __len__(self):
+        return len(self.deadlines)
 
+    def advance(self, now):
+        """Returns the keys whose deadline has passed, in tick order."""
+        due = []
+        target = int(now / self.tick)
+        # Jumps longer than a full rotation only need one pass over the wheel
+        start = max(self.cursor, target - len(self.slots) + 1)
+        for tick_no in range(start, target + 1):
+            bucket = self.slots[tick_no % len(self.slots)]
+            for key in list(bucket):
+                deadline = self.deadlines.get(key)
+                if deadline is None:
+                    bucket.discard(key)             # Cancelled
+                elif deadline <= now:
+                    bucket.discard(key)
+                    del self.deadlines[key]
+                    due.append(key)
+                elif int(deadline / self.tick) % len(self.slots) != tick_no % len(self.slots):
+                    bucket.discard(key)             # Rescheduled elsewhere
+        self.cursor = target + 1
+        return due
+
+def daemon(config):
+    """
+    Watches the directories and sorts each file the moment its grace period
+    (since last write) expires. Unmatched files are batched once the deck has
+    been quiet for BATCH_SETTLE seconds; a burst still trickling in after that
+    joins the same batch (see batch_name).
+    """
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+
+    grace_period = config.get('grace_period', 60)
+    governor = throttle.from_config("dumb", config.get('throttle'))
+    ruleset = rules.compile_rules(config)
+    wheel = TimerWheel()
+    lock = threading.Lock()
+    owners = {}         # path -> watch_dir
+    unmatched = {}
+    last_sort = [0.0]
+
+    def arm(item, watch_dir, mtime):
+        with lock:
+            owners[str(item)] = watch_dir
+            wheel.schedule(str(item), mtime + grace_period)
+
+    class DeckHandler(FileSystemEventHandler):
+        def __init__(self, watch_dir):
+            self.watch_dir = watch_dir
+
+        def _touch(self, path):
+            item = Path(path)
+            if item.parent != self.watch_dir or item.name.startswith('.'): return
+            arm(item, self.watch_dir, time.time())
+
+        def _forget(self, path):
+            with lock:
+                wheel.cancel(path)
+                owners.pop(path, None)
+
+        def on_created(self, event):
+            if not event.is_directory: self._touch(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory: self._touch(event.src_path)
+
+        def on_closed(self, event):
+            self._touch(event.src_path)
+
+        def on_deleted(self, event):
+            self._forget(event.src_path)
+
+        def on_moved(self, event):
+            self._forget(event.src_path)
+            if not event.is_directory: self._touch(event.dest_path)
+
+    observer = Observer()
+    for watch_dir_str in config.get('watched_dirs', []):
+        watch_dir = Path(watch_dir_str)
+        if watch_dir.exists():
+            observer.schedule(DeckHandler(watch_dir), str(watch_dir), recursive=False)
+    # Watch first, then reconcile, so nothing slips in between
+    observer.start()
+    print("[Dumb Janitor] Daemon mode: reconciling existing files...")
+    sweep(config, governor, ruleset, on_young=arm)
+
+    try:
+        while True:
+            time.sleep(wheel.tick)
+            now = time.time()
+            with lock:
+                due = [(key, owners.pop(key, None)) for key in wheel.advance(now)]
+            planner = move_planner.MovePlanner(governor)
+            for key, watch_dir in due:
+                item = Path(key)
                 try:
-                    print(f"[Dumb Janitor] Moving {item.name} -> {dest_key}")
-                    shutil.move(str(item), str(target_file))
-                except Exception as e:
-                    print(f"Error moving {item.name}: {e}")
-            else:
-                # No rule matched -> Add to potential batch
-                unmatched_files[watch_dir].append(item)
+                    if watch_dir is None or not is_candidate(item): continue
+                    mtime = item.stat().st_mtime
+                except OSError:
+                    continue
+                if now - mtime < grace_period:
+                    # Written again without an event we saw (e.g. mmap): re-arm
+                    arm(item, watch_dir, mtime)
+                    continue
+                sort_file(item, watch_dir, ruleset, planner, unmatched, mtime)
+                last_sort[0] = now
+            if due:
+                execute_moves(planner)
+                ruleset.dump_metrics()
+            if unmatched and now - last_sort[0] >= BATCH_SETTLE:
+                batch_unmatched(unmatched, governor, config.get('cluster_gap', CLUSTER_GAP))
+                unmatched = {}
+    except KeyboardInterrupt:
+        observer.stop()
+    observer.join()
 
-    # [ SPEC 2.2 ] The Cluster Protocol
-    # Group unmatched files into bursts
-    for parent, files in unmatched_files.items():
-        if not files:
-            continue
-            
-        # Create Waiting Gate
-        waiting_dir = parent / "Waiting"
-        if not waiting_dir.exists():
-            waiting_dir.mkdir(exist_ok=True)
-            
-        # Simple Clustering: If we have multiple files, create a batch folder
-        # Logic: If > 1 file, create batch. If 1 file, move to Waiting/Misc?
-        # Spec says "Groups bursts". We'll just batch everything for hygiene.
-        
-        batch_name = datetime.now().strftime("Batch_%Y-%m-%d_%H%M")
-        target_batch_dir = waiting_dir / batch_name
-        
-        if not target_batch_dir.exists():
-            target_batch_dir.mkdir(exist_ok=True)
-            
-        moved_count = 0
-        for item in files:
-            try:
-                shutil.move(str(item), str(target_batch_dir / item.name))
-                moved_count += 1
-            except Exception as e:
-                print(f"Error batching {item.name}: {e}")
-                
-        if moved_count > 0:
-            notify.send(
-                "ZenOS Sorting Deck",
-                f"Moved {moved_count} unclassified items to {batch_name}",
-                urgency="low"
-            )
+def main():
+    try:
+        config = load_config()
+    except Exception as e:
+        print(f"Janitor Config Error: {e}")
+        return
+
+    if config.get('mode') == "daemon" or "--daemon" in sys.argv:
+        daemon(config)
+        return
+
+    governor = throttle.from_config("dumb", config.get('throttle'))
+    sweep(config, governor, rules.compile_rules(config))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
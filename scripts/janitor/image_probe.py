@@ -0,0 +1,177 @@
+######
+# scripts/janitor/image_probe.py
+######
+"""
+Header-only image probing for the Oracle (no Pillow, no pixel decode).
+
+Reads dimensions straight from PNG IHDR, JPEG SOFn and WebP VP8/VP8L/VP8X
+headers, plus the EXIF fields the heuristics use (Orientation, Make, Model,
+Software) from JPEG APP1, PNG eXIf and WebP EXIF chunks. PNG tEXt/iTXt
+"Software" keys are read too (screenshot tools write those instead of EXIF).
+
+All reads are small and bounded: HEAD_BYTES up front, then only chunk
+headers and metadata segments (each at most MAX_SEGMENT). probe() returns None for anything it cannot parse,
+so callers can fall back to a full decoder.
+"""
+import struct
+
+# [ CONSTANTS ]
+HEAD_BYTES = 4096           # First read: enough for PNG/WebP headers and most JPEG preambles
+MAX_SEGMENT = 64 * 1024     # One APP1 segment (EXIF) is at most 64 KiB
+MAX_CHUNKS = 64             # PNG/WebP chunk headers walked before giving up
+TAG_ORIENTATION = 0x0112
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_SOFTWARE = 0x0131
+EXIF_TAGS = {TAG_ORIENTATION: "orientation", TAG_MAKE: "make", TAG_MODEL: "model", TAG_SOFTWARE: "software"}
+# JPEG start-of-frame markers (C4 = DHT, C8 = JPG, CC = DAC are not frames)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def parse_exif(data):
+    """Orientation/make/model/software from a TIFF-structured EXIF block (IFD0 only)."""
+    if data.startswith(b"Exif\x00\x00"):
+        data = data[6:]
+    if len(data) < 8:
+        return {}
+    order = {b"II": "<", b"MM": ">"}.get(data[:2])
+    if order is None:
+        return {}
+    ifd = struct.unpack_from(order + "I", data, 4)[0]
+    if ifd + 2 > len(data):
+        return {}
+    count = struct.unpack_from(order + "H", data, ifd)[0]
+    tags = {}
+    for i in range(count):
+        pos = ifd + 2 + i * 12
+        if pos + 12 > len(data):
+            break
+        tag, kind, n, value = struct.unpack_from(order + "HHII", data, pos)
+        name = EXIF_TAGS.get(tag)
+        if name is None:
+            continue
+        if kind == 3:       # SHORT: stored inline
+            tags[name] = struct.unpack_from(order + "H", data, pos + 8)[0]
+        elif kind == 2:     # ASCII: inline when it fits in 4 bytes
+            raw = data[pos + 8:pos + 8 + n] if n <= 4 else data[value:value + n]
+            tags[name] = raw.split(b"\x00", 1)[0].decode(errors='replace').strip()
+    return tags
+
+def _probe_png(f, head):
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", head[16:24])
+    info = {"format": "png", "width": width, "height": height}
+    pos = 8
+    for _ in range(MAX_CHUNKS):
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, kind = struct.unpack(">I4s", header)
+        if kind in (b"IDAT", b"IEND"):
+            break       # Metadata after the pixels is rare; not worth the seek
+        if kind in (b"eXIf", b"tEXt", b"iTXt") and length <= MAX_SEGMENT:
+            data = f.read(length)
+            if kind == b"eXIf":
+                info.update(parse_exif(data))
+            else:
+                key, _, text = data.partition(b"\x00")
+                if key == b"Software":
+                    if kind == b"iTXt":
+                        # compression flag, method, language\0, translated keyword\0
+                        text = text[2:].split(b"\x00", 2)[-1]
+                    info.setdefault("software", text.decode(errors='replace').strip())
+        pos += 12 + length
+    return info
+
+def _probe_jpeg(f, head):
+    info = {"format": "jpeg"}
+    base = 0                # File offset of head[0]
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:
+            pos += 1        # Fill byte
+            continue
+        length = struct.unpack_from(">H", head, pos + 2)[0]
+        if marker in SOF_MARKERS:
+            if pos + 9 > len(head):
+                break
+            height, width = struct.unpack_from(">HH", head, pos + 5)
+            info.update(width=width, height=height)
+            return info
+        if marker == 0xE1 and head[pos + 4:pos + 10] == b"Exif\x00\x00":
+            segment = head[pos + 4:pos + 2 + length]
+            if len(segment) < length - 2:
+                f.seek(base + pos + 4)
+                segment = f.read(length - 2)
+            info.update(parse_exif(segment))
+        if marker == 0xDA:
+            break           # Start of scan without a frame header: give up
+        pos += 2 + length
+        if pos + 4 > len(head):
+            # Frame header beyond the current read (big APP segments): read on from there
+            base += pos
+            f.seek(base)
+            head = f.read(HEAD_BYTES)
+            pos = 0
+            if len(head) < 4:
+                break
+    return None
+
+def _probe_webp(f, head):
+    if len(head) < 30:
+        return None
+    info = {"format": "webp"}
+    kind = head[12:16]
+    if kind == b"VP8 ":
+        width, height = struct.unpack_from("<HH", head, 26)
+        info.update(width=width & 0x3FFF, height=height & 0x3FFF)
+        return info
+    if kind == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        info.update(width=(bits & 0x3FFF) + 1, height=((bits >> 14) & 0x3FFF) + 1)
+        return info
+    if kind != b"VP8X":
+        return None
+    info.update(
+        width=int.from_bytes(head[24:27], "little") + 1,
+        height=int.from_bytes(head[27:30], "little") + 1,
+    )
+    if head[20] & 0x08:     # EXIF flag: the chunk usually trails the bitstream
+        pos = 12
+        for _ in range(MAX_CHUNKS):
+            f.seek(pos)
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            chunk, length = struct.unpack("<4sI", header)
+            if chunk == b"EXIF":
+                if length <= MAX_SEGMENT:
+                    info.update(parse_exif(f.read(length)))
+                break
+            pos += 8 + length + (length & 1)
+    return info
+
+def probe(path):
+    """{"format", "width", "height"[, "orientation", "make", "model", "software"]} or None."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(HEAD_BYTES)
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                return _probe_png(f, head)
+            if head.startswith(b"\xff\xd8"):
+                return _probe_jpeg(f, head)
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _probe_webp(f, head)
+    except (OSError, struct.error):
+        pass
+    return None
+
+def display_size(info):
+    """(width, height) as shown, i.e. swapped for EXIF orientations 5-8 (rotated 90°)."""
+    if info.get("orientation") in (5, 6, 7, 8):
+        return info["height"], info["width"]
+    return info["width"], info["height"]
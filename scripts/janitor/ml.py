@@ -4,22 +4,29 @@
 import os
 import sys
 import json
-import time
 from pathlib import Path
-from PIL import Image
 
 # Import shared notify module
 sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
 import notify
+import oracle_cache
+import suggestion_store
+import image_probe
 
 # [ CONFIG ]
 CONFIG_PATH = os.environ.get("JANITOR_CONFIG")
+ANALYZER_VERSION = 2 # Bump when analyze_* heuristics change (invalidates the scan cache)
+IMAGE_EXTS = {'.png', '.jpg', '.jpeg', '.webp'}
+TEXT_EXTS = {'.txt', '.md', '.py', '.sh'}
+SCREENSHOT_TOOLS = ("screenshot", "spectacle", "flameshot", "grim", "shutter", "ksnip")
 
 class JanitorML:
     def __init__(self):
         self.config = self._load_config()
-        self.suggestions_db_path = Path(self.config['suggestions_db'])
-        self.suggestions = self._load_suggestions()
+        self.store = suggestion_store.SuggestionStore(
+            self.config.get('suggestions_db'),
+            self.config.get('suggestion_retention_days', suggestion_store.RETENTION_DAYS)
+        )
         self.new_suggestions_count = 0
 
     def _load_config(self):
@@ -28,40 +35,46 @@ class JanitorML:
         with open(CONFIG_PATH, 'r') as f:
             return json.load(f)['ml']
 
-    def _load_suggestions(self):
-        if self.suggestions_db_path.exists():
-            try:
-                with open(self.suggestions_db_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return []
-        return []
-
-    def _save_suggestions(self):
-        if not self.suggestions_db_path.parent.exists():
-            self.suggestions_db_path.parent.mkdir(parents=True, exist_ok=True)
-            
-        with open(self.suggestions_db_path, 'w') as f:
-            json.dump(self.suggestions, f, indent=2)
+    def probe_image(self, filepath):
+        """Header-only probe; falls back to a full PIL open only for files it cannot parse."""
+        info = image_probe.probe(filepath)
+        if info is not None:
+            return info
+        from PIL import Image   # Lazy: Pillow's import alone dominates the oneshot's startup
+        with Image.open(filepath) as img:
+            width, height = img.size
+        return {"format": "pil", "width": width, "height": height}
 
     def analyze_image(self, filepath):
         try:
-            with Image.open(filepath) as img:
-                width, height = img.size
-                aspect = width / height if height else 0
-                
+            info = self.probe_image(filepath)
+            width, height = image_probe.display_size(info)
+            aspect = width / height if height else 0
+            parent_name = filepath.parent.name.lower()
+
+            software = info.get("software", "")
+            if any(tool in software.lower() for tool in SCREENSHOT_TOOLS) and "screenshot" not in parent_name:
+                return {
+                    "action": "move",
+                    "target": "Screenshots",
+                    "reason": f"Created by {software}",
+                    "confidence": 0.95
+                }
+
+            is_screenshot = False
+            if 1.77 <= aspect <= 1.78 or 0.56 <= aspect <= 0.57:
+                is_screenshot = True
+            # A camera make in EXIF means a real photo, whatever the aspect ratio
+            if info.get("make"):
                 is_screenshot = False
-                if 1.77 <= aspect <= 1.78 or 0.56 <= aspect <= 0.57:
-                    is_screenshot = True
-                
-                parent_name = filepath.parent.name.lower()
-                if "camera" in parent_name and is_screenshot:
-                     return {
-                        "action": "move",
-                        "target": "Screenshots",
-                        "reason": "Detected 16:9 aspect ratio in Camera folder",
-                        "confidence": 0.85
-                    }
+
+            if "camera" in parent_name and is_screenshot:
+                 return {
+                    "action": "move",
+                    "target": "Screenshots",
+                    "reason": "Detected 16:9 aspect ratio in Camera folder",
+                    "confidence": 0.85
+                }
         except Exception:
             pass
         return None
@@ -94,50 +107,54 @@ class JanitorML:
         if not analysis:
             return
 
-        suggestion = {
-            "source": str(filepath),
-            "suggested_target": analysis['target'],
-            "reason": analysis['reason'],
-            "confidence": analysis['confidence'],
-            "timestamp": time.time(),
-            "status": "pending"
-        }
-        
-        # Avoid duplicates
-        for s in self.suggestions:
-            if s['source'] == str(filepath) and s['status'] == 'pending':
-                return
+        # Avoid duplicates (indexed by source path in the store)
+        if not self.store.add(filepath, analysis['target'], analysis['reason'], analysis['confidence']):
+            return
 
         print(f"[Oracle] Suggestion: Move {filepath.name} -> {analysis['target']} ({analysis['reason']})")
-        self.suggestions.append(suggestion)
         self.new_suggestions_count += 1
 
     def run(self):
         print("ZenOS Oracle: Beginning Scan...")
         scan_dirs = self.config.get('scan_dirs', [])
-        
+        cache = oracle_cache.ScanCache(
+            self.config.get('scan_cache'), ANALYZER_VERSION,
+            self.config.get('full_rescan_hours', oracle_cache.FULL_RESCAN_HOURS)
+        )
+        # Directory-mtime pruning misses in-place rewrites, so stat every file now and then
+        full = cache.full_due()
+        analyzed = 0
+
         for dir_path in scan_dirs:
             path = Path(dir_path)
             if not path.exists():
                 continue
-                
-            for item in path.rglob('*'):
-                if item.is_file():
-                    if item.name.startswith('.'):
-                        continue
-                        
-                    ext = item.suffix.lower()
-                    result = None
-                    
-                    if ext in ['.png', '.jpg', '.jpeg', '.webp']:
-                        result = self.analyze_image(item)
-                    elif ext in ['.txt', '.md', '.py', '.sh']:
-                        result = self.analyze_text(item)
-                        
-                    if result:
-                        self.add_suggestion(item, result)
-
-        self._save_suggestions()
+
+            # Only new or changed files come back from the cache walk
+            for directory, name, st in cache.scan(path, IMAGE_EXTS | TEXT_EXTS, full):
+                item = Path(directory) / name
+                ext = item.suffix.lower()
+                result = None
+
+                if ext in IMAGE_EXTS:
+                    result = self.analyze_image(item)
+                elif ext in TEXT_EXTS:
+                    result = self.analyze_text(item)
+                cache.record(directory, name, st, result)
+                analyzed += 1
+
+                if result:
+                    self.add_suggestion(item, result)
+
+        # Suggestions first: a verdict must never be saved without the suggestion it produced
+        # (if the flush fails, or the run dies here, these files are analyzed again next time)
+        self.store.flush()
+        cache.retain_seen()
+        if full:
+            cache.mark_full()
+        cache.save()
+        print(f"[Oracle] Analyzed {analyzed} new/changed files ({cache.stats()['files']} known{', full rescan' if full else ''})")
+
         print("ZenOS Oracle: Scan Complete.")
         
         # [ NOTIFY ]
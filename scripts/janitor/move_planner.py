@@ -0,0 +1,140 @@
+######
+# scripts/janitor/move_planner.py
+######
+"""
+Batch move planner for the janitors.
+
+Each destination directory is listed once into a NameIndex; collision-free
+names ("name_1.ext", "name_2.ext", ...) are then handed out from memory with
+a per-stem counter, so a folder full of "image (1).png" copies costs no
+extra stats. Moves on the same filesystem are renames; cross-device moves run
+in a small thread pool as governed copies to a temporary name, verified by
+size + BLAKE2b against the source before the rename into place and the
+source unlink.
+"""
+import os
+import errno
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import throttle
+
+# [ CONSTANTS ]
+COPY_WORKERS = 2        # Parallel cross-device copies (kept small: usually one slow disk)
+PART_SUFFIX = ".zenfs-part"
+HASH_CHUNK = 1024 * 1024
+
+class NameIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.names = set(os.listdir(directory))
+        self.counters = {}  # (stem, suffix) -> next suffix number to try
+        self.lock = threading.Lock()
+
+    def claim(self, name):
+        """Reserves a free name in the directory (amortized O(1))."""
+        with self.lock:
+            if name not in self.names:
+                self.names.add(name)
+                return name
+            stem, suffix = os.path.splitext(name)
+            n = self.counters.get((stem, suffix), 1)
+            while f"{stem}_{n}{suffix}" in self.names:
+                n += 1
+            candidate = f"{stem}_{n}{suffix}"
+            self.counters[(stem, suffix)] = n + 1
+            self.names.add(candidate)
+            return candidate
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk: break
+            h.update(chunk)
+    return h.hexdigest()
+
+def verified_copy(src, dst, governor=None):
+    """Governed copy to a temp name, verified, then renamed into place. Removes src."""
+    tmp = dst + PART_SUFFIX
+    try:
+        throttle.copy_file(src, tmp, governor)
+        with open(tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        if os.path.getsize(src) != os.path.getsize(tmp) or _digest(src) != _digest(tmp):
+            raise OSError(errno.EIO, f"Verification failed for {src}")
+        os.rename(tmp, dst)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    os.remove(src)
+    return dst
+
+class MovePlanner:
+    """
+    plan() reserves destinations; execute() performs the moves.
+    Returns from execute(): [(src, dst, error_or_None)] in plan order.
+    """
+
+    def __init__(self, governor=None, workers=COPY_WORKERS):
+        self.governor = governor
+        self.workers = workers
+        self.indexes = {}
+        self.devices = {}
+        self.moves = []     # (src, dst, same_fs)
+
+    def index(self, directory):
+        directory = str(directory)
+        if directory not in self.indexes:
+            self.indexes[directory] = NameIndex(directory)
+            self.devices[directory] = os.stat(directory).st_dev
+        return self.indexes[directory]
+
+    def plan(self, src, dest_dir, name=None):
+        src = str(src)
+        idx = self.index(dest_dir)
+        dst = os.path.join(idx.directory, idx.claim(name or os.path.basename(src)))
+        try: same_fs = os.stat(src).st_dev == self.devices[idx.directory]
+        except OSError: same_fs = True  # Let the rename report it
+        self.moves.append((src, dst, same_fs))
+        return dst
+
+    def _rename(self, src, dst):
+        # The index was built at plan time; never clobber a file that appeared since
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, "Destination appeared", dst)
+        os.rename(src, dst)
+
+    def execute(self):
+        results = [None] * len(self.moves)
+        remote = []
+        for i, (src, dst, same_fs) in enumerate(self.moves):
+            if not same_fs:
+                remote.append(i)
+                continue
+            try:
+                self._rename(src, dst)
+                results[i] = (src, dst, None)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    remote.append(i)    # Bind mounts: same st_dev is not a guarantee
+                else:
+                    results[i] = (src, dst, e)
+
+        if remote:
+            def copy(i):
+                src, dst, _ = self.moves[i]
+                try:
+                    verified_copy(src, dst, self.governor)
+                    return i, None
+                except Exception as e:
+                    return i, e
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for i, error in pool.map(copy, remote):
+                    results[i] = (self.moves[i][0], self.moves[i][1], error)
+
+        self.moves = []
+        return results
@@ -5,10 +5,13 @@ import os
 import sys
 import json
 import shutil
+import errno
 import re
-import subprocess
 import time
 import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import mutagen
 from watchdog.observers import Observer
@@ -17,10 +20,20 @@ from watchdog.events import FileSystemEventHandler
 # Import shared notify module
 sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
 import notify
+import throttle
+import tag_cache
+import music_library
+import music_art
+import music_dupes
 
 # [ CONFIG ]
 CONFIG_PATH = os.environ.get("JANITOR_CONFIG")
-DEBOUNCE_SECONDS = 10 # Wait this long after last event before regenerating
+DEBOUNCE_SECONDS = 2 # Wait this long after last event before applying changes
+MAX_TAG_WORKERS = 4 # Hard cap on parser processes (keeps the desktop responsive)
+WORKER_NICE = 10
+VIEW_MODE = 0o777 # Forest dirs must be visible to every user/player
+CATEGORIES = ["Artists", "Years", "Genres", "OSTs"]
+INFLIGHT_PER_WORKER = 32 # Bounded lookahead between the scanner and the pool
 
 def load_config():
     if not CONFIG_PATH or not os.path.exists(CONFIG_PATH):
@@ -67,116 +80,393 @@ def get_list(audio, key):
     if isinstance(val, list): return val
     return [str(val)]
 
-def generate_forest(config):
-    db_root = Path(config['unsorted_dir'])
-    view_root = Path(config['music_dir'])
-    split_symbols = config.get('split_symbols', [';', ','])
-    
-    # [ HOTSWAP ] Build in a hidden temporary directory first
-    # Must be on same filesystem for atomic rename, so we keep it in view_root
-    build_root = view_root / ".zenfs_building"
-    if build_root.exists():
-        shutil.rmtree(build_root)
-    build_root.mkdir()
+def parse_position(values):
+    # "3/12" -> 3
+    try: return int(str(values[0]).split('/')[0])
+    except (IndexError, ValueError): return None
 
-    if not db_root.exists():
-        print(f"Database root {db_root} does not exist.")
-        return
+def read_track(item, split_pattern):
+    """
+    Parses tags into the normalized fields the forest is built from.
+    Returns None for non-audio files.
+    """
+    audio = mutagen.File(item, easy=True)
+    if not audio: return None
 
-    print("Regenerating Forest (Hybrid Linking)...")
-    count = 0
-    split_pattern = '|'.join(map(re.escape, split_symbols))
+    artists_raw = get_list(audio, 'artist')
+    album_artists_raw = get_list(audio, 'albumartist')
+    albums_raw = get_list(audio, 'album')
+    titles_raw = get_list(audio, 'title')
+    dates_raw = get_list(audio, 'date')
+    genres_raw = get_list(audio, 'genre')
+    track_raw = get_list(audio, 'tracknumber')
+    disc_raw = get_list(audio, 'discnumber')
+
+    title = titles_raw[0] if titles_raw else item.stem
+    album_tag = albums_raw[0] if albums_raw else None
+    year = dates_raw[0][:4] if dates_raw else "0000"
 
-    for item in db_root.rglob('*'):
-        if item.is_file():
+    primary_artist = album_artists_raw[0] if album_artists_raw else (artists_raw[0] if artists_raw else "Unknown Artist")
+    primary_artist = sanitize_name(primary_artist)
+
+    source_artists = artists_raw if artists_raw else [primary_artist]
+    all_artists = set()
+
+    for entry in source_artists:
+        if split_pattern:
+            parts = re.split(split_pattern, entry)
+        else:
+            parts = [entry]
+        for part in parts:
+            cleaned = part.strip()
+            if cleaned:
+                all_artists.add(sanitize_name(cleaned))
+
+    return {
+        "title": sanitize_name(title),
+        "album": sanitize_name(album_tag) if album_tag else None,
+        "year": sanitize_name(year),
+        "primary_artist": primary_artist,
+        "artists": sorted(all_artists),
+        "genres": [sanitize_name(g) for g in genres_raw],
+        "is_ost": bool(any('soundtrack' in g.lower() for g in genres_raw) or (album_tag and 'ost' in album_tag.lower())),
+        "suffix": item.suffix,
+        "track": parse_position(track_raw),
+        "disc": parse_position(disc_raw),
+        "duration": round(audio.info.length, 1) if getattr(audio, 'info', None) else None,
+    }
+
+def load_track(item, split_pattern, tags):
+    """read_track through the persistent tag cache. Returns (fields, cache key)."""
+    st = item.stat()
+    fields = tags.get(str(item), st)
+    if fields is tag_cache.MISS:
+        fields = read_track(item, split_pattern)
+        tags.put(str(item), st, fields)
+    return fields, tag_cache.file_key(st)
+
+def _worker_init():
+    try: os.nice(WORKER_NICE)
+    except OSError: pass
+
+def _parse_worker(path, split_pattern):
+    # Runs in a pool process. (ok, fields): failures are not cached, non-audio (None) is.
+    try:
+        return True, read_track(Path(path), split_pattern)
+    except Exception:
+        return False, None
+
+def tag_workers(config):
+    requested = config.get('tag_workers') or max(1, (os.cpu_count() or 2) - 1)
+    return max(1, min(int(requested), MAX_TAG_WORKERS))
+
+def scan_files(root):
+    """Streaming os.scandir walk in sorted, depth-first order (deterministic)."""
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
             try:
-                audio = mutagen.File(item, easy=True)
-                if not audio: continue
-                
-                artists_raw = get_list(audio, 'artist')
-                album_artists_raw = get_list(audio, 'albumartist')
-                albums_raw = get_list(audio, 'album')
-                titles_raw = get_list(audio, 'title')
-                dates_raw = get_list(audio, 'date')
-                genres_raw = get_list(audio, 'genre')
-                
-                title = titles_raw[0] if titles_raw else item.stem
-                album_tag = albums_raw[0] if albums_raw else None
-                year = dates_raw[0][:4] if dates_raw else "0000"
-                
-                primary_artist = album_artists_raw[0] if album_artists_raw else (artists_raw[0] if artists_raw else "Unknown Artist")
-                primary_artist = sanitize_name(primary_artist)
-
-                source_artists = artists_raw if artists_raw else [primary_artist]
-                all_artists = set()
-                
-                for entry in source_artists:
-                    if split_pattern:
-                        parts = re.split(split_pattern, entry)
-                    else:
-                        parts = [entry]
-                    for part in parts:
-                        cleaned = part.strip()
-                        if cleaned:
-                            all_artists.add(sanitize_name(cleaned))
-
-                s_title = sanitize_name(title)
-                s_album = sanitize_name(album_tag) if album_tag else "Singles"
-                s_year = sanitize_name(year)
-                
-                filename = f"{s_title}{item.suffix}"
-
-                # [ STRUCTURE ]
-                for artist in all_artists:
-                    target_category = "Albums"
-                    target_subfolder = s_album
-
-                    if artist == primary_artist:
-                        if not album_tag: 
-                            target_category = "Singles"
-                            target_subfolder = ""
-                    else:
-                        target_category = "Features"
-                        target_subfolder = "" 
-
-                    path_parts = ["Artists", artist, target_category]
-                    if target_subfolder: path_parts.append(target_subfolder)
-                    path_parts.append(filename)
-                    
-                    create_link(item, build_root.joinpath(*path_parts))
-                
-                if album_tag:
-                    create_link(item, build_root / "Years" / s_year / s_album / filename)
-                else:
-                    create_link(item, build_root / "Years" / s_year / "Singles" / filename)
-                
-                for genre in genres_raw:
-                    s_genre = sanitize_name(genre)
-                    create_link(item, build_root / "Genres" / s_genre / filename)
-                
-                is_ost = any('soundtrack' in g.lower() for g in genres_raw) or (album_tag and 'ost' in album_tag.lower())
-                if is_ost:
-                    create_link(item, build_root / "OSTs" / (s_album if album_tag else "Unknown") / filename)
-
-                count += 1
-                
-            except Exception as e:
+                if entry.is_dir(follow_symlinks=False): subdirs.append(entry.path)
+                elif entry.is_file(): yield entry
+            except OSError:
                 continue
+        stack.extend(reversed(subdirs))
+
+def iter_tracks(root, split_pattern, tags, workers):
+    """
+    Yields (item, fields, cache key) for every file under root, in scan order.
+    Cache hits are resolved inline; misses are parsed by a process pool that is
+    only started if needed. Results are released strictly in scan order, so the
+    forest (and link collisions) are identical to a serial build.
+    """
+    pending = deque()
+    pool = None
+    window = workers * INFLIGHT_PER_WORKER
+
+    def finish(path, st, fields):
+        if not isinstance(fields, tuple):
+            ok, fields = fields.result()
+            if ok: tags.put(path, st, fields)
+        else:
+            fields = fields[1]
+        return Path(path), fields, tag_cache.file_key(st)
 
-    # [ PERMISSIONS ]
-    # Recursive chmod 777 on the build directory to ensure visibility
     try:
-        subprocess.run(["chmod", "-R", "777", str(build_root)], check=False)
-    except Exception:
-        pass
+        for entry in scan_files(root):
+            try: st = entry.stat()
+            except OSError: continue
+            fields = tags.get(entry.path, st)
+            if fields is not tag_cache.MISS:
+                fields = (True, fields)
+            elif workers > 1:
+                if pool is None:
+                    # Not fork: this process already runs watchdog/debounce threads whose locks a fork would inherit
+                    pool = ProcessPoolExecutor(
+                        max_workers=workers, initializer=_worker_init,
+                        mp_context=multiprocessing.get_context("forkserver")
+                    )
+                fields = pool.submit(_parse_worker, entry.path, split_pattern)
+            else:
+                fields = _parse_worker(entry.path, split_pattern)
+                if fields[0]: tags.put(entry.path, st, fields[1])
+            pending.append((entry.path, st, fields))
 
-    # [ HOTSWAP ]
-    categories = ["Artists", "Years", "Genres", "OSTs"]
+            while pending and (len(pending) > window or isinstance(pending[0][2], tuple) or pending[0][2].done()):
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def open_tag_cache(config):
+    # Split symbols change normalization, so they salt the cache
+    return tag_cache.TagCache(config.get('tag_cache'), salt=json.dumps(config.get('split_symbols', [';', ','])))
+
+def track_links(track):
+    """Relative link paths (tuples of parts, under music_dir) for one parsed track."""
+    filename = f"{track['title']}{track['suffix']}"
+    s_album = track['album'] or "Singles"
+    links = []
+
+    # [ STRUCTURE ]
+    for artist in track['artists']:
+        target_category = "Albums"
+        target_subfolder = s_album
+
+        if artist == track['primary_artist']:
+            if not track['album']:
+                target_category = "Singles"
+                target_subfolder = ""
+        else:
+            target_category = "Features"
+            target_subfolder = ""
+
+        path_parts = ["Artists", artist, target_category]
+        if target_subfolder: path_parts.append(target_subfolder)
+        path_parts.append(filename)
+        links.append(tuple(path_parts))
+
+    links.append(("Years", track['year'], s_album, filename))
+
+    for genre in track['genres']:
+        links.append(("Genres", genre, filename))
+
+    if track['is_ost']:
+        links.append(("OSTs", track['album'] or "Unknown", filename))
+
+    return links
+
+class ForestWriter:
+    """
+    Batched writer for full builds. Links are planned first (last claimant of
+    a path wins, like successive create_link calls), then written in one
+    sorted pass: every directory is created exactly once with its final mode,
+    and links are made relative to the open directory fd (only the current
+    parent chain is held open). Each source is resolved once per track, and a
+    track that cannot be hardlinked (cross-device) goes straight to symlinks.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.sources = []   # resolved source paths
+        self.links = {}     # link tuple -> source index
+        self.symlinked = set()
+        self.shared = set()
+
+    def add(self, source, links):
+        idx = len(self.sources)
+        self.sources.append(os.path.realpath(source))
+        for link in links:
+            self.links[link] = idx
+
+    def _link(self, idx, name, dir_fd):
+        src = self.sources[idx]
+        if idx not in self.symlinked:
+            try:
+                os.link(src, name, dst_dir_fd=dir_fd)
+                if idx not in self.shared:
+                    # A hardlink shares the inode: open it up once per track,
+                    # as the old chmod -R over the build tree did
+                    self.shared.add(idx)
+                    try: os.chmod(src, VIEW_MODE)
+                    except OSError: pass
+                return
+            except OSError as e:
+                # Cross-device (or hardlinks refused): the whole track falls back
+                if e.errno != errno.EEXIST: self.symlinked.add(idx)
+        try: os.symlink(src, name, dir_fd=dir_fd)
+        except OSError: pass
+
+    def write(self):
+        files = {}
+        for link, idx in self.links.items():
+            files.setdefault(link[:-1], []).append((link[-1], idx))
+        dirs = sorted({link[:i] for link in self.links for i in range(1, len(link))})
+
+        root_fd = os.open(self.root, os.O_RDONLY | os.O_DIRECTORY)
+        stack = [((), root_fd)]
+        try:
+            # Sorted tuples visit parents before children (depth-first)
+            for d in dirs:
+                while stack[-1][0] != d[:-1]:
+                    fd = stack.pop()[1]
+                    if fd is not None: os.close(fd)
+                parent_fd = stack[-1][1]
+                if parent_fd is None:
+                    stack.append((d, None))
+                    continue
+                try:
+                    os.mkdir(d[-1], VIEW_MODE, dir_fd=parent_fd)
+                    fd = os.open(d[-1], os.O_RDONLY | os.O_DIRECTORY, dir_fd=parent_fd)
+                except OSError:
+                    # Skip the whole subtree (e.g. name too long)
+                    stack.append((d, None))
+                    continue
+                os.fchmod(fd, VIEW_MODE)  # mkdir mode is masked by the umask
+                stack.append((d, fd))
+                for name, idx in files.get(d, []):
+                    self._link(idx, name, fd)
+        finally:
+            for _, fd in stack:
+                if fd is not None: os.close(fd)
+
+def remove_trees(paths):
+    """Deletes retired trees off the hot path (a daemon thread; leftovers are swept next build)."""
+    def worker():
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+    if paths:
+        threading.Thread(target=worker, name="forest-cleanup", daemon=True).start()
+
+class ForestModel:
+    """
+    In-memory model of the live forest: which links each source track owns.
+    Lets a changed track add/remove only its own links instead of a full rebuild.
+    Several tracks can claim the same link path (same title in one album); the
+    most recent claimant wins and the link falls back to another owner on removal.
+    """
+
+    def __init__(self, view_root, tags, materialized=True):
+        self.view_root = view_root
+        self.tags = tags
+        self.materialized = materialized  # False: views are served from memory (FUSE)
+        self.data_root = view_root  # Where to write index/playlists (the covered dir in FUSE mode)
+        self.art = None             # music_art.ArtCache when covers are enabled
+        self.lock = threading.RLock()
+        self.tracks = {}    # source path (str) -> [link tuples]
+        self.fields = {}    # source path (str) -> parsed track fields
+        self.targets = {}   # pseudo-source key (covers) -> file the links point at
+        self.hidden = {}    # non-canonical duplicate -> (links, fields), kept out of the views
+        self.dupes = {}     # duplicate group key -> group (music_dupes)
+        self.owners = {}    # link tuple -> [source paths], last = active
+        self.dirs = {}      # dir tuple -> {child name: live link paths beneath}
+
+    def _index(self, link, delta):
+        for i in range(len(link)):
+            children = self.dirs.setdefault(link[:i], {})
+            children[link[i]] = children.get(link[i], 0) + delta
+            if children[link[i]] <= 0:
+                del children[link[i]]
+                if not children: del self.dirs[link[:i]]
+
+    def claim(self, source, links, track=None):
+        self.tracks[source] = links
+        if track is not None: self.fields[source] = track
+        for link in links:
+            owners = self.owners.setdefault(link, [])
+            if not owners: self._index(link, 1)
+            if source in owners: owners.remove(source)
+            owners.append(source)
+
+    def release(self, source):
+        """Forgets a track. Returns {link: new_owner_or_None} for links it was the active owner of."""
+        changes = {}
+        self.fields.pop(source, None)
+        for link in self.tracks.pop(source, []):
+            owners = self.owners.get(link, [])
+            was_active = bool(owners) and owners[-1] == source
+            if source in owners: owners.remove(source)
+            if not owners and self.owners.pop(link, None) is not None:
+                self._index(link, -1)
+            if was_active:
+                changes[link] = owners[-1] if owners else None
+        return changes
+
+    def lookup(self, parts):
+        """('file', source) | ('dir', child names) | None for a view path tuple."""
+        with self.lock:
+            owners = self.owners.get(parts)
+            if owners:
+                return 'file', self.target(owners[-1])
+            if parts in self.dirs:
+                return 'dir', list(self.dirs[parts])
+            if len(parts) == 1 and parts[0] in CATEGORIES:
+                return 'dir', []
+        return None
+
+    def target(self, source):
+        return self.targets.get(source, source)
+
+    def public_path(self, source):
+        """Source path as seen by other processes (FUSE mode scans through /proc/self/fd)."""
+        data_root, view_root = str(self.data_root), str(self.view_root)
+        if data_root != view_root and source.startswith(data_root + os.sep):
+            return view_root + source[len(data_root):]
+        return source
+
+    def sources_under(self, prefix):
+        prefix = prefix.rstrip(os.sep) + os.sep
+        return [s for s in self.tracks if s.startswith(prefix)]
+
+def prune_empty_dirs(path, stop):
+    """Removes now-empty parents of a deleted link, up to (not including) the category root."""
+    path = path.parent
+    while path != stop and stop in path.parents:
+        try: path.rmdir()
+        except OSError: return
+        path = path.parent
+
+def scan_library(config, db_root, model):
+    """Parses every track under db_root into the model. Returns the track count."""
+    split_pattern = '|'.join(map(re.escape, config.get('split_symbols', [';', ','])))
+    governor = throttle.from_config("music", config.get('throttle'))
+    count = 0
+    seen_keys = []
+
+    for item, track, key in iter_tracks(db_root, split_pattern, model.tags, tag_workers(config)):
+        # Yield to foreground I/O under pressure (PSI backoff only; links move no bytes)
+        governor.backoff()
+        seen_keys.append(key)
+        if not track: continue
+        try:
+            links = track_links(track)
+            with model.lock:
+                model.claim(str(item), links, track)
+
+            count += 1
+            
+        except Exception as e:
+            continue
+
+    model.tags.retain(seen_keys)
+    model.tags.save()
+    return count
+
+def hot_swap(view_root, build_root):
+    """Swaps freshly built categories into place. Returns the retired trees to delete."""
+    retired = []
     
-    for cat in categories:
+    for cat in CATEGORIES:
         new_dir = build_root / cat
         target_dir = view_root / cat
-        trash_dir = view_root / f".trash_{cat}"
+        trash_dir = view_root / f".trash_{cat}_{time.time_ns()}"
         
         # Only swap if we generated content
         if new_dir.exists():
@@ -191,10 +481,60 @@ def generate_forest(config):
                 # Rollback if fail
                 if trash_dir.exists(): trash_dir.rename(target_dir)
             
-            # 3. Cleanup Trash
-            if trash_dir.exists(): shutil.rmtree(trash_dir)
+            # 3. Cleanup Trash (in the background, the new view is already live)
+            if trash_dir.exists(): retired.append(trash_dir)
+
+    if build_root.exists():
+        # Renamed first so the next build never races the cleanup thread
+        leftover = view_root / f".trash_build_{time.time_ns()}"
+        try:
+            build_root.rename(leftover)
+            retired.append(leftover)
+        except OSError:
+            shutil.rmtree(build_root, ignore_errors=True)
+    return retired
+
+def generate_forest(config):
+    """Full rebuild + hot swap. Returns the ForestModel of the new forest (None on failure)."""
+    db_root = Path(config['unsorted_dir'])
+    view_root = Path(config['music_dir'])
+    model = ForestModel(view_root, open_tag_cache(config))
+    if config.get('covers', True): model.art = music_art.open_cache(config)
+    
+    # [ HOTSWAP ] Build in a hidden temporary directory first
+    # Must be on same filesystem for atomic rename, so we keep it in view_root
+    build_root = view_root / ".zenfs_building"
+    if build_root.exists():
+        shutil.rmtree(build_root)
+    build_root.mkdir()
+    # Trees retired by an interrupted earlier run
+    remove_trees([p for p in view_root.glob(".trash_*") if p.is_dir()])
+    writer = ForestWriter(build_root)
+
+    if not db_root.exists():
+        print(f"Database root {db_root} does not exist.")
+        return None
+
+    print("Regenerating Forest (Hybrid Linking)...")
+    count = scan_library(config, db_root, model)
+    music_dupes.sync(config, model)
+    model.tags.save()  # Payload hashes
+    if model.art: music_art.sync(model, model.art)
+    # Plan the active link of every path (duplicates/covers already resolved)
+    for source, links in model.tracks.items():
+        writer.add(model.target(source), [l for l in links if model.owners[l][-1] == source])
 
-    if build_root.exists(): shutil.rmtree(build_root)
+    # [ WRITE ] Directories are created with their final mode (no chmod -R pass)
+    try:
+        writer.write()
+    except OSError as e:
+        print(f"[Conductor] Forest build failed: {e}")
+        shutil.rmtree(build_root, ignore_errors=True)
+        return None
+
+    # [ HOTSWAP ]
+    remove_trees(hot_swap(view_root, build_root))
+    music_library.publish(config, model)
 
     if count > 0:
         notify.send(
@@ -203,40 +543,231 @@ def generate_forest(config):
             urgency="low",
             icon="audio-x-generic"
         )
+    return model
+
+def update_forest(config, model, changed, removed):
+    """
+    Incremental update of the live forest.
+    `changed`: source paths created/modified (files or directories to walk).
+    `removed`: source paths deleted or moved away (files or directory prefixes).
+    """
+    view_root = model.view_root
+    split_pattern = '|'.join(map(re.escape, config.get('split_symbols', [';', ','])))
+    relink = {}  # link tuple -> source to point it at (None = delete)
+
+    # Changed tracks are re-read from scratch (parsed before touching the model)
+    files = set()
+    for path in changed:
+        p = Path(path)
+        if p.is_dir():
+            files.update(str(f) for f in p.rglob('*') if f.is_file())
+        elif p.is_file():
+            files.add(path)
+    parsed = []
+    for source in sorted(files):
+        try:
+            track, _ = load_track(Path(source), split_pattern, model.tags)
+        except Exception:
+            continue
+        if track: parsed.append((source, track, track_links(track)))
+
+    before = []
+    with model.lock:
+        # Hidden duplicates that changed or vanished are re-evaluated from scratch
+        for source in list(model.hidden):
+            if source in files or any(source == r or source.startswith(r.rstrip(os.sep) + os.sep) for r in removed):
+                before.append(model.hidden.pop(source)[1])
+
+        # 1. Drop removed tracks (directory removals take every track underneath)
+        gone = set()
+        for path in removed:
+            gone.update(model.sources_under(path) if path not in model.tracks else [path])
+        # Playlists of the old tags must be rewritten too (the track may have left them)
+        before += [model.fields[s] for s in gone | files if s in model.fields]
+        for source in gone | (files & set(model.tracks)):
+            relink.update(model.release(source))
+
+        # 2. Claim changed tracks
+        for source, track, links in parsed:
+            model.claim(source, links, track)
+            for link in links:
+                relink[link] = source
+    added = len(parsed)
+
+    if parsed or gone or before:
+        # Only the duplicate groups and albums these tracks belong to (old and new tags)
+        tracks = before + [t for _, t, _ in parsed]
+        relink.update(music_dupes.sync(config, model, tracks))
+        if model.art:
+            albums = {(t['primary_artist'], t['album']) for t in tracks if t['album']}
+            albums.update((l[1], l[3]) for l in relink if l[0] == "Artists" and len(l) == 5 and l[2] == "Albums")
+            relink.update(music_art.sync(model, model.art, albums))
+        touched = music_library.playlist_names(relink, tracks)
+        music_library.publish(config, model, touched)
+    # Once per debounced batch: new tags and payload hashes
+    model.tags.save()
+
+    if not model.materialized:
+        print(f"[Conductor] View update: {added} tracks (re)indexed, {len(gone)} removed.")
+        return
+
+    # 3. Apply only the link deltas to the live views
+    for link, source in relink.items():
+        dest = view_root.joinpath(*link)
+        if source is None:
+            try: dest.unlink()
+            except OSError: pass
+            prune_empty_dirs(dest, view_root / link[0])
+            continue
+        new_dir = not dest.parent.exists()
+        create_link(Path(model.target(source)), dest)
+        if new_dir:
+            # Mirror the full build's chmod 777 for directories created here
+            d = dest.parent
+            while d != view_root and view_root in d.parents:
+                try: os.chmod(d, 0o777)
+                except OSError: break
+                d = d.parent
+
+    print(f"[Conductor] Incremental update: {added} tracks (re)linked, {len(gone)} removed, {len(relink)} link changes.")
 
 class MusicChangeHandler(FileSystemEventHandler):
-    def __init__(self, config):
+    """
+    Collects changed/removed paths and applies them incrementally once events
+    settle. Falls back to a full rebuild only if there is no model yet.
+    """
+
+    def __init__(self, config, model):
         self.config = config
+        self.model = model
         self.timer = None
+        self.lock = threading.Lock()
+        self.update_lock = threading.Lock()
+        self.changed = set()
+        self.removed = set()
 
-    def _trigger_regen(self):
-        print("Change detected. Scheduling forest regeneration...")
+    def _schedule(self):
         if self.timer:
             self.timer.cancel()
         # Debounce: Wait DEBOUNCE_SECONDS after last event
-        self.timer = threading.Timer(DEBOUNCE_SECONDS, generate_forest, args=[self.config])
+        self.timer = threading.Timer(DEBOUNCE_SECONDS, self._flush)
         self.timer.start()
 
+    def _flush(self):
+        with self.lock:
+            changed, removed = self.changed, self.removed
+            self.changed, self.removed = set(), set()
+        # Events keep queueing (under self.lock) while an update runs
+        with self.update_lock:
+            if self.model is None:
+                self.model = generate_forest(self.config)
+                return
+            try:
+                update_forest(self.config, self.model, changed, removed)
+            except Exception as e:
+                if not self.model.materialized:
+                    print(f"[Conductor] View update failed: {e}")
+                    return
+                print(f"[Conductor] Incremental update failed ({e}). Rebuilding...")
+                self.model = generate_forest(self.config)
+
+    def _changed(self, path):
+        with self.lock:
+            self.removed.discard(path)
+            self.changed.add(path)
+        self._schedule()
+
+    def _removed(self, path):
+        with self.lock:
+            self.changed.discard(path)
+            self.removed.add(path)
+        self._schedule()
+
     def on_created(self, event):
-        if not event.is_directory: self._trigger_regen()
+        self._changed(event.src_path)
 
     def on_deleted(self, event):
-        if not event.is_directory: self._trigger_regen()
+        self._removed(event.src_path)
 
     def on_moved(self, event):
-        if not event.is_directory: self._trigger_regen()
+        self._removed(event.src_path)
+        self._changed(event.dest_path)
 
     def on_modified(self, event):
-        # Optional: React to modifications if tags change in place
-        if not event.is_directory: self._trigger_regen()
+        # React to modifications if tags change in place
+        if not event.is_directory: self._changed(event.src_path)
+
+def serve_views(config):
+    """
+    FUSE mode: Artists/Years/Genres/OSTs are served from the in-memory model at
+    music_dir; everything else (including .database) passes through to the
+    directory underneath, reached via an fd opened before mounting.
+    """
+    import music_fuse  # Optional dependency (fusepy), only needed in this mode
+
+    view_root = Path(config['music_dir'])
+    db_root = Path(config['unsorted_dir'])
+    root_fd = os.open(view_root, os.O_RDONLY | os.O_DIRECTORY)
+    # /proc/self/fd/N reaches the covered directory without re-entering the mount
+    backing = Path(f"/proc/self/fd/{root_fd}")
+    try:
+        db_rel = db_root.relative_to(view_root)
+        db_backing = backing / db_rel
+    except ValueError:
+        db_rel, db_backing = None, db_root
+
+    # Drop a materialized forest from an earlier links-mode run (hidden underneath anyway)
+    remove_trees([p for p in view_root.iterdir() if p.name in CATEGORIES or p.name.startswith(".trash_")])
+
+    model = ForestModel(view_root, open_tag_cache(config), materialized=False)
+    model.data_root = backing
+    if config.get('covers', True): model.art = music_art.open_cache(config)
+    print("Indexing library for virtual views...")
+    count = scan_library(config, db_backing, model)
+    music_dupes.sync(config, model)
+    model.tags.save()  # Payload hashes
+    if model.art: music_art.sync(model, model.art)
+    music_library.publish(config, model)
+    print(f"Serving {count} tracks at {view_root}.")
+
+    handler = MusicChangeHandler(config, model)
+    observer = None
+    if db_rel is None:
+        observer = Observer()
+        observer.schedule(handler, str(db_root), recursive=True)
+        observer.start()
+
+    def on_write(rel, removed=False):
+        # Writes through the mount are the only way into .database now
+        if db_rel is None: return
+        try: Path(rel).relative_to(db_rel)
+        except ValueError: return
+        (handler._removed if removed else handler._changed)(str(backing / rel))
+
+    try:
+        music_fuse.mount(model, root_fd, str(view_root), CATEGORIES, on_write)
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+        os.close(root_fd)
 
 def main():
     print("::: ZenFS Music Janitor (Watcher Mode) :::")
     try:
         config = load_config()
+
+        # `music.py rebuild`: explicit full regeneration (repair), then exit
+        if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+            generate_forest(config)
+            return
+
+        if config.get('mode') == "fuse":
+            serve_views(config)
+            return
         
-        # 1. Initial Generation on Startup
-        generate_forest(config)
+        # 1. Initial Generation on Startup (builds the model for incremental updates)
+        model = generate_forest(config)
         
         # 2. Setup Watcher
         db_root = config['unsorted_dir']
@@ -245,7 +776,7 @@ def main():
             return
 
         observer = Observer()
-        handler = MusicChangeHandler(config)
+        handler = MusicChangeHandler(config, model)
         
         # Watch the Source of Truth (.database) recursively
         observer.schedule(handler, db_root, recursive=True)
@@ -0,0 +1,265 @@
+######
+# scripts/janitor/music_art.py
+######
+"""
+Embedded cover-art cache for the Conductor.
+
+Art is pulled out of one track per album (FLAC/Ogg pictures, ID3 APIC, MP4
+covr) and stored once per content hash:
+    <cache>/<hh>/<hash>.jpg           original (converted to JPEG when Pillow is there)
+    <cache>/<hh>/<hash>_<size>.jpg    thumbnails (THUMB_SIZES)
+<cache>/index.json maps albums to hashes (including "no art" verdicts) keyed
+on the identity (dev:ino:size:mtime_ns, as in tag_cache) of the probed
+tracks, so an album is probed again only when one of those tracks is
+re-tagged or goes away. It also keeps last-use times for the LRU size limit.
+
+`sync` turns the cache into forest entries: cover.jpg + folder.jpg in every
+album dir, claimed in the ForestModel under "cover:<artist>/<album>" keys.
+"""
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+import mutagen
+import tag_cache
+
+# [ CONSTANTS ]
+INDEX_VERSION = 2 # 2: verdicts keyed on the probed tracks' identity
+DEFAULT_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "zenfs", "covers"
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+THUMB_SIZES = (256, 512)
+ART_PROBE_TRACKS = 3    # Tracks tried per album before giving up
+COVER_NAMES = ("cover", "folder")
+KEY_PREFIX = "cover:"
+
+def _pil():
+    # Pillow is optional: without it art is cached as-is, without thumbnails
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+def extract_art(path):
+    """Returns (bytes, ext) of the front cover (or first picture), or None."""
+    audio = mutagen.File(path)
+    if audio is None:
+        return None
+    pictures = []
+    # FLAC (and Ogg via mutagen's .pictures where available)
+    for pic in getattr(audio, 'pictures', None) or []:
+        pictures.append((pic.type == 3, pic.data, pic.mime))
+    tags = audio.tags
+    if tags is not None:
+        if hasattr(tags, 'getall'):
+            for frame in tags.getall('APIC'):
+                pictures.append((frame.type == 3, frame.data, frame.mime))
+        elif hasattr(tags, 'get'):
+            for cover in tags.get('covr') or []:
+                png = getattr(cover, 'imageformat', None) == 14  # MP4Cover.FORMAT_PNG
+                pictures.append((True, bytes(cover), "image/png" if png else "image/jpeg"))
+    if not pictures:
+        return None
+    # Front covers first, otherwise keep tag order
+    front, data, mime = sorted(pictures, key=lambda p: not p[0])[0]
+    ext = "png" if "png" in (mime or "") else "jpg"
+    return data, ext
+
+class ArtCache:
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or DEFAULT_DIR
+        self.max_bytes = max_bytes or DEFAULT_MAX_BYTES
+        self.index_path = os.path.join(self.root, "index.json")
+        self.lock = threading.Lock()
+        self.image = _pil()
+        self.albums = {}    # "artist/album" -> {"hash": str|None, "probed": {path: file key}}
+        self.objects = {}   # hash -> {"ext", "bytes", "last_used"}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.albums = data.get("albums", {})
+                self.objects = data.get("objects", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = f"{self.index_path}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump({"version": INDEX_VERSION, "albums": self.albums, "objects": self.objects}, f)
+            os.replace(tmp, self.index_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"[Conductor] Failed to write cover index: {e}")
+
+    def object_path(self, digest, size=None):
+        ext = self.objects.get(digest, {}).get("ext", "jpg")
+        name = f"{digest}_{size}.jpg" if size else f"{digest}.{ext}"
+        return os.path.join(self.root, digest[:2], name)
+
+    def _write(self, path, data):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+
+    def store(self, data, ext):
+        """Stores art by content hash (deduplicated). Returns the hash."""
+        self.dirty = True
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest in self.objects and os.path.exists(self.object_path(digest)):
+            return digest
+        os.makedirs(os.path.join(self.root, digest[:2]), exist_ok=True)
+        total = 0
+        img = None
+        if self.image:
+            try:
+                img = self.image.open(io.BytesIO(data))
+                img.load()
+                if ext != "jpg":
+                    out = io.BytesIO()
+                    img.convert("RGB").save(out, "JPEG", quality=90)
+                    data, ext = out.getvalue(), "jpg"
+            except Exception:
+                img = None
+        self.objects[digest] = {"ext": ext, "bytes": 0, "last_used": time.time()}
+        self._write(self.object_path(digest), data)
+        total += len(data)
+        if img is not None:
+            for size in THUMB_SIZES:
+                try:
+                    thumb = img.convert("RGB")
+                    thumb.thumbnail((size, size))
+                    thumb.save(self.object_path(digest, size), "JPEG", quality=85)
+                    total += os.path.getsize(self.object_path(digest, size))
+                except Exception:
+                    pass
+        self.objects[digest]["bytes"] = total
+        return digest
+
+    def cover_for(self, album_key, sources, public=lambda s: s):
+        """Hash of the album's art (None = no art). Probes tracks only when needed."""
+        probe = sources[:ART_PROBE_TRACKS]
+        self.dirty = True   # New verdict or last-use time
+        keys = {}
+        for source in probe:
+            try: keys[public(source)] = tag_cache.file_key(os.stat(source))
+            except OSError: pass
+        entry = self.albums.get(album_key)
+        if entry and self._still_valid(entry, keys):
+            digest = entry.get("hash")
+            if digest is None or os.path.exists(self.object_path(digest)):
+                if digest: self.objects[digest]["last_used"] = time.time()
+                return digest
+        for source in probe:
+            try:
+                art = extract_art(source)
+            except Exception:
+                continue
+            if art:
+                digest = self.store(*art)
+                # Keyed on file identity: a re-tag of the source track re-probes the album
+                self.albums[album_key] = {"hash": digest, "probed": {public(source): keys.get(public(source))}}
+                return digest
+        self.albums[album_key] = {"hash": None, "probed": keys}
+        return None
+
+    def _still_valid(self, entry, keys):
+        probed = entry.get("probed") or {}
+        if entry.get("hash") is None:
+            # "No art" covers every probed track: any of them changing (or new ones
+            # moving into the probe window) may have brought art
+            return probed == keys
+        return bool(probed) and all(keys.get(path) == key for path, key in probed.items())
+
+    def evict(self, keep=()):
+        """LRU: drops least recently used objects until under max_bytes (never `keep`)."""
+        total = sum(o.get("bytes", 0) for o in self.objects.values())
+        if total <= self.max_bytes:
+            return
+        for digest in sorted(self.objects, key=lambda d: self.objects[d].get("last_used", 0)):
+            if total <= self.max_bytes: break
+            if digest in keep: continue
+            for path in [self.object_path(digest)] + [self.object_path(digest, s) for s in THUMB_SIZES]:
+                try: os.remove(path)
+                except OSError: pass
+            total -= self.objects.pop(digest).get("bytes", 0)
+            self.dirty = True
+            for album_key in [k for k, v in self.albums.items() if v.get("hash") == digest]:
+                del self.albums[album_key]
+
+def album_dirs(links, album):
+    """Album folders among a track's links: Artists/<a>/Albums/<album>, Years/<y>/<album>, OSTs/<album>."""
+    dirs = set()
+    for link in links:
+        parent = link[:-1]
+        if parent[-1] != album: continue
+        if (link[0] == "Artists" and len(parent) == 4 and parent[2] == "Albums") or link[0] in ("Years", "OSTs"):
+            dirs.add(parent)
+    return dirs
+
+def sync(model, cache, albums=None):
+    """
+    Brings the model's cover entries in line with its albums.
+    `albums` ({(artist, album)}) limits the work to those albums (incremental updates).
+    Returns {link: cover key or None} for the links that changed.
+    """
+    found = {}
+    with model.lock:
+        for source, t in model.fields.items():
+            if t['album'] and (albums is None or (t['primary_artist'], t['album']) in albums):
+                entry = found.setdefault((t['primary_artist'], t['album']), ([], set()))
+                entry[0].append(source)
+                entry[1].update(album_dirs(model.tracks.get(source, []), t['album']))
+        if albums is None:
+            keys = [k for k in model.tracks if k.startswith(KEY_PREFIX)]
+        else:
+            keys = [f"{KEY_PREFIX}{artist}/{album}" for artist, album in albums]
+        # Covers of albums left alone stay in use
+        keep = {os.path.basename(t).split('.')[0] for k, t in model.targets.items()
+                if k.startswith(KEY_PREFIX) and k not in keys}
+
+    wanted = {}
+    with cache.lock:
+        for (artist, album), (sources, dirs) in found.items():
+            sources.sort()
+            digest = cache.cover_for(f"{artist}/{album}", sources, model.public_path)
+            if not digest or not dirs: continue
+            target = cache.object_path(digest)
+            ext = os.path.splitext(target)[1]
+            links = [d + (f"{name}{ext}",) for d in sorted(dirs) for name in COVER_NAMES]
+            wanted[f"{KEY_PREFIX}{artist}/{album}"] = (target, links)
+        cache.evict(keep=keep | {os.path.basename(t).split('.')[0] for t, _ in wanted.values()})
+        cache.save()
+
+    relink = {}
+    with model.lock:
+        for key in keys:
+            if key not in model.tracks: continue
+            if wanted.get(key) != (model.targets.get(key), model.tracks[key]):
+                relink.update(model.release(key))
+                model.targets.pop(key, None)
+        for key, (target, links) in wanted.items():
+            if key in model.tracks: continue
+            model.targets[key] = target
+            model.claim(key, links)
+            for link in links:
+                relink[link] = key
+    return relink
+
+def open_cache(config):
+    max_mb = config.get('cover_cache_size')
+    return ArtCache(config.get('cover_cache'), max_mb * 1024 * 1024 if max_mb else None)
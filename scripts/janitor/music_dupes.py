@@ -0,0 +1,199 @@
+######
+# scripts/janitor/music_dupes.py
+######
+"""
+Duplicate track detection for the Conductor.
+
+Candidates: tracks with the same normalized (artist, album, title, duration
+in whole seconds), straight from the parsed tags. Within a group, copies are
+confirmed by a streaming hash of the audio payload only (ID3v2/ID3v1/APEv2
+tags and FLAC metadata blocks are skipped), so re-tagged copies still match.
+Payload hashes are kept in the tag cache next to the tags.
+
+Each group gets one canonical file (lossless first, then largest, then
+shortest path). With prefer_canonical the other members are hidden from the
+forest until the canonical copy goes away. Identical-payload copies count as
+reclaimable bytes. Report: <music_dir>/.zenfs_duplicates.json
+
+Groups are kept on the model (model.dupes); incremental updates only
+re-evaluate the groups of the tracks they touched.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import unicodedata
+import music_library
+
+# [ CONSTANTS ]
+REPORT_NAME = ".zenfs_duplicates.json"
+LOSSLESS = {".flac", ".wav", ".aiff", ".aif", ".ape", ".wv", ".alac"}
+CHUNK = 1024 * 1024
+
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return re.sub(r"[\W_]+", "", text)
+
+def group_key(track):
+    if track.get('duration') is None:
+        return None
+    return (normalize(track['primary_artist']), normalize(track['album']), normalize(track['title']), round(track['duration']))
+
+def audio_region(f, size):
+    """(start, end) of the audio payload, excluding known tag blocks."""
+    start, end = 0, size
+    head = f.read(10)
+    if head[:3] == b"ID3" and len(head) == 10:
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    elif head[:4] == b"fLaC":
+        pos = 4
+        while True:
+            f.seek(pos)
+            block = f.read(4)
+            if len(block) < 4: break
+            pos += 4 + int.from_bytes(block[1:4], "big")
+            if block[0] & 0x80: break
+        start = pos
+    if end - start >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b"TAG":
+            end -= 128
+    if end - start >= 32:
+        f.seek(end - 32)
+        footer = f.read(32)
+        if footer[:8] == b"APETAGEX":
+            tag_size = int.from_bytes(footer[12:16], "little")
+            flags = int.from_bytes(footer[20:24], "little")
+            end -= tag_size + (32 if flags & 0x80000000 else 0)
+    return min(start, size), max(end, start)
+
+def payload_hash(path):
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        start, end = audio_region(f, size)
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(CHUNK, remaining))
+            if not data: break
+            digest.update(data)
+            remaining -= len(data)
+    return digest.hexdigest()
+
+def _payload(tags, path, st):
+    cached = tags.get_extra(st, "payload")
+    if cached: return cached
+    digest = payload_hash(path)
+    tags.set_extra(st, "payload", digest)
+    return digest
+
+def _rank(path, size):
+    return (os.path.splitext(path)[1].lower() in LOSSLESS, size, -len(path), path)
+
+def find_duplicates(model, keys=None):
+    """
+    {group key: group} of duplicate tracks (visible and hidden). Hashes only
+    multi-member groups; `keys` limits the work to those groups.
+    """
+    with model.lock:
+        tracks = dict(model.fields)
+        tracks.update({s: track for s, (_, track) in model.hidden.items()})
+    candidates = {}
+    for source, track in tracks.items():
+        key = group_key(track)
+        if key and (keys is None or key in keys): candidates.setdefault(key, []).append(source)
+
+    groups = {}
+    for key, sources in candidates.items():
+        if len(sources) < 2: continue
+        files = []
+        for source in sorted(sources):
+            try:
+                st = os.stat(source)
+                files.append({"path": source, "size": st.st_size, "payload": _payload(model.tags, source, st)})
+            except OSError:
+                continue
+        if len(files) < 2: continue
+        canonical = max(files, key=lambda f: _rank(f["path"], f["size"]))
+        by_payload = {}
+        for f in files:
+            by_payload.setdefault(f["payload"], []).append(f)
+        # Bit-identical audio beyond one copy per payload can be deleted safely
+        reclaimable = sum(
+            f["size"] for same in by_payload.values() if len(same) > 1
+            for f in same if f is not max(same, key=lambda g: _rank(g["path"], g["size"]))
+        )
+        groups[key] = {
+            "artist": tracks[canonical["path"]]['primary_artist'],
+            "album": tracks[canonical["path"]]['album'],
+            "title": tracks[canonical["path"]]['title'],
+            "canonical": canonical["path"],
+            "files": files,
+            "identical": [[f["path"] for f in same] for same in by_payload.values() if len(same) > 1],
+            "reclaimable": reclaimable,
+        }
+    return groups
+
+def write_report(model, groups):
+    report = {
+        "generated_at": time.time(),
+        "groups": [
+            dict(g, canonical=model.public_path(g["canonical"]),
+                 files=[dict(f, path=model.public_path(f["path"])) for f in g["files"]],
+                 identical=[[model.public_path(p) for p in same] for same in g["identical"]])
+            for g in groups
+        ],
+        "duplicate_files": sum(len(g["files"]) - 1 for g in groups),
+        "reclaimable_bytes": sum(g["reclaimable"] for g in groups),
+    }
+    try:
+        music_library.atomic_write(os.path.join(str(model.data_root), REPORT_NAME), json.dumps(report, indent=2))
+    except OSError as e:
+        print(f"[Conductor] Failed to write duplicate report: {e}")
+    return report
+
+def sync(config, model, tracks=None):
+    """
+    Detects duplicates, writes the report and (with prefer_canonical) hides
+    non-canonical copies. Returns {link: source or None} for changed links.
+    `tracks` (fields, old and new) limits detection to their groups; the
+    report is only rewritten if one of those groups changed.
+    """
+    if tracks is None:
+        model.dupes = find_duplicates(model)
+        changed = True
+    else:
+        keys = {k for k in map(group_key, tracks) if k}
+        found = find_duplicates(model, keys)
+        changed = any(model.dupes.get(k) != found.get(k) for k in keys)
+        for key in keys:
+            if key in found: model.dupes[key] = found[key]
+            else: model.dupes.pop(key, None)
+    groups = list(model.dupes.values())
+    if changed:
+        report = write_report(model, groups)
+        if groups:
+            print(f"[Conductor] Duplicates: {report['duplicate_files']} extra files in {len(groups)} groups, "
+                  f"{report['reclaimable_bytes'] / (1024 * 1024):.1f} MB reclaimable.")
+
+    hide = set()
+    if config.get('prefer_canonical', True):
+        hide = {f["path"] for g in groups for f in g["files"] if f["path"] != g["canonical"]}
+
+    relink = {}
+    with model.lock:
+        # Canonical copy gone (or no longer a duplicate): bring hidden tracks back
+        for source in [s for s in model.hidden if s not in hide]:
+            links, track = model.hidden.pop(source)
+            if not os.path.exists(source): continue
+            model.claim(source, links, track)
+            relink.update({link: source for link in links})
+        for source in hide:
+            if source in model.hidden or source not in model.tracks: continue
+            links, track = model.tracks[source], model.fields.get(source)
+            relink.update(model.release(source))
+            model.hidden[source] = (links, track)
+    return relink
@@ -0,0 +1,202 @@
+######
+# scripts/janitor/music_fuse.py
+######
+"""
+FUSE filesystem for the Conductor's virtual views (music.mode = "fuse").
+
+The category dirs (Artists/Years/Genres/OSTs) are answered from the
+ForestModel: directories are synthesized, files are the active source track
+(read-only, reads go straight to the .database file). Every other path is a
+passthrough to the directory covered by the mount, addressed relative to an
+fd opened before mounting. Writes through the passthrough are reported via
+`on_write(rel, removed)` so tag changes reach the views immediately.
+"""
+import os
+import stat
+import errno
+import time
+from fuse import FUSE, FuseOSError, Operations
+
+# [ CONSTANTS ]
+STAT_KEYS = ('st_atime', 'st_ctime', 'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid')
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_TRUNC
+
+def _stat_dict(st):
+    return {key: getattr(st, key) for key in STAT_KEYS}
+
+class MusicViews(Operations):
+    def __init__(self, model, root_fd, categories, on_write):
+        self.model = model
+        self.root_fd = root_fd
+        self.categories = set(categories)
+        self.on_write = on_write
+        self.started = time.time()
+        self.dirty = {}  # fh -> rel path written through the passthrough
+
+    # [ HELPERS ]
+    def _view(self, path):
+        parts = tuple(p for p in path.split('/') if p)
+        if parts and parts[0] in self.categories:
+            return parts
+        return None
+
+    def _rel(self, path):
+        return path.lstrip('/') or '.'
+
+    def _view_node(self, parts):
+        node = self.model.lookup(parts)
+        if node is None:
+            raise FuseOSError(errno.ENOENT)
+        return node
+
+    # [ METADATA ]
+    def getattr(self, path, fh=None):
+        parts = self._view(path)
+        if parts is None:
+            return _stat_dict(os.stat(self._rel(path), dir_fd=self.root_fd, follow_symlinks=False))
+        kind, value = self._view_node(parts)
+        if kind == 'file':
+            attrs = _stat_dict(os.stat(value))
+            attrs['st_mode'] &= ~0o222  # Views are read-only
+            return attrs
+        return {
+            'st_mode': stat.S_IFDIR | 0o555, 'st_nlink': 2, 'st_size': 0,
+            'st_uid': os.getuid(), 'st_gid': os.getgid(),
+            'st_atime': self.started, 'st_mtime': self.started, 'st_ctime': self.started,
+        }
+
+    def readdir(self, path, fh):
+        parts = self._view(path)
+        if parts is not None:
+            kind, children = self._view_node(parts)
+            if kind != 'dir':
+                raise FuseOSError(errno.ENOTDIR)
+            return ['.', '..'] + sorted(children)
+        fd = os.open(self._rel(path), os.O_RDONLY | os.O_DIRECTORY, dir_fd=self.root_fd)
+        try:
+            names = os.listdir(fd)
+        finally:
+            os.close(fd)
+        if path == '/':
+            # Old materialized forests underneath are shadowed by the views
+            names = [n for n in names if n not in self.categories and not n.startswith('.trash_')]
+            names += sorted(self.categories)
+        return ['.', '..'] + names
+
+    def readlink(self, path):
+        if self._view(path) is not None:
+            raise FuseOSError(errno.EINVAL)
+        return os.readlink(self._rel(path), dir_fd=self.root_fd)
+
+    def statfs(self, path):
+        sv = os.statvfs(f"/proc/self/fd/{self.root_fd}")
+        return {key: getattr(sv, key) for key in (
+            'f_bavail', 'f_bfree', 'f_blocks', 'f_bsize', 'f_favail',
+            'f_ffree', 'f_files', 'f_flag', 'f_frsize', 'f_namemax')}
+
+    # [ FILE I/O ]
+    def open(self, path, flags):
+        parts = self._view(path)
+        if parts is not None:
+            kind, source = self._view_node(parts)
+            if kind != 'file':
+                raise FuseOSError(errno.EISDIR)
+            if flags & WRITE_FLAGS:
+                raise FuseOSError(errno.EROFS)
+            return os.open(source, os.O_RDONLY)
+        fh = os.open(self._rel(path), flags, dir_fd=self.root_fd)
+        if flags & WRITE_FLAGS:
+            self.dirty[fh] = self._rel(path)
+        return fh
+
+    def create(self, path, mode, fi=None):
+        if self._view(path) is not None:
+            raise FuseOSError(errno.EROFS)
+        fh = os.open(self._rel(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode, dir_fd=self.root_fd)
+        self.dirty[fh] = self._rel(path)
+        return fh
+
+    def read(self, path, size, offset, fh):
+        return os.pread(fh, size, offset)
+
+    def write(self, path, data, offset, fh):
+        return os.pwrite(fh, data, offset)
+
+    def truncate(self, path, length, fh=None):
+        if self._view(path) is not None:
+            raise FuseOSError(errno.EROFS)
+        if fh is not None:
+            os.ftruncate(fh, length)
+        else:
+            fd = os.open(self._rel(path), os.O_WRONLY, dir_fd=self.root_fd)
+            try: os.ftruncate(fd, length)
+            finally: os.close(fd)
+        self.on_write(self._rel(path))
+
+    def flush(self, path, fh):
+        return 0
+
+    def fsync(self, path, datasync, fh):
+        if datasync: os.fdatasync(fh)
+        else: os.fsync(fh)
+
+    def release(self, path, fh):
+        os.close(fh)
+        rel = self.dirty.pop(fh, None)
+        if rel is not None:
+            self.on_write(rel)
+
+    # [ NAMESPACE ] (passthrough only; views are read-only)
+    def _writable(self, *paths):
+        for path in paths:
+            if self._view(path) is not None:
+                raise FuseOSError(errno.EROFS)
+
+    def mkdir(self, path, mode):
+        self._writable(path)
+        os.mkdir(self._rel(path), mode, dir_fd=self.root_fd)
+
+    def rmdir(self, path):
+        self._writable(path)
+        os.rmdir(self._rel(path), dir_fd=self.root_fd)
+        self.on_write(self._rel(path), removed=True)
+
+    def unlink(self, path):
+        self._writable(path)
+        os.unlink(self._rel(path), dir_fd=self.root_fd)
+        self.on_write(self._rel(path), removed=True)
+
+    def rename(self, old, new):
+        self._writable(old, new)
+        os.rename(self._rel(old), self._rel(new), src_dir_fd=self.root_fd, dst_dir_fd=self.root_fd)
+        self.on_write(self._rel(old), removed=True)
+        self.on_write(self._rel(new))
+
+    def symlink(self, target, source):
+        self._writable(target)
+        os.symlink(source, self._rel(target), dir_fd=self.root_fd)
+
+    def link(self, target, source):
+        self._writable(target)
+        os.link(self._rel(source), self._rel(target), src_dir_fd=self.root_fd, dst_dir_fd=self.root_fd)
+        self.on_write(self._rel(target))
+
+    def chmod(self, path, mode):
+        self._writable(path)
+        os.chmod(self._rel(path), mode, dir_fd=self.root_fd)
+
+    def chown(self, path, uid, gid):
+        self._writable(path)
+        os.chown(self._rel(path), uid, gid, dir_fd=self.root_fd, follow_symlinks=False)
+
+    def utimens(self, path, times=None):
+        self._writable(path)
+        os.utime(self._rel(path), times, dir_fd=self.root_fd)
+
+def mount(model, root_fd, mount_point, categories, on_write):
+    """Blocks serving the views until the filesystem is unmounted."""
+    FUSE(
+        MusicViews(model, root_fd, categories, on_write), mount_point,
+        foreground=True, nothreads=False, allow_other=True,
+        default_permissions=True, nonempty=True, fsname="zenfs-music",
+    )
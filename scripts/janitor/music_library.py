@@ -0,0 +1,176 @@
+######
+# scripts/janitor/music_library.py
+######
+"""
+Library index + playlists published by the Conductor after every update.
+
+<music_dir>/.zenfs_library.json (atomic replace, one read for consumers):
+{
+  "version": 1, "generated_at": ...,
+  "tracks": [{"id", "path", "title", "artist", "artists", "album", "year",
+              "genres", "ost", "track", "disc"}],
+  "artists": {name: [track ids]}, "albums": [{"artist", "album", "year", "cover", "tracks"}],
+  "years": {year: [ids]}, "genres": {genre: [ids]}, "osts": [ids]
+}
+Track ids are positions in "tracks" and only stable within one index.
+Playlists: <music_dir>/Playlists/{Artists,Albums,Genres}/<name>.m3u
+"""
+import os
+import json
+import time
+
+# [ CONSTANTS ]
+INDEX_VERSION = 1
+INDEX_NAME = ".zenfs_library.json"
+PLAYLIST_DIR = "Playlists"
+
+def atomic_write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+def _order(track):
+    return (track.get('disc') or 0, track.get('track') or 0, track['title'])
+
+def build_index(model):
+    with model.lock:
+        items = sorted(model.fields.items())
+        covers = dict(model.targets)
+
+    tracks = []
+    artists, years, genres, osts = {}, {}, {}, []
+    albums = {}
+    for i, (source, t) in enumerate(items):
+        tracks.append({
+            "id": i,
+            "path": model.public_path(source),
+            "title": t['title'],
+            "artist": t['primary_artist'],
+            "artists": t['artists'],
+            "album": t['album'],
+            "year": t['year'],
+            "genres": t['genres'],
+            "ost": t['is_ost'],
+            "track": t.get('track'),
+            "disc": t.get('disc'),
+        })
+        for artist in t['artists']:
+            artists.setdefault(artist, []).append(i)
+        years.setdefault(t['year'], []).append(i)
+        for genre in t['genres']:
+            genres.setdefault(genre, []).append(i)
+        if t['is_ost']:
+            osts.append(i)
+        if t['album']:
+            album = albums.setdefault((t['primary_artist'], t['album']), {
+                "artist": t['primary_artist'], "album": t['album'], "year": t['year'],
+                "cover": covers.get(f"cover:{t['primary_artist']}/{t['album']}"), "tracks": [],
+            })
+            album["tracks"].append(i)
+
+    for album in albums.values():
+        album["tracks"].sort(key=lambda i: _order(items[i][1]))
+
+    return {
+        "version": INDEX_VERSION,
+        "generated_at": time.time(),
+        "tracks": tracks,
+        "artists": artists,
+        "albums": sorted(albums.values(), key=lambda a: (a["artist"], a["album"])),
+        "years": years,
+        "genres": genres,
+        "osts": osts,
+    }
+
+def _m3u(index, ids):
+    lines = ["#EXTM3U"]
+    for i in ids:
+        t = index["tracks"][i]
+        lines.append(f"#EXTINF:-1,{t['artist']} - {t['title']}")
+        lines.append(t["path"])
+    return "\n".join(lines) + "\n"
+
+def _album_playlist(artist, album):
+    return f"{artist} - {album}"
+
+def playlist_names(links=(), tracks=()):
+    """{category: {playlist names}} touched by forest links and/or parsed tracks."""
+    names = {"Artists": set(), "Albums": set(), "Genres": set()}
+    for link in links:
+        if link[0] == "Artists":
+            names["Artists"].add(link[1])
+            if len(link) == 5 and link[2] == "Albums":
+                names["Albums"].add(_album_playlist(link[1], link[3]))
+        elif link[0] == "Genres":
+            names["Genres"].add(link[1])
+    for t in tracks:
+        names["Artists"].update(t['artists'])
+        names["Genres"].update(t['genres'])
+        if t['album']:
+            names["Albums"].add(_album_playlist(t['primary_artist'], t['album']))
+    return names
+
+def write_playlists(root, index, only=None):
+    """
+    Writes one M3U per artist/album/genre; unchanged files are left alone, stale ones removed.
+    `only` ({category: names}, see playlist_names) limits the work to those playlists.
+    """
+    tracks = index["tracks"]
+
+    def by_album(ids):
+        return sorted(ids, key=lambda i: (tracks[i]["album"] or "", tracks[i]["disc"] or 0, tracks[i]["track"] or 0, tracks[i]["title"]))
+
+    wanted = {
+        "Artists": index["artists"],
+        "Albums": {_album_playlist(a['artist'], a['album']): a["tracks"] for a in index["albums"]},
+        "Genres": index["genres"],
+    }
+    written = 0
+    for category, playlists in wanted.items():
+        cat_dir = os.path.join(root, PLAYLIST_DIR, category)
+        os.makedirs(cat_dir, exist_ok=True)
+        if only is None:
+            names = set(playlists)
+            stale = {n[:-4] for n in os.listdir(cat_dir) if n.endswith(".m3u")} - names
+        else:
+            names = only.get(category, set()) & set(playlists)
+            stale = only.get(category, set()) - names
+        for name in sorted(names):
+            ids = playlists[name] if category == "Albums" else by_album(playlists[name])
+            path = os.path.join(cat_dir, f"{name}.m3u")
+            text = _m3u(index, ids)
+            try:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        if f.read() == text: continue
+                except FileNotFoundError:
+                    pass
+                atomic_write(path, text)
+                written += 1
+            except OSError as e:
+                # e.g. ENAMETOOLONG on a long "artist - album": skip just this one
+                print(f"[Conductor] Failed to write playlist {category}/{name}: {e}")
+        for name in stale:
+            try: os.remove(os.path.join(cat_dir, f"{name}.m3u"))
+            except OSError: pass
+    return written
+
+def publish(config, model, touched=None):
+    """
+    Writes the index (and playlists unless disabled). Never raises.
+    `touched` ({category: names}) rewrites only those playlists (incremental updates).
+    """
+    root = str(model.data_root)
+    try:
+        index = build_index(model)
+        atomic_write(os.path.join(root, INDEX_NAME), json.dumps(index, separators=(',', ':')))
+    except (OSError, KeyError) as e:
+        print(f"[Conductor] Failed to publish library index: {e}")
+        return
+    if config.get('playlists', True):
+        try:
+            write_playlists(root, index, touched)
+        except (OSError, KeyError) as e:
+            print(f"[Conductor] Failed to write playlists: {e}")
@@ -0,0 +1,149 @@
+######
+# scripts/janitor/oracle_cache.py
+######
+"""
+Persistent scan cache for the Oracle, so hourly runs only analyze what changed.
+
+Per directory we remember its st_mtime_ns, its subdirectories and, for every
+analyzable file, (st_size, st_mtime_ns, verdict). A directory whose mtime is
+unchanged has had no entries added, removed or renamed, so its listing is
+reused as-is: an unchanged tree costs one stat per directory. Files in a
+changed directory are stat'ed and only re-analyzed when size or mtime moved.
+
+In-place rewrites do not touch the directory mtime, so every
+FULL_RESCAN_HOURS the pruning is skipped once and every file is stat'ed (but
+still not reopened unless it changed).
+
+The "analyzer" version is bumped whenever the heuristics change; a different
+version discards the whole cache. On disk:
+{"version": 1, "analyzer": ..., "last_full": ts,
+ "dirs": {path: {"mtime_ns": n, "subdirs": [...], "files": {name: [size, mtime_ns, verdict]}}}}
+"""
+import os
+import json
+import time
+
+# [ CONSTANTS ]
+CACHE_VERSION = 1
+FULL_RESCAN_HOURS = 24
+DEFAULT_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "zenfs", "oracle_scan.json"
+)
+
+class ScanCache:
+    def __init__(self, path=None, analyzer="", full_rescan_hours=FULL_RESCAN_HOURS):
+        self.path = path or DEFAULT_PATH
+        self.analyzer = analyzer
+        self.full_rescan = full_rescan_hours * 3600
+        self.dirs = {}
+        self.last_full = 0
+        self.seen = set()
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("analyzer") == self.analyzer:
+                self.dirs = data.get("dirs", {})
+                self.last_full = data.get("last_full", 0)
+            else:
+                self.dirty = True
+        except (OSError, ValueError):
+            self.dirs = {}
+
+    def full_due(self, now=None):
+        return (now or time.time()) - self.last_full >= self.full_rescan
+
+    def scan(self, root, extensions, full=False):
+        """
+        Yields (dirpath, name, stat) for every analyzable file under root that
+        is new or changed since the last run. Report each verdict with record().
+        """
+        stack = [os.path.abspath(root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                st = os.stat(directory)
+            except OSError:
+                continue
+            self.seen.add(directory)
+            cached = self.dirs.get(directory)
+
+            if cached is not None and not full and cached["mtime_ns"] == st.st_mtime_ns:
+                # No entries added/removed here: reuse the listing, descend only
+                stack.extend(os.path.join(directory, d) for d in reversed(cached["subdirs"]))
+                continue
+
+            old_files = cached["files"] if cached else {}
+            entry = {"mtime_ns": st.st_mtime_ns, "subdirs": [], "files": {}}
+            pending = []
+            try:
+                with os.scandir(directory) as it:
+                    listing = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for item in listing:
+                try:
+                    if item.is_dir(follow_symlinks=False):
+                        entry["subdirs"].append(item.name)
+                        continue
+                    if item.name.startswith('.') or not item.is_file():
+                        continue
+                    if os.path.splitext(item.name)[1].lower() not in extensions:
+                        continue
+                    fst = item.stat()
+                except OSError:
+                    continue
+                known = old_files.get(item.name)
+                if known and known[0] == fst.st_size and known[1] == fst.st_mtime_ns:
+                    entry["files"][item.name] = known
+                else:
+                    entry["files"][item.name] = [fst.st_size, fst.st_mtime_ns, None]
+                    pending.append((item.name, fst))
+
+            if cached != entry:
+                self.dirty = True
+            self.dirs[directory] = entry
+            for name, fst in pending:
+                yield directory, name, fst
+            stack.extend(os.path.join(directory, d) for d in reversed(entry["subdirs"]))
+
+    def record(self, directory, name, st, verdict):
+        self.dirs[directory]["files"][name] = [st.st_size, st.st_mtime_ns, verdict]
+        self.dirty = True
+
+    def retain_seen(self):
+        """Drops directories that no scan reached this run (deleted, or no longer configured)."""
+        stale = set(self.dirs) - self.seen
+        for directory in stale:
+            del self.dirs[directory]
+        if stale:
+            self.dirty = True
+
+    def mark_full(self, now=None):
+        self.last_full = now or time.time()
+        self.dirty = True
+
+    def stats(self):
+        return {
+            "dirs": len(self.dirs),
+            "files": sum(len(d["files"]) for d in self.dirs.values()),
+        }
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump({
+                    "version": CACHE_VERSION, "analyzer": self.analyzer,
+                    "last_full": self.last_full, "dirs": self.dirs,
+                }, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"[Oracle] Failed to write scan cache: {e}")
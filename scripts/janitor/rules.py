@@ -0,0 +1,172 @@
+######
+# scripts/janitor/rules.py
+######
+"""
+Compiled rule engine for the Sorting Deck.
+
+Rules come from two config keys, compiled into one ordered RuleSet:
+  "advanced_rules": [{"dest": "Documents/Invoices",
+                      "ext": ["pdf"], "glob": ["invoice*"], "regex": "^INV-\\d+",
+                      "min_size": 0, "max_size": 10485760,
+                      "origin": ["bank.example"], "magic": ["%PDF", "hex:25504446"]}, ...]
+  "rules": {"Documents": ["pdf", "docx"], ...}   (legacy: extension lists)
+Advanced rules are tried first, in order; legacy rules are pure extension
+hash lookups (an empty list matches nothing). A rule without predicates
+would match every file, so it is only kept with "catch_all": true. Every predicate inside one rule must match; inside a list
+(ext/glob/origin/magic) any entry may match.
+
+Per file, candidates come from one dict lookup on the extension plus the
+rules that do not constrain it; cheap checks (name, size) run before the
+expensive ones (xattrs, magic bytes), and the file head is read at most once.
+Hits per rule are counted and dumped to $RUNTIME_DIRECTORY/rules-<name>.json.
+"""
+import os
+import re
+import json
+import fnmatch
+
+# [ CONSTANTS ]
+METRICS_DIR = os.environ.get("RUNTIME_DIRECTORY")
+MAGIC_BYTES = 64        # Longest signature we can test against
+ORIGIN_XATTRS = ("user.xdg.origin.url", "user.xdg.referrer.url")
+
+def _norm_ext(ext):
+    return ext.lower().lstrip('.')
+
+def _magic(sig):
+    # "hex:89504e47" or a plain ASCII prefix like "%PDF"
+    if sig.startswith("hex:"):
+        return bytes.fromhex(sig[4:])
+    return sig.encode()
+
+class FileFacts:
+    """Lazily gathered facts about one file (each read at most once)."""
+
+    def __init__(self, path, name=None, size=None):
+        self.path = str(path)
+        self.name = name or os.path.basename(self.path)
+        self.ext = _norm_ext(os.path.splitext(self.name)[1])
+        self._size = size
+        self._head = None
+        self._origin = None
+
+    @property
+    def size(self):
+        if self._size is None:
+            try: self._size = os.stat(self.path).st_size
+            except OSError: self._size = -1
+        return self._size
+
+    @property
+    def head(self):
+        if self._head is None:
+            try:
+                with open(self.path, 'rb') as f:
+                    self._head = f.read(MAGIC_BYTES)
+            except OSError:
+                self._head = b""
+        return self._head
+
+    @property
+    def origin(self):
+        # Browsers record the download URL in xattrs (Chromium, Firefox with the pref, wget --xattr)
+        if self._origin is None:
+            urls = []
+            for attr in ORIGIN_XATTRS:
+                try: urls.append(os.getxattr(self.path, attr).decode(errors='replace').lower())
+                except (OSError, AttributeError): pass
+            self._origin = " ".join(urls)
+        return self._origin
+
+class Rule:
+    def __init__(self, index, dest, spec):
+        self.index = index
+        self.dest = dest
+        self.name = spec.get("name") or dest
+        self.exts = {_norm_ext(e) for e in spec.get("ext", [])}
+        patterns = [fnmatch.translate(g) for g in spec.get("glob", [])]
+        if spec.get("regex"): patterns.append(spec["regex"])
+        # One compiled alternation for all name patterns of the rule
+        self.name_re = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE) if patterns else None
+        self.min_size = spec.get("min_size")
+        self.max_size = spec.get("max_size")
+        self.origins = [o.lower() for o in spec.get("origin", [])]
+        self.magic = [_magic(m) for m in spec.get("magic", [])]
+
+    @property
+    def unconstrained(self):
+        return not (self.exts or self.name_re or self.min_size is not None or self.max_size is not None
+                    or self.origins or self.magic)
+
+    def matches(self, facts):
+        # Cheapest first: name, size (one stat), origin (xattr), magic (read)
+        if self.name_re and not self.name_re.search(facts.name): return False
+        if self.min_size is not None and facts.size < self.min_size: return False
+        if self.max_size is not None and facts.size > self.max_size: return False
+        if self.origins and not any(o in facts.origin for o in self.origins): return False
+        if self.magic and not any(facts.head.startswith(m) for m in self.magic): return False
+        return True
+
+class RuleSet:
+    def __init__(self, rules, name="dumb"):
+        self.name = name
+        self.rules = rules
+        self.by_ext = {}    # ext -> [rules constrained to it], in rule order
+        self.any_ext = []   # rules without an extension constraint
+        for rule in rules:
+            if rule.exts:
+                for ext in rule.exts:
+                    self.by_ext.setdefault(ext, []).append(rule)
+            else:
+                self.any_ext.append(rule)
+        self._merged = {}   # ext -> by_ext + any_ext in rule order (built on first use)
+        self.hits = {}
+        self.misses = 0
+
+    def candidates(self, ext):
+        merged = self._merged.get(ext)
+        if merged is None:
+            merged = sorted(self.by_ext.get(ext, []) + self.any_ext, key=lambda r: r.index)
+            self._merged[ext] = merged
+        return merged
+
+    def match(self, path, name=None, size=None):
+        """Destination folder key for a file, or None."""
+        facts = FileFacts(path, name, size)
+        for rule in self.candidates(facts.ext):
+            # Pure extension rules need no further checks
+            if rule.matches(facts):
+                self.hits[rule.name] = self.hits.get(rule.name, 0) + 1
+                return rule.dest
+        self.misses += 1
+        return None
+
+    def metrics(self):
+        return {"rules": len(self.rules), "hits": self.hits, "misses": self.misses}
+
+    def dump_metrics(self):
+        """Writes hit counters to $RUNTIME_DIRECTORY/rules-<name>.json (atomic replace)."""
+        if not METRICS_DIR:
+            return
+        path = os.path.join(METRICS_DIR, f"rules-{self.name}.json")
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self.metrics(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+def compile_rules(config, name="dumb"):
+    """Builds the RuleSet from config["advanced_rules"] + config["rules"]."""
+    rules = []
+    for spec in config.get('advanced_rules', []) or []:
+        rule = Rule(len(rules), spec["dest"], spec)
+        if rule.unconstrained and not spec.get("catch_all"):
+            print(f"[Dumb Janitor] Ignoring rule for {rule.dest}: no predicates (set catch_all to match everything).")
+            continue
+        rules.append(rule)
+    for dest, extensions in (config.get('rules') or {}).items():
+        if extensions:
+            rules.append(Rule(len(rules), dest, {"ext": extensions}))
+    return RuleSet(rules, name)
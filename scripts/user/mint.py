@@ -9,6 +9,13 @@ import subprocess
 import time
 import pwd
 
+# Shared Nomad identity cache (minting must invalidate its verdict)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../core'))
+try:
+    import identity_cache
+except ImportError:
+    identity_cache = None
+
 def check_root():
     if os.geteuid() != 0:
         print("Error: ZenFS Mint requires root privileges to access drives.")
@@ -18,7 +25,7 @@ def check_root():
 def get_removable_drives():
     try:
         # Request JSON output for specific columns
-        cmd = ["lsblk", "-J", "-o", "NAME,SIZE,MODEL,TRAN,MOUNTPOINT,FSTYPE"]
+        cmd = ["lsblk", "-J", "-o", "NAME,SIZE,MODEL,TRAN,MOUNTPOINT,FSTYPE,UUID"]
         result = subprocess.check_output(cmd)
         data = json.loads(result)
         
@@ -33,7 +40,7 @@ def get_removable_drives():
         print(f"Error scanning drives: {e}")
         return []
 
-def mint_drive(device_node, label, mountpoint):
+def mint_drive(device_node, label, mountpoint, fs_uuid=None):
     """Initializes the ZenFS structure on the drive."""
     
     target_path = mountpoint
@@ -108,6 +115,10 @@ def mint_drive(device_node, label, mountpoint):
         print(f"Path:  {identity_file}")
     except Exception as e:
         print(f"Error writing identity: {e}")
+    else:
+        # The Nomad may have cached this filesystem as foreign; make it re-probe
+        if identity_cache and fs_uuid:
+            identity_cache.invalidate(fs_uuid)
     finally:
         if temp_mount:
             subprocess.call(["umount", target_path])
@@ -168,7 +179,7 @@ def main():
         label = input(f"Enter Label for {dev['name']}: ")
         if not label: label = "Unnamed_ZenFS_Drive"
             
-        mint_drive(dev['name'], label, dev.get('mountpoint'))
+        mint_drive(dev['name'], label, dev.get('mountpoint'), dev.get('uuid'))
         
     except KeyboardInterrupt:
         print("\nAborted.")
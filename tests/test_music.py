@@ -0,0 +1,84 @@
+######
+# tests/test_music.py
+######
+"""
+Conductor forest tests. Run from the repo root:
+    python3 -m unittest discover tests
+Needs mutagen and watchdog (the janitor's runtime dependencies).
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("core", "janitor", "bench"):
+    sys.path.append(os.path.join(ROOT, "scripts", sub))
+import music
+import music_library_gen
+
+class IncrementalDeleteTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="zenfs-music-test-")
+        self.music_dir = os.path.join(self.workdir, "Music")
+        self.db_root = os.path.join(self.music_dir, ".database")
+        self.config = {
+            "music_dir": self.music_dir,
+            "unsorted_dir": self.db_root,
+            "split_symbols": [";", ","],
+            "tag_cache": os.path.join(self.workdir, "tags.json"),
+            "covers": False,
+            "tag_workers": 1,
+        }
+        music.notify.send = lambda *args, **kwargs: None
+        self.doomed = self._track("Lonely Artist/Only Album/01.mp3",
+                                  artist="Lonely Artist", album="Only Album", genre="Polka", date="1981")
+        self._track("Other Artist/Other Album/01.mp3",
+                    artist="Other Artist", album="Other Album", genre="Rock", date="2001")
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _track(self, rel, **tags):
+        path = os.path.join(self.db_root, rel)
+        tags.update(title=os.path.basename(os.path.dirname(rel)), albumartist=tags["artist"], tracknumber="1")
+        music_library_gen.write_track(path, 20, tags)
+        return path
+
+    def test_deleting_last_track_removes_its_view_dirs(self):
+        model = music.generate_forest(self.config)
+        view = Path(self.music_dir)
+        for d in ("Artists/Lonely Artist", "Genres/Polka", "Years/1981"):
+            self.assertTrue((view / d).is_dir(), d)
+
+        os.remove(self.doomed)
+        music.update_forest(self.config, model, set(), {self.doomed})
+
+        for d in ("Artists/Lonely Artist", "Genres/Polka", "Years/1981"):
+            self.assertFalse((view / d).exists(), d)
+        # Category roots and other artists are untouched
+        for d in ("Artists/Other Artist", "Genres/Rock", "Years/2001", "Artists", "Genres", "Years"):
+            self.assertTrue((view / d).is_dir(), d)
+
+    def test_removing_canonical_copy_brings_back_the_other(self):
+        spare = self._track("Lonely Artist/Only Album/02.mp3",
+                            artist="Lonely Artist", album="Only Album", genre="Polka", date="1981")
+        self.config["prefer_canonical"] = True
+        model = music.generate_forest(self.config)
+        self.assertEqual(len(model.dupes), 1)
+        canonical = next(iter(model.dupes.values()))["canonical"]
+        other = self.doomed if canonical == spare else spare
+        self.assertIn(other, model.hidden)
+
+        os.remove(canonical)
+        music.update_forest(self.config, model, set(), {canonical})
+
+        self.assertEqual(model.dupes, {})
+        self.assertIn(other, model.tracks)
+        link = Path(self.music_dir, "Artists/Lonely Artist/Albums/Only Album/Only Album.mp3")
+        self.assertTrue(os.path.samefile(link, other))
+
+if __name__ == "__main__":
+    unittest.main()